@@ -1,7 +1,9 @@
 import argparse
 import json
 import sys
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
 from statistics import mean
 
@@ -22,6 +24,7 @@ GOLD_STANDARD_CONFIG = (SHAPLEY_METHOD_NAME, False)
 
 CHECKPOINTS_DIRECTORY = Path(__file__).resolve().parent / "checkpoints"
 CHECKPOINT_PATH = CHECKPOINTS_DIRECTORY / "checkpoint.json"
+RECORDS_PATH = CHECKPOINTS_DIRECTORY / "results.jsonl"
 RESULTS_DIRECTORY = Path(__file__).resolve().parent / "results"
 RESULTS_PATH = RESULTS_DIRECTORY / "RESULTS.md"
 
@@ -70,17 +73,129 @@ def _calculate_efficiency(attribution_result: Attribution) -> float:
     return (attribution_result.grand_coalition_value / attribution_total) * 100
     
 
-def _write_checkpoint(data_index: int, results: dict[str, list[dict[str, Any]]]) -> None:
-    """Persist the current benchmark state.
+def _append_record(data_index: int, datapoint_results: dict[str, dict[str, Any]]) -> None:
+    """Append the results of one completed datapoint to the JSONL record file.
 
     Args:
-        data_index: Last completed datapoint index.
-        results: Collected benchmark results.
+        data_index: Completed datapoint index.
+        datapoint_results: Result entry per method display name.
     """
     CHECKPOINTS_DIRECTORY.mkdir(exist_ok=True)
-    entry = {"data_index": data_index, "results": results}
-    with CHECKPOINT_PATH.open("w", encoding="utf-8") as f:
-        json.dump(entry, f, default=str)
+    with RECORDS_PATH.open("a", encoding="utf-8") as f:
+        f.write(json.dumps({"data_index": data_index, "results": datapoint_results}, default=str) + "\n")
+
+
+def _load_records() -> dict[int, dict[str, dict[str, Any]]]:
+    """Load completed datapoints from the JSONL record file (migrating a legacy checkpoint if needed).
+
+    Returns:
+        Result entries per method, keyed by datapoint index.
+    """
+    records: dict[int, dict[str, dict[str, Any]]] = {}
+    if not RECORDS_PATH.exists():
+        checkpoint = _load_checkpoint()
+        if checkpoint is None: return records
+        for method_name, method_results in checkpoint["results"].items():
+            for data_index, entry in enumerate(method_results): records.setdefault(data_index, {})[method_name] = entry
+        for data_index in sorted(records): _append_record(data_index, records[data_index])
+        return records
+    with RECORDS_PATH.open(encoding="utf-8") as f:
+        for line in f:
+            try: record = json.loads(line)
+            except json.JSONDecodeError: continue # Truncated line from an interrupted run.
+            records[record["data_index"]] = record["results"]
+    return records
+
+
+def _collect_results(records: dict[int, dict[str, dict[str, Any]]]) -> dict[str, list[dict[str, Any]]]:
+    """Arrange datapoint records as per-method result lists ordered by datapoint index.
+
+    Args:
+        records: Result entries per method, keyed by datapoint index.
+
+    Returns:
+        Collected benchmark results.
+    """
+    results: dict[str, list[dict[str, Any]]] = {_format_method_name(method_name, use_cache): [] for method_name, _, use_cache in _create_samplers([])}
+    for data_index in sorted(records):
+        for method_name, entry in records[data_index].items(): results.setdefault(method_name, []).append(entry)
+    return results
+
+
+def _render(results: dict[str, list[dict[str, Any]]], model_name: str) -> None:
+    """Write plots and the results summary.
+
+    Args:
+        results: Collected benchmark results.
+        model_name: Evaluated model name.
+    """
+    if not any(results.values()): return
+    similarities = AttributionComparator(gold_method_name=_format_method_name(*GOLD_STANDARD_CONFIG)).compare_arrays(results)
+    plot_similarities(similarities)
+    plot_similarity_convergence(similarities)
+    plot_timing(results, normalize=True)
+    _write_results_markdown(results, similarities, model_name)
+
+
+class _RequestLimitedLLM(LLMInterface):
+    """Caps the number of concurrent model requests across all datapoints.
+
+    Other attributes (``model_name``, ``retry_count``, ...) are forwarded to the wrapped model.
+    """
+    def __init__(self, llm: LLMInterface, max_concurrent_requests: int) -> None:
+        self.llm = llm
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent_requests))
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "llm": raise AttributeError(name) # Not set yet (e.g. while unpickling).
+        return getattr(self.llm, name)
+
+    def generate(self, prompt: Any, tools: Any = None, images: Any = None) -> Any:
+        with self._slots: return self.llm.generate(prompt, tools=tools, images=images)
+
+    def score(self, prompt: Any, target: str, tools: Any = None, images: Any = None) -> list[float]:
+        with self._slots: return self.llm.score(prompt, target, tools=tools, images=images)
+
+
+def _run_datapoint(entry: SymptomDataset, llm: LLMInterface, args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    """Run every method on one datapoint.
+
+    Args:
+        entry: Input datapoint.
+        llm: Model interface.
+        args: Parsed command-line arguments.
+
+    Returns:
+        Result entry per method display name.
+    """
+    handler = _build_data_handler(entry)
+    players = handler.get_keys(exclude_permanent_keys=True)
+    if args.verbose: print(f"\n\nFeatures: {len(players)}")
+    datapoint_results = {}
+    for name, sampler, cache in _create_samplers(players):
+        display_name = _format_method_name(name, cache)
+        shap = ShapleyAttribution(model=llm,
+                                  data_handler=handler,
+                                  prompt_codec=BasicPromptCodec(system=entry.system_prompt()),
+                                  sampler=sampler,
+                                  use_cache=cache,
+                                  verbose=False,
+                                  num_threads=args.threads,)
+                                #   value_function=EmbeddingCosineSimilarity(model_name = "text-embedding-3-small", api_url_endpoint = "https://api.openai.com/v1"))
+                                #   value_function=EmbeddingCosineSimilarity())
+
+        start_time = time.perf_counter() # Start clock
+        result = shap.attribution()
+        elapsed = time.perf_counter() - start_time # Stop clock
+
+        if args.verbose: print(f"Method: {display_name}\n     Time: {elapsed}")
+        if args.debug: print("\n\n### OUTPUT ###"); print(result.output); print("\n\n### ATTRIBUTION ###"); print(result.attribution)
+
+        datapoint_results[display_name] = {"attribution": result.attribution,
+                                           "feature_count": len(players),
+                                           "time": elapsed,
+                                           "efficiency": _calculate_efficiency(result),}
+    return datapoint_results
 
 
 def _load_checkpoint() -> dict[str, Any] | None:
@@ -113,16 +228,16 @@ def _load_checkpoint() -> dict[str, Any] | None:
     return checkpoint
 
 
-def _write_results_markdown(results: dict[str, list[dict[str, Any]]], model_name: str) -> None:
+def _write_results_markdown(results: dict[str, list[dict[str, Any]]], similarities: dict[str, Any], model_name: str) -> None:
     """Write the benchmark summary table.
 
     Args:
         results: Collected benchmark results.
+        similarities: ``AttributionComparator.compare_arrays`` output for ``results``.
         model_name: Evaluated model name.
     """
     RESULTS_DIRECTORY.mkdir(exist_ok=True)
     gold_method_name = _format_method_name(*GOLD_STANDARD_CONFIG)
-    similarities = AttributionComparator(gold_method_name=gold_method_name).compare(results)
     feature_counts = sorted({result["feature_count"] for method_results in results.values() for result in method_results})
     feature_count_frequency = {
         feature_count: sum(1 for result in results[gold_method_name] if result["feature_count"] == feature_count)
@@ -188,23 +303,28 @@ def _create_samplers(players: list[int]) -> list[tuple[str, Any, bool]]:
     
 
 def _get_llm(args: argparse.Namespace) -> tuple[LLMInterface, str]:
-    model_name: str = "gpt-4.1-mini"
-    llm: LLMInterface = OpenAIInterface(model_name=model_name, temperature=0.2, max_tokens=64)
     if args.dummy_llm:
         model_name = "Dummy model"
-        llm = DummyLLM(model_name=model_name, random=False)
-    elif args.reasoning:
+        return DummyLLM(model_name=model_name, random=False), model_name
+    if args.reasoning:
         model_name = "gpt-5-nano"
-        llm = OpenAIInterface(model_name=model_name, reasoning="low", max_tokens=1024)
-    return llm, model_name
+        return OpenAIInterface(model_name=model_name, reasoning="low", max_tokens=1024), model_name
+    model_name = "gpt-4.1-mini"
+    return OpenAIInterface(model_name=model_name, temperature=0.2, max_tokens=64), model_name
 
 
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("--start-from-checkpoint", action="store_true", help="Resume from the saved checkpoint.")
+    parser.add_argument("--start-from-checkpoint", action="store_true", help="Resume from the saved result records.")
     parser.add_argument("--threads", type=int, default=10, help="Number of threads for coalition evaluation. Default is 10.")
+    parser.add_argument("--parallel-datapoints", type=int, default=1, help="Number of datapoints attributed concurrently. Default is 1.")
+    parser.add_argument("--max-concurrent-requests", type=int, default=None,
+                        help="Global limit on concurrent model requests across datapoints. Default is --threads. "
+                             "Timings include time spent waiting for a request slot.")
+    parser.add_argument("--render-every", type=int, default=0, help="Re-render plots and RESULTS.md every N datapoints (0: only at the end).")
+    parser.add_argument("--render-only", action="store_true", help="Render plots and RESULTS.md from the saved records and exit.")
     parser.add_argument("--debug", action="store_true", help="Print full outputs and attribution details.")
     parser.add_argument("--verbose", action="store_true", help="Print progress and timing information.")
     llm_group = parser.add_mutually_exclusive_group()
@@ -215,50 +335,32 @@ if __name__ == "__main__":
     llm, model_name = _get_llm(args)
     if args.verbose:
         print(f"Model: {model_name}")
-    
-    checkpoint = _load_checkpoint() if args.start_from_checkpoint else None
-    if checkpoint is None:
-        results = {_format_method_name(method_name, use_cache): [] for method_name, _, use_cache in _create_samplers([])}
-        start_index = 0
+
+    if args.render_only:
+        _render(_collect_results(_load_records()), model_name)
+        sys.exit(0)
+
+    if args.start_from_checkpoint: records = _load_records()
     else:
-        results = checkpoint["results"]
-        start_index = checkpoint["data_index"] + 1
+        records = {}
+        if RECORDS_PATH.exists(): RECORDS_PATH.unlink()
 
+    limited_llm = _RequestLimitedLLM(llm, args.max_concurrent_requests or args.threads) if args.parallel_datapoints > 1 else llm
     data = SymptomDataset.load()
-    for data_index, entry in enumerate(data[start_index:], start=start_index):
-        handler = _build_data_handler(entry)
-        players = handler.get_keys(exclude_permanent_keys=True)
-        if args.verbose: print(f"\n\nFeatures: {len(players)}")
-        samplers = _create_samplers(players)
-        for name, sampler, cache in samplers:
-            display_name = _format_method_name(name, cache)
-            if args.verbose: print(f"Method: {display_name}", end="\n     ")
-            shap = ShapleyAttribution(model=llm,
-                                      data_handler=handler,
-                                      prompt_codec=BasicPromptCodec(system=entry.system_prompt()),
-                                      sampler=sampler,
-                                      use_cache=cache,
-                                      verbose=False,
-                                      num_threads=args.threads,)
-                                    #   value_function=EmbeddingCosineSimilarity(model_name = "text-embedding-3-small", api_url_endpoint = "https://api.openai.com/v1"))
-                                    #   value_function=EmbeddingCosineSimilarity())
-            
-            start_time = time.perf_counter() # Start clock
-            result = shap.attribution()
-            elapsed = time.perf_counter() - start_time # Stop clock
-
-            if args.verbose: print(f"Time: {elapsed}")
-            if args.debug: print("\n\n### OUTPUT ###"); print(result.output); print("\n\n### ATTRIBUTION ###"); print(result.attribution)
-
-            efficiency = _calculate_efficiency(result)
-            results[display_name].append({"attribution": result.attribution,
-                                          "feature_count": len(players),
-                                          "time": elapsed,
-                                          "efficiency": efficiency,})
-
-        similarities = AttributionComparator(gold_method_name=_format_method_name(*GOLD_STANDARD_CONFIG)).compare(results)
-        plot_similarities(similarities)
-        plot_similarity_convergence(similarities)
-        plot_timing(results, normalize=True)
-        _write_checkpoint(data_index, results)
-        _write_results_markdown(results, model_name)
+    remaining = iter([(data_index, entry) for data_index, entry in enumerate(data) if data_index not in records])
+    completed = 0
+    pending: dict[Future, int] = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel_datapoints)) as executor:
+        while True:
+            for data_index, entry in remaining:
+                pending[executor.submit(_run_datapoint, entry, limited_llm, args)] = data_index
+                if len(pending) >= max(1, args.parallel_datapoints): break
+            if not pending: break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                data_index = pending.pop(future)
+                records[data_index] = future.result()
+                _append_record(data_index, records[data_index])
+                completed += 1
+                if args.render_every and completed % args.render_every == 0: _render(_collect_results(records), model_name)
+    _render(_collect_results(records), model_name)
@@ -3,6 +3,7 @@ from statistics import mean
 from pathlib import Path
 
 import matplotlib.pyplot as plt
+import numpy as np
 
 PLOTS_DIRECTORY = Path(__file__).resolve().parent / "plots"
 
@@ -108,6 +109,55 @@ class AttributionComparator:
             }
         return similarity_results_by_method
 
+    def compare_arrays(self, attribution_data):
+        """Array-backed ``compare``: same result, computed for all methods and datapoints in one NumPy pass.
+
+        Score vectors are aligned to the gold feature order, zero-padded to the largest
+        feature count and stacked into a (methods x datapoints x features) tensor.
+        """
+        gold_entries = attribution_data[self.gold_method_name]
+        method_names = [method_name for method_name in attribution_data if method_name != self.gold_method_name]
+        if not method_names:
+            return {}
+        number_of_datapoints = len(gold_entries)
+        ordered_feature_keys_per_datapoint = [list(entry[self.attribution_key].keys()) for entry in gold_entries]
+        lengths = np.fromiter((len(keys) for keys in ordered_feature_keys_per_datapoint), dtype=np.int64, count=number_of_datapoints)
+        width = int(lengths.max()) if number_of_datapoints else 0
+        rows = np.repeat(np.arange(number_of_datapoints), lengths)
+        columns = np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        def stack(entries):
+            matrix = np.zeros((number_of_datapoints, width))
+            matrix[rows, columns] = np.fromiter((score
+                                                 for datapoint_index, keys in enumerate(ordered_feature_keys_per_datapoint)
+                                                 for score in self._extract_score_vector(entries[datapoint_index][self.attribution_key], keys)),
+                                                dtype=np.float64, count=len(rows))
+            return matrix
+
+        gold_matrix = stack(gold_entries)
+        method_tensor = np.stack([stack(attribution_data[method_name]) for method_name in method_names])
+        dot_products = np.einsum("mdf,df->md", method_tensor, gold_matrix)
+        norms = np.linalg.norm(method_tensor, axis=2) * np.linalg.norm(gold_matrix, axis=1)
+        similarities = np.divide(dot_products, norms, out=np.zeros_like(dot_products), where=norms != 0.0)
+
+        feature_counts = np.fromiter((entry[self.feature_count_key] for entry in gold_entries), dtype=np.int64, count=number_of_datapoints)
+        unique_feature_counts, feature_count_index = np.unique(feature_counts, return_inverse=True)
+        occurrences = np.bincount(feature_count_index, minlength=len(unique_feature_counts))
+        by_feature_count = np.stack([np.bincount(feature_count_index, weights=row, minlength=len(unique_feature_counts)) for row in similarities]) / occurrences if number_of_datapoints else np.zeros((len(method_names), 0))
+
+        similarity_results_by_method = {}
+        for method_index, method_name in enumerate(method_names):
+            means = by_feature_count[method_index]
+            similarity_results_by_method[method_name] = {
+                "per_datapoint": similarities[method_index].tolist(),
+                "mean_similarity": float(similarities[method_index].mean()) if number_of_datapoints else None,
+                "by_feature_count": {int(feature_count): float(value) for feature_count, value in zip(unique_feature_counts, means)},
+                "feature_count_summary": {"min_similarity": float(means.min()),
+                                          "max_similarity": float(means.max()),
+                                          "spread": float(means.max() - means.min())} if number_of_datapoints else None,
+            }
+        return similarity_results_by_method
+
 
 
 
@@ -0,0 +1,104 @@
+import argparse
+import json
+import subprocess
+import sys
+from statistics import median
+
+from llmSHAP.types import Any
+
+
+IMPORT_SNIPPETS = {
+    "import llmSHAP": "import llmSHAP",
+    "import ShapleyAttribution": "from llmSHAP import ShapleyAttribution, DataHandler, BasicPromptCodec",
+    "import OpenAIInterface": "from llmSHAP.llm import OpenAIInterface",
+}
+
+FIRST_ATTRIBUTION_SNIPPET = """
+from llmSHAP import ShapleyAttribution, DataHandler, BasicPromptCodec
+from llmSHAP.llm import DummyLLM
+attribution = ShapleyAttribution(model=DummyLLM(model_name="dummy", sleep_seconds=0.0),
+                                 data_handler=DataHandler(" ".join(f"w{{index}}" for index in range({features}))),
+                                 prompt_codec=BasicPromptCodec(system="Answer the question."),
+                                 verbose=False)
+attribution.attribution()
+"""
+
+TIMER = """
+import time
+_start = time.perf_counter()
+{body}
+_elapsed = time.perf_counter() - _start
+import json, sys
+print(json.dumps({{"seconds": _elapsed, "modules": sorted(name for name in ("tqdm", "openai", "llmSHAP.llm.openai", "sentence_transformers", "torch") if name in sys.modules)}}))
+"""
+
+
+def _run_fresh(body: str) -> dict[str, Any]:
+    """Time ``body`` in a fresh interpreter.
+
+    Args:
+        body: Python source to time.
+
+    Returns:
+        Elapsed seconds and the optional heavy modules that ended up imported.
+    """
+    result = subprocess.run([sys.executable, "-c", TIMER.format(body=body)], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _measure(name: str, body: str, repeats: int) -> dict[str, Any]:
+    """Run ``body`` ``repeats`` times in fresh interpreters and summarize.
+
+    Args:
+        name: Measurement name.
+        body: Python source to time.
+        repeats: Number of fresh interpreters.
+
+    Returns:
+        Median and minimum time in milliseconds, and the loaded heavy modules.
+    """
+    runs = [_run_fresh(body) for _ in range(repeats)]
+    seconds = [run["seconds"] for run in runs]
+    return {"name": name, "median_ms": 1000 * median(seconds), "min_ms": 1000 * min(seconds), "modules": runs[-1]["modules"]}
+
+
+def _slowest_imports(statement: str, top: int) -> list[tuple[int, str]]:
+    """Return the ``top`` slowest modules (cumulative microseconds) reported by ``-X importtime``.
+
+    Args:
+        statement: Import statement to profile.
+        top: Number of modules to return.
+
+    Returns:
+        ``(cumulative_us, module)`` pairs, slowest first.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], capture_output=True, text=True, check=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line: continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        entries.append((int(cumulative), module.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure llmSHAP import time and time-to-first-attribution in fresh interpreters.")
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per measurement. Default is 5.")
+    parser.add_argument("--features", type=int, default=4, help="Features in the DummyLLM attribution. Default is 4.")
+    parser.add_argument("--importtime", type=int, default=0, help="Also list the N slowest imports of ShapleyAttribution.")
+    parser.add_argument("--json", action="store_true", help="Print the measurements as JSON.")
+    args = parser.parse_args()
+
+    measurements = [_measure(name, body, args.repeats) for name, body in IMPORT_SNIPPETS.items()]
+    measurements.append(_measure(f"first attribution (DummyLLM, {args.features} features)",
+                                 FIRST_ATTRIBUTION_SNIPPET.format(features=args.features), args.repeats))
+    if args.json:
+        print(json.dumps(measurements, indent=2))
+    else:
+        print(f"{'measurement':<45} {'median ms':>10} {'min ms':>10}  heavy modules loaded")
+        for measurement in measurements:
+            print(f"{measurement['name']:<45} {measurement['median_ms']:>10.1f} {measurement['min_ms']:>10.1f}  {', '.join(measurement['modules']) or '-'}")
+    if args.importtime:
+        print("\nSlowest imports of ShapleyAttribution (cumulative):")
+        for cumulative, module in _slowest_imports(IMPORT_SNIPPETS["import ShapleyAttribution"], args.importtime):
+            print(f"{cumulative / 1000:>10.1f} ms  {module}")
@@ -9,6 +9,8 @@ __all__ = [
     "ValueFunction",
     "TFIDFCosineSimilarity",
     "EmbeddingCosineSimilarity",
+    "ExactMatch",
+    "TargetLogLikelihood",
     "ShapleyAttribution",
     "StratifiedSampler",
     "Attribution",
@@ -19,7 +21,7 @@ if TYPE_CHECKING:
     from .data_handler import DataHandler
     from .prompt_codec import PromptCodec, BasicPromptCodec
     from .generation import Generation
-    from .value_functions import ValueFunction, TFIDFCosineSimilarity, EmbeddingCosineSimilarity
+    from .value_functions import ValueFunction, TFIDFCosineSimilarity, EmbeddingCosineSimilarity, ExactMatch, TargetLogLikelihood
     from .attribution_methods.shapley_attribution import ShapleyAttribution
     from .attribution_methods.coalition_sampler import StratifiedSampler
     from .attribution import Attribution
@@ -40,6 +42,10 @@ if TYPE_CHECKING:
     @overload
     def __getattr__(name: str) -> type[EmbeddingCosineSimilarity]: ...
     @overload
+    def __getattr__(name: str) -> type[ExactMatch]: ...
+    @overload
+    def __getattr__(name: str) -> type[TargetLogLikelihood]: ...
+    @overload
     def __getattr__(name: str) -> type[ShapleyAttribution]: ...
     @overload
     def __getattr__(name: str) -> type[StratifiedSampler]: ...
@@ -58,12 +64,14 @@ def __getattr__(name: str):
     if name == "Generation":
         from .generation import Generation
         return Generation
-    if name in {"ValueFunction", "TFIDFCosineSimilarity", "EmbeddingCosineSimilarity"}:
-        from .value_functions import ValueFunction, TFIDFCosineSimilarity, EmbeddingCosineSimilarity
+    if name in {"ValueFunction", "TFIDFCosineSimilarity", "EmbeddingCosineSimilarity", "ExactMatch", "TargetLogLikelihood"}:
+        from .value_functions import ValueFunction, TFIDFCosineSimilarity, EmbeddingCosineSimilarity, ExactMatch, TargetLogLikelihood
         return {
             "ValueFunction": ValueFunction,
             "TFIDFCosineSimilarity": TFIDFCosineSimilarity,
             "EmbeddingCosineSimilarity": EmbeddingCosineSimilarity,
+            "ExactMatch": ExactMatch,
+            "TargetLogLikelihood": TargetLogLikelihood,
         }[name]
     if name == "ShapleyAttribution":
         from .attribution_methods.shapley_attribution import ShapleyAttribution
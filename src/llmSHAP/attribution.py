@@ -1,4 +1,7 @@
-from llmSHAP.types import ResultMapping
+from llmSHAP.types import TYPE_CHECKING, Any, ResultMapping, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from llmSHAP.metrics import MetricsSnapshot
 
 
 class Attribution:
@@ -7,18 +10,21 @@ class Attribution:
     def __init__(self, attribution: ResultMapping,
                  output: str,
                  baseline: float,
-                 grand_coalition_value: float) -> None:
+                 grand_coalition_value: float,
+                 metrics: Optional["MetricsSnapshot"] = None) -> None:
         """
         Initialize an Attribution instance.
 
         Args:
             attribution: The (normalized) result/attribution data.
             output: The generated output associated with the attribution.
+            metrics: Run metrics (throughput, cache hit rate, retries, ...) of the attribution.
         """
         self._attribution = attribution
         self._output = output
         self._empty_baseline = baseline
         self._grand_coalition_value = grand_coalition_value
+        self._metrics = metrics
 
     @property
     def attribution(self) -> ResultMapping:
@@ -40,6 +46,37 @@ class Attribution:
         """Return the value of the grand coalition."""
         return self._grand_coalition_value
 
+    @property
+    def metrics(self) -> Optional["MetricsSnapshot"]:
+        """Return the run metrics of the attribution (``None`` if not recorded)."""
+        return self._metrics
+
+    def keys(self) -> List[Any]:
+        """Return the feature keys in attribution order."""
+        return list(self._attribution)
+
+    def scores(self) -> Any:
+        """Return the scores as a NumPy array (in ``keys()`` order)."""
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError(
+                "Attribution.scores requires NumPy.\n"
+                "Install with: pip install llmSHAP[columnar]"
+            ) from None
+        return np.fromiter((item.get("score", 0.0) for item in self._attribution.values()), dtype=np.float64, count=len(self._attribution))
+
+    def argsort(self, descending: bool = True, by_abs: bool = False) -> Any:
+        """Return feature positions ordered by score (or by absolute score)."""
+        scores = self.scores()
+        if by_abs: scores = abs(scores)
+        return (-scores).argsort(kind="stable") if descending else scores.argsort(kind="stable")
+
+    def top_k(self, k: int, by_abs: bool = True) -> List[Tuple[Any, float]]:
+        """Return the ``k`` highest-ranked ``(key, score)`` pairs (by absolute score by default)."""
+        keys, scores = self.keys(), self.scores()
+        return [(keys[position], float(scores[position])) for position in self.argsort(by_abs=by_abs)[:k]]
+
     def render(self, abs_values: bool = False, render_labels: bool = False) -> str:
         RESET="\033[0m"
         FG="\033[38;5;0m"
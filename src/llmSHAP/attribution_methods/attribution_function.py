@@ -1,21 +1,35 @@
-import os, json
+import hashlib
+import json
+import os
+import sys
+import time
 from dataclasses import asdict
 import threading
 import warnings
 from concurrent.futures import Future
 
-from llmSHAP.types import ResultMapping, Optional
+from llmSHAP.types import Any, ResultMapping, List, Optional, Sequence, Tuple
 from llmSHAP.value_functions import ValueFunction
 from llmSHAP.llm.llm_interface import LLMInterface
-from llmSHAP.llm.openai import OpenAIInterface
 
 from llmSHAP.data_handler import DataHandler
 from llmSHAP.prompt_codec import PromptCodec, BasicPromptCodec
-from llmSHAP.generation import Generation
-from llmSHAP.value_functions import TFIDFCosineSimilarity
+from llmSHAP.generation import Generation, LogProbGeneration
+from llmSHAP.value_functions import TFIDFCosineSimilarity, TargetLogLikelihood
+from llmSHAP.log_writer import JSONLLogWriter
+from llmSHAP.journal import CoalitionJournal
+from llmSHAP.cache import BoundedCache
+from llmSHAP.metrics import AttributionMetrics
+from llmSHAP import monitoring
 
 
 
+_MODEL_SETTINGS = ("model_name", "base_url", "temperature", "max_tokens", "reasoning", "text_format")
+"""Model attributes that change generations and therefore belong in a journal fingerprint."""
+_SAMPLING_SETTINGS = ("temperature", "max_tokens", "reasoning", "text_format")
+"""Settings that only affect sampling, so they do not change the scores of a fixed target."""
+
+
 class AttributionFunction:
     def __init__(self,
                  model: LLMInterface,
@@ -25,87 +39,190 @@ class AttributionFunction:
                  verbose: bool = True,
                  logging: bool = False,
                  log_filename: str = "log",
-                 value_function: Optional[ValueFunction] = None):
+                 value_function: Optional[ValueFunction | Sequence[ValueFunction]] = None,
+                 log_writer: Optional[JSONLLogWriter] = None,
+                 cache: Optional[BoundedCache] = None):
         self.model = model
         self.data_handler = data_handler
         self.prompt_codec = prompt_codec
-        self.use_cache = use_cache
+        self.use_cache = use_cache or cache is not None
         self.verbose = verbose
-        self.logging = logging
+        self.logging = logging or log_writer is not None
         self.log_filename = log_filename
-        self.value_function = value_function or TFIDFCosineSimilarity()
-        if isinstance(self.model, OpenAIInterface) and self.model.text_format is not None and isinstance(self.prompt_codec, BasicPromptCodec):
+        self.log_writer = log_writer or (JSONLLogWriter.shared(os.path.join("logs", f"{log_filename}.jsonl")) if logging else None)
+        self.multi_metric = isinstance(value_function, (list, tuple))
+        self.value_functions: List[ValueFunction] = list(value_function) if self.multi_metric else [value_function or TFIDFCosineSimilarity()] # type: ignore[arg-type, list-item]
+        if not self.value_functions: raise ValueError("value_function must not be an empty sequence.")
+        if len(self.value_functions) > 1 and any(isinstance(function, TargetLogLikelihood) for function in self.value_functions):
+            raise ValueError("TargetLogLikelihood scores a fixed target instead of generating outputs and cannot be combined with other value functions.")
+        self.value_function = self.value_functions[0]
+        openai_module = sys.modules.get("llmSHAP.llm.openai") # An OpenAIInterface model implies the module is loaded.
+        if openai_module is not None and isinstance(self.model, openai_module.OpenAIInterface) and self.model.text_format is not None and isinstance(self.prompt_codec, BasicPromptCodec):
             warnings.warn("OpenAIInterface with text_format set may be incompatible with BasicPromptCodec. "
                           "Provide a custom PromptCodec that can parse structured outputs.", stacklevel=2)
         ####
-        self.cache = {}
+        self.cache = cache if cache is not None else BoundedCache()
+        self._inflight: dict[frozenset, Future[Generation]] = {}
         self._cache_lock = threading.Lock()
-        self._log_lock = threading.Lock()
-        self.result: ResultMapping = {}
+        self._target_lock = threading.Lock()
+        self._target_future: Future[str] | None = None
+        self._journal: Optional[CoalitionJournal] = None
+        self.results: List[ResultMapping] = [{} for _ in self.value_functions] # One per value function.
+        self.result: ResultMapping = self.results[0]
+        self.metrics = AttributionMetrics() # Replaced at the start of every run; safe to query from other threads.
+        self._monitoring_labels = (str(getattr(model, "model_name", None) or type(model).__name__), "none") # (model, sampler)
 
     def _v(self, base_generation: Generation, coalition_generation: Generation) -> float:
         return self.value_function(base_generation, coalition_generation)
+
+    def _evaluate(self, base_generation: Generation, coalition_generation: Generation) -> Tuple[float, ...]:
+        """
+        Value of ``coalition_generation`` under every value function, timed into the
+        monitoring registry when one is enabled. A single value function goes through
+        ``_v``; with a list, each function is called directly.
+        """
+        scorers = [(function, function) for function in self.value_functions] if self.multi_metric else [(self.value_function, self._v)]
+        if not monitoring.enabled(): return tuple(score(base_generation, coalition_generation) for _, score in scorers)
+        values = []
+        for function, score in scorers:
+            start = time.perf_counter()
+            values.append(score(base_generation, coalition_generation))
+            monitoring.observe_value_function(*self._monitoring_labels, type(function).__name__, time.perf_counter() - start)
+        return tuple(values)
     
     def _normalized_result(self) -> ResultMapping:
         total = sum([abs(value["score"]) for value in self.result.values()])
         if total == 0: return self.result
         return {key: {"value": value["value"], "score": value["score"] / total} for key, value in self.result.items()}
     
+    def _cache_key(self, coalition) -> frozenset:
+        return frozenset(set(coalition) | self.data_handler.permanent_indexes)
+
     def _get_output(self, coalition) -> Generation:
-        effective_coalition = set(coalition) | self.data_handler.permanent_indexes
-        frozen_coalition = frozenset(effective_coalition)
+        frozen_coalition = self._cache_key(coalition)
         owner = False
         future: Future[Generation] | None = None
         if self.use_cache:
             with self._cache_lock:
                 cached = self.cache.get(frozen_coalition)
-                if isinstance(cached, Future): future = cached
-                elif cached is not None:
+                if cached is not None:
+                    self.metrics.record_cache_hit()
+                    monitoring.count_cache_lookup(*self._monitoring_labels, "hit")
                     return cached
-                else:
+                future = self._inflight.get(frozen_coalition)
+                if future is None:
                     future = Future()
-                    self.cache[frozen_coalition] = future
+                    self._inflight[frozen_coalition] = future
                     owner = True
-            if future is not None and not owner:
+                    monitoring.count_cache_lookup(*self._monitoring_labels, "miss")
+                else:
+                    self.cache.record_inflight_join()
+                    self.metrics.record_inflight_join()
+                    monitoring.count_cache_lookup(*self._monitoring_labels, "join")
+            if not owner:
                 return future.result()
+        started_at, start = time.time(), time.perf_counter()
         try:
             prompt = self.prompt_codec.build_prompt(self.data_handler, coalition)
             tools = self.data_handler.tool_list(coalition) # self.prompt_codec.get_tools(self.data_handler, coalition)
             images = self.data_handler.image_list(coalition) # self.prompt_codec.get_images(self.data_handler, coalition)
-            generation = self.model.generate(prompt, tools=tools, images=images)
-            parsed_generation: Generation = self.prompt_codec.parse_generation(generation)
+            if isinstance(self.value_function, TargetLogLikelihood):
+                target = self._target_output()
+                token_logprobs = self.model.score(prompt, target, tools=tools, images=images)
+                parsed_generation: Generation = LogProbGeneration(output=target, token_logprobs=tuple(token_logprobs))
+            else:
+                generation = self.model.generate(prompt, tools=tools, images=images)
+                parsed_generation = self.prompt_codec.parse_generation(generation)
         except Exception as exc:
-            if self.use_cache and future is not None and owner:
+            self.metrics.record_failure()
+            monitoring.observe_generation(*self._monitoring_labels, time.perf_counter() - start, ok=False)
+            if future is not None and owner:
+                with self._cache_lock: self._inflight.pop(frozen_coalition, None)
                 future.set_exception(exc)
-                with self._cache_lock:
-                    if self.cache.get(frozen_coalition) is future:
-                        self.cache.pop(frozen_coalition, None)
             raise
-        if self.use_cache and future is not None and owner:
-            future.set_result(parsed_generation)
+        duration = time.perf_counter() - start
+        self.metrics.record_generation(duration)
+        monitoring.observe_generation(*self._monitoring_labels, duration)
+        if future is not None and owner:
             with self._cache_lock:
-                self.cache[frozen_coalition] = parsed_generation
+                self.cache.put(frozen_coalition, parsed_generation)
+                self._inflight.pop(frozen_coalition, None)
+            future.set_result(parsed_generation)
+        if self._journal is not None:
+            self._journal.record(frozen_coalition, parsed_generation)
         if self.logging:
-            self._log(prompt, parsed_generation)
+            self._log(prompt, parsed_generation, frozen_coalition, started_at, duration)
         return parsed_generation
 
-    def _log(self, prompt, parsed_generation):
-        os.makedirs("logs", exist_ok=True)
-        log_data = {
-                "prompt": prompt,
-                "generation": asdict(parsed_generation)
-            }
+    def _target_output(self) -> str:
+        """Return the output scored by ``TargetLogLikelihood``, generating it once from the full prompt if needed."""
+        assert isinstance(self.value_function, TargetLogLikelihood)
+        if self.value_function.target is not None: return self.value_function.target
+        with self._target_lock:
+            owner = self._target_future is None
+            if owner: self._target_future = Future()
+            future = self._target_future
+        assert future is not None
+        if not owner: return future.result()
+        try:
+            coalition = self.data_handler.get_keys()
+            prompt = self.prompt_codec.build_prompt(self.data_handler, coalition)
+            generation = self.model.generate(prompt,
+                                             tools=self.data_handler.tool_list(coalition),
+                                             images=self.data_handler.image_list(coalition))
+            target = self.prompt_codec.parse_generation(generation).output
+        except Exception as exc:
+            future.set_exception(exc)
+            with self._target_lock: self._target_future = None
+            raise
+        if self._journal is not None: self._journal.record_target(target)
+        future.set_result(target)
+        return target
+
+    def _fingerprint(self) -> str:
+        """Identify the prompt, model and generation setup so a journal is never replayed into a different attribution."""
+        prompt = self.prompt_codec.build_prompt(self.data_handler, self.data_handler.get_keys())
+        scoring = isinstance(self.value_function, TargetLogLikelihood)
+        mode = "score" if scoring else "generate"
+        target = self.value_function.target if scoring else None # type: ignore[union-attr]
+        return hashlib.sha256(json.dumps([mode, target, self._model_identity(scoring), prompt], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def _model_identity(self, scoring: bool = False) -> dict[str, Any]:
+        """Model class and the settings that change its generations (or, when ``scoring``, its scores)."""
+        settings = [name for name in _MODEL_SETTINGS if not (scoring and name in _SAMPLING_SETTINGS)]
+        return {"type": f"{type(self.model).__module__}:{type(self.model).__qualname__}",
+                **{name: getattr(self.model, name) for name in settings if hasattr(self.model, name)}}
+
+    def _open_journal(self, journal: CoalitionJournal) -> None:
+        """Replay ``journal`` into the cache and record every new generation to it. Enables ``use_cache``."""
+        generations, target = journal.open(self._fingerprint())
+        self.use_cache = True
+        with self._cache_lock:
+            for coalition, generation in generations.items(): self.cache.put(coalition, generation)
+        if target is not None:
+            with self._target_lock:
+                self._target_future = Future()
+                self._target_future.set_result(target)
+        self._journal = journal
 
-        log_path = os.path.join("logs", f"{self.log_filename}.jsonl")
+    def _close_journal(self) -> None:
+        if self._journal is not None: self._journal.close()
+        self._journal = None
 
-        with self._log_lock:
-            with open(log_path, "a", encoding="utf-8") as f:
-                json.dump(log_data, f, indent=4, ensure_ascii=False)
-                f.write("\n")
+    def _log(self, prompt, parsed_generation, coalition, started_at: float, duration: float) -> None:
+        if self.log_writer is None: return
+        self.log_writer.write({
+            "coalition": sorted(coalition),
+            "started_at": started_at,
+            "duration": duration,
+            "prompt": prompt,
+            "generation": asdict(parsed_generation),
+        })
 
-    def _add_feature_score(self, feature, score) -> None:
+    def _add_feature_score(self, feature, score, result: Optional[ResultMapping] = None) -> None:
+        result = self.result if result is None else result
         for key, value in self.data_handler.get_data(feature, mask=False, exclude_permanent_keys=True).items():
-            self.result[key] = {
+            result[key] = {
                 "value": value,
                 "score": score
             }
@@ -1,16 +1,24 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
 from itertools import combinations
-from math import ceil, comb, factorial
+from math import ceil, comb, factorial, sqrt
 import random
+import sys
 
-from llmSHAP.types import Index, Iterable, Set, Dict, Tuple, List
+from llmSHAP.types import Index, Iterable, Set, Dict, Tuple, List, FrozenSet, Optional
 
 
 class CoalitionSampler(ABC):
     @abstractmethod
     def __call__(self, feature: Index, variable_keys: List[Index]) -> Iterable[Tuple[Set[Index], float]]: ...
 
+    def observe(self, feature: Index, coalition: Set[Index], delta: float) -> None:
+        """Called with every completed marginal contribution ``v(S + feature) - v(S)``. No-op by default."""
+
+    def count(self, feature: Index, keys: List[Index]) -> Optional[int]:
+        """Number of coalitions ``__call__`` yields for ``feature`` (``None`` if unknown). Used for progress and ETA."""
+        return None
+
 
 class CounterfactualSampler(CoalitionSampler):
     def __init__(self):
@@ -20,6 +28,9 @@ class CounterfactualSampler(CoalitionSampler):
         coalition = {k for k in keys if k != feature}
         yield coalition, 1.0
 
+    def count(self, feature: Index, keys: List[Index]) -> int:
+        return 1
+
 
 class FullEnumerationSampler(CoalitionSampler):
     def __init__(self, num_players: int):
@@ -35,9 +46,24 @@ class FullEnumerationSampler(CoalitionSampler):
             for coalition in combinations(features, coalition_size):
                 yield set(coalition), weight
 
+    def count(self, feature: Index, keys: List[Index]) -> int:
+        return 2 ** sum(1 for key in keys if key != feature)
+
 
 class SlidingWindowSampler(CoalitionSampler):
-    def __init__(self, ordered_keys: List[Index], w_size: int, stride: int = 1):
+    """
+    Coalitions restricted to sliding windows over ``ordered_keys``.
+
+    With ``plan=True`` the distinct final coalitions (window subset plus every key
+    outside the window) are enumerated once at construction and shared across
+    features: ``plan_coalitions`` holds each distinct coalition once and
+    ``feature_plan(feature)`` returns ``(without_index, with_index, weight)`` entries
+    into it. Overlapping windows emit the same coalitions for many features, so the
+    plan amortizes the set construction for long sequences with small ``w_size``.
+    The plan assumes the sampler is called with ``ordered_keys`` as the
+    non-permanent keys and falls back to on-the-fly enumeration otherwise.
+    """
+    def __init__(self, ordered_keys: List[Index], w_size: int, stride: int = 1, plan: bool = False):
         assert w_size >= 1, "w_size must be >= 1"
         self.ordered_keys = ordered_keys
         self.w_size = w_size
@@ -55,7 +81,12 @@ class SlidingWindowSampler(CoalitionSampler):
 
         self._factorials = {key: factorial(key) for key in range(w_size + 1)}
 
-    def __call__(self, feature: Index, non_permanent_keys: List[Index]):
+        self.plan_coalitions: List[FrozenSet[Index]] = []
+        self._feature_plans: Dict[Index, List[Tuple[int, int, float]]] | None = None
+        self._planned_keys = frozenset(ordered_keys)
+        if plan: self._build_plan()
+
+    def _window_coalitions(self, feature: Index, non_permanent_keys: Iterable[Index]):
         window_ids = self.feature2wins.get(feature, [])
         if not window_ids: return
 
@@ -63,20 +94,124 @@ class SlidingWindowSampler(CoalitionSampler):
         for win_id in window_ids:
             window = self.windows[win_id]
             window_features = [key for key in window if key != feature]
-            outside = set(non_permanent_keys) - set(window)
+            outside = frozenset(non_permanent_keys) - set(window)
 
             for coalition_size in range(len(window_features) + 1):
                 weight = (self._factorials[coalition_size] * self._factorials[len(window) - coalition_size - 1] / self._factorials[len(window)]) * avg_factor
                 for coalition in combinations(window_features, coalition_size):
-                    final_set = set(coalition) | outside
-                    yield final_set, weight
+                    yield outside.union(coalition), weight
+
+    def _build_plan(self) -> None:
+        coalition_ids: Dict[FrozenSet[Index], int] = {}
+        def plan_index(coalition: FrozenSet[Index]) -> int:
+            index = coalition_ids.get(coalition)
+            if index is None:
+                index = coalition_ids[coalition] = len(self.plan_coalitions)
+                self.plan_coalitions.append(coalition)
+            return index
+
+        self._feature_plans = {}
+        for feature in self.ordered_keys:
+            self._feature_plans[feature] = [(plan_index(coalition), plan_index(coalition | {feature}), weight)
+                                            for coalition, weight in self._window_coalitions(feature, self.ordered_keys)]
+
+    def feature_plan(self, feature: Index) -> List[Tuple[int, int, float]]:
+        """Return ``(without_index, with_index, weight)`` entries into ``plan_coalitions`` for ``feature``."""
+        if self._feature_plans is None: raise RuntimeError("SlidingWindowSampler was created without plan=True.")
+        return self._feature_plans.get(feature, [])
+
+    def count(self, feature: Index, non_permanent_keys: List[Index]) -> int:
+        return sum(2 ** (len(self.windows[win_id]) - 1) for win_id in self.feature2wins.get(feature, []))
+
+    def __call__(self, feature: Index, non_permanent_keys: List[Index]):
+        if self._feature_plans is not None and frozenset(non_permanent_keys) == self._planned_keys:
+            for without_index, _, weight in self._feature_plans.get(feature, []):
+                yield self.plan_coalitions[without_index], weight
+            return
+        for coalition, weight in self._window_coalitions(feature, non_permanent_keys):
+            yield set(coalition), weight
+
+
+def unrank_combination(rank: int, n: int, k: int) -> List[int]:
+    """Return the ``rank``-th (lexicographic, 0-based) ``k``-subset of ``range(n)`` as sorted positions."""
+    positions: List[int] = []
+    position = 0
+    for remaining in range(k, 0, -1):
+        while True:
+            count = comb(n - position - 1, remaining - 1)
+            if rank < count: break
+            rank -= count
+            position += 1
+        positions.append(position)
+        position += 1
+    return positions
+
+
+class _StratumVariance:
+    """Welford accumulator for one stratum (or antithetic stratum pair) of a ``StratifiedSampler``."""
+    def __init__(self, sample_count: int, population: int, scale: float) -> None:
+        self.sample_count = sample_count
+        self.population = population
+        self.scale = scale
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self) -> float:
+        """Variance of this stratum's share of the estimate (with finite population correction)."""
+        if self.count < 2: return 0.0
+        return (1 - self.sample_count / self.population) * (self.m2 / (self.count - 1)) / self.sample_count
 
 
 class StratifiedSampler(CoalitionSampler):
-    def __init__(self, sampling_ratio: float, seed: int | None = None):
+    """
+    Samples ``ceil(sampling_ratio * C(n-1, s))`` coalitions from every stratum ``s``.
+
+    Coalitions are drawn without rejection: distinct ranks are sampled from
+    ``range(C(n-1, s))`` and each rank is mapped to its subset by combinatorial
+    unranking, so no draws are wasted when ``sampling_ratio`` is close to 1. With
+    ``streaming=True`` ranks are drawn with Floyd's algorithm and emitted in
+    lexicographic order, which needs only O(sample_count) time and memory even for
+    strata with billions of subsets (n >= 35). Strata too large for ``random.sample``
+    always use the streaming path.
+
+    With ``antithetic=True`` every sampled coalition ``S`` is paired with its
+    complement ``N \\ S \\ {i}`` in the mirrored stratum (in the middle stratum,
+    pairs are drawn from the coalitions containing a fixed player so no pair is
+    drawn twice). For roughly symmetric games the two marginal contributions are
+    negatively correlated, which lowers the variance of the estimate at the same
+    number of LLM calls.
+
+    ``ShapleyAttribution`` reports every completed marginal contribution through
+    ``observe``; ``variance_estimate(feature)`` then returns the empirical variance
+    of the stratified estimate (0 for fully enumerated strata; strata or pairs
+    with a single draw contribute nothing).
+    """
+    def __init__(self, sampling_ratio: float, seed: int | None = None, streaming: bool = False, antithetic: bool = False):
         assert 0 < sampling_ratio <= 1, "sampling_ratio must be in (0,1]"
         self.rng = random.Random(seed)
         self.sampling_ratio = sampling_ratio
+        self.streaming = streaming
+        self.antithetic = antithetic
+        self._others: Dict[Index, FrozenSet[Index]] = {}
+        self._strata: Dict[Index, Dict[int, _StratumVariance]] = {}
+        self._open_pairs: Dict[Index, Dict[FrozenSet[FrozenSet[Index]], float]] = {}
+
+
+    def _sample_ranks(self, total_count: int, sample_count: int) -> Iterable[int]:
+        if not self.streaming and total_count <= sys.maxsize:
+            return self.rng.sample(range(total_count), sample_count)
+        chosen: set[int] = set()
+        for upper in range(total_count - sample_count, total_count): # Floyd's algorithm.
+            rank = self.rng.randrange(upper + 1)
+            chosen.add(upper if rank in chosen else rank)
+        return sorted(chosen)
 
 
     def _sample_coalitions(self,
@@ -88,20 +223,80 @@ class StratifiedSampler(CoalitionSampler):
             for coalition in combinations(others, coalition_size):
                 yield set(coalition)
             return
-        drawn: set[frozenset[Index]] = set()
-        while len(drawn) < sample_count:
-            coalition = frozenset(self.rng.sample(others, coalition_size))
-            drawn.add(coalition)
-        for coalition in drawn:
-            yield set(coalition)
+        for rank in self._sample_ranks(total_count, sample_count):
+            yield {others[position] for position in unrank_combination(rank, len(others), coalition_size)}
 
 
     def __call__(self, feature: Index, keys: List[Index]):
         others = [key for key in keys if key != feature]
         num_strata = len(others) + 1
+        self._others[feature] = frozenset(others)
+        self._strata[feature] = {}
+        self._open_pairs[feature] = {}
+        if self.antithetic and others:
+            yield from self._antithetic_coalitions(feature, others)
+            return
         for coalition_size in range(num_strata):
             total_count = comb(len(others), coalition_size)
             sample_count = ceil(self.sampling_ratio * total_count)
             weight = 1.0 / (num_strata * sample_count)
+            self._strata[feature][coalition_size] = _StratumVariance(sample_count, total_count, 1.0 / num_strata)
             for coalition in self._sample_coalitions(others, coalition_size, sample_count,total_count):
                 yield coalition, weight
+
+
+    def count(self, feature: Index, keys: List[Index]) -> int:
+        others = sum(1 for key in keys if key != feature)
+        if not (self.antithetic and others):
+            return sum(ceil(self.sampling_ratio * comb(others, size)) for size in range(others + 1))
+        num_strata = others + 1
+        return sum(2 * ceil(self.sampling_ratio * (comb(others, size) if size < others - size else comb(others, size) // 2))
+                   for size in range(num_strata // 2 + num_strata % 2))
+
+
+    def _antithetic_coalitions(self, feature: Index, others: List[Index]):
+        num_strata = len(others) + 1
+        all_others = set(others)
+        for coalition_size in range(num_strata // 2 + num_strata % 2):
+            mirrored_size = len(others) - coalition_size
+            total_count = comb(len(others), coalition_size)
+            if coalition_size < mirrored_size:
+                sample_count = ceil(self.sampling_ratio * total_count)
+                weight = 1.0 / (num_strata * sample_count)
+                self._strata[feature][coalition_size] = _StratumVariance(sample_count, total_count, 1.0 / num_strata)
+                coalitions = self._sample_coalitions(others, coalition_size, sample_count, total_count)
+            else: # Middle stratum: the complement is in the same stratum, so draw pairs via others[0].
+                pair_count = total_count // 2
+                sample_count = ceil(self.sampling_ratio * pair_count)
+                weight = 1.0 / (num_strata * 2 * sample_count)
+                self._strata[feature][coalition_size] = _StratumVariance(sample_count, pair_count, 1.0 / (2 * num_strata))
+                coalitions = ({others[0]} | coalition for coalition in self._sample_coalitions(others[1:], coalition_size - 1, sample_count, pair_count))
+            for coalition in coalitions:
+                yield coalition, weight
+                yield all_others - coalition, weight
+
+
+    def observe(self, feature: Index, coalition: Set[Index], delta: float) -> None:
+        others = self._others.get(feature)
+        if others is None: return
+        members = frozenset(coalition)
+        if not self.antithetic:
+            stratum = self._strata[feature].get(len(members))
+            if stratum is not None: stratum.add(stratum.scale * delta)
+            return
+        complement = others - members
+        stratum = self._strata[feature].get(min(len(members), len(complement)))
+        if stratum is None: return
+        pair = frozenset((members, complement))
+        open_pairs = self._open_pairs[feature]
+        if pair not in open_pairs: open_pairs[pair] = delta; return
+        stratum.add(stratum.scale * (open_pairs.pop(pair) + delta))
+
+
+    def variance_estimate(self, feature: Index) -> float:
+        """Empirical variance of the Shapley value estimate for ``feature`` (from observed contributions)."""
+        return sum(stratum.variance() for stratum in self._strata.get(feature, {}).values())
+
+
+    def standard_error(self, feature: Index) -> float:
+        return sqrt(self.variance_estimate(feature))
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from concurrent.futures import Future
+
+from llmSHAP.types import Any, Callable, Dict, List
+from llmSHAP.generation import Generation
+
+
+class OutputTable:
+    """
+    Interns generations by output digest and values each distinct output exactly once.
+
+    Short-answer tasks produce only a handful of distinct outputs across thousands of
+    coalitions. ``ShapleyAttribution`` interns every coalition generation into a
+    compact integer id and evaluates the value function once per id, so scoring
+    cost is O(distinct outputs) instead of O(coalitions). The digest covers the
+    generation type and the canonical (dataclass) representation of all fields, so
+    custom ``Generation`` subclasses are only merged when every field matches.
+
+    Args:
+        score: Value of a generation against the (fixed) base generation. ``ShapleyAttribution``
+            returns a tuple with one value per value function.
+    """
+    def __init__(self, score: Callable[[Generation], Any]) -> None:
+        self._score = score
+        self._lock = threading.Lock()
+        self._ids: Dict[bytes, int] = {}
+        self._values: List[Future[Any]] = []
+        self._failed: Dict[bytes, int] = {} # Ids whose valuation raised, reused when the output is retried.
+
+    @staticmethod
+    def digest(generation: Generation) -> bytes:
+        canonical = generation.output if type(generation) is Generation else repr(generation) # repr includes the type.
+        return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).digest()
+
+    def intern(self, generation: Generation) -> int:
+        """Return the id of ``generation``'s output, valuing it first if it has not been seen.
+
+        If valuing fails, the error is raised to every caller waiting on it and the output is
+        forgotten, so the next caller values it again (under the same id).
+        """
+        key = self.digest(generation)
+        with self._lock:
+            output_id = self._ids.get(key)
+            owner = output_id is None
+            if owner:
+                output_id = self._failed.pop(key, len(self._values))
+                self._ids[key] = output_id
+                if output_id == len(self._values): self._values.append(Future())
+                else: self._values[output_id] = Future()
+            assert output_id is not None
+            future = self._values[output_id]
+        if owner:
+            try: future.set_result(self._score(generation))
+            except Exception as exc:
+                with self._lock:
+                    del self._ids[key]
+                    self._failed[key] = output_id
+                future.set_exception(exc)
+                raise
+        else: future.result()
+        return output_id
+
+    def value(self, output_id: int) -> Any:
+        return self._values[output_id].result()
+
+    def values(self) -> List[Any]:
+        """Values of all interned outputs, indexed by id."""
+        with self._lock: futures = list(self._values)
+        return [future.result() for future in futures]
+
+    def __len__(self) -> int:
+        with self._lock: return len(self._values)
@@ -1,17 +1,62 @@
 import time
-from tqdm.auto import tqdm
-from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
 from math import fsum
 
 from llmSHAP.prompt_codec import PromptCodec
 from llmSHAP.llm.llm_interface import LLMInterface
 from llmSHAP.attribution_methods.attribution_function import AttributionFunction
 from llmSHAP.attribution_methods.coalition_sampler import CoalitionSampler, FullEnumerationSampler
+from llmSHAP.attribution_methods.output_table import OutputTable
 from llmSHAP.data_handler import DataHandler
 from llmSHAP.generation import Generation
 from llmSHAP.attribution import Attribution
 from llmSHAP.value_functions import ValueFunction
-from llmSHAP.types import Index, Optional
+from llmSHAP.log_writer import JSONLLogWriter
+from llmSHAP.journal import CoalitionJournal
+from llmSHAP.cache import BoundedCache
+from llmSHAP.metrics import AttributionMetrics
+from llmSHAP import monitoring
+from llmSHAP.types import Any, Index, Iterable, Optional, List, Sequence
+
+
+class _NullProgress:
+    """Stand-in for a disabled ``tqdm`` bar, so quiet runs never import tqdm."""
+    def __init__(self, iterable: Optional[Iterable[Any]] = None) -> None:
+        self.iterable = iterable
+
+    def __iter__(self): return iter(self.iterable or ())
+    def __enter__(self) -> "_NullProgress": return self
+    def __exit__(self, *exc_info: Any) -> None: pass
+    def update(self, n: int = 1) -> None: pass
+    def set_postfix_str(self, s: str = "", refresh: bool = True) -> None: pass
+
+
+def _progress(verbose: bool, iterable: Optional[Iterable[Any]] = None, **kwargs: Any) -> Any:
+    if not verbose: return _NullProgress(iterable)
+    from tqdm.auto import tqdm
+    return tqdm(iterable, **kwargs)
+
+
+class _StreamingSum:
+    """Exactly rounded running sum (Shewchuk's algorithm, as used by ``math.fsum``) in O(partials) memory."""
+    def __init__(self) -> None:
+        self._partials: List[float] = []
+
+    def add(self, x: float) -> None:
+        i = 0
+        for y in self._partials:
+            if abs(x) < abs(y): x, y = y, x
+            high = x + y
+            low = y - (high - x)
+            if low:
+                self._partials[i] = low
+                i += 1
+            x = high
+        self._partials[i:] = [x]
+
+    def value(self) -> float:
+        return fsum(self._partials)
 
 
 class ShapleyAttribution(AttributionFunction):
@@ -25,7 +70,10 @@ class ShapleyAttribution(AttributionFunction):
         verbose: bool = True,
         logging: bool = False,
         num_threads: int = 1,
-        value_function: Optional[ValueFunction] = None,
+        value_function: Optional[ValueFunction | Sequence[ValueFunction]] = None,
+        log_writer: Optional[JSONLLogWriter] = None,
+        cache: Optional[BoundedCache] = None,
+        max_in_flight: Optional[int] = None,
     ):
         super().__init__(
             model,
@@ -35,45 +83,152 @@ class ShapleyAttribution(AttributionFunction):
             verbose=verbose,
             logging=logging,
             value_function=value_function,
+            log_writer=log_writer,
+            cache=cache,
         )
         self.num_threads = num_threads
         self.num_players = len(self.data_handler.get_keys(exclude_permanent_keys=True))
         self.sampler = sampler or FullEnumerationSampler(self.num_players)
+        self.max_in_flight = max(1, max_in_flight or 4 * max(1, num_threads - 1))
+        self.output_table: Optional[OutputTable] = None
+
+
+
+    def _compute_marginal_contribution(self, coalition_set: set[Index], feature: Index, output_table: OutputTable) -> tuple[int, int]:
+        """Generate both coalitions of a marginal contribution and return their output ids (with, without)."""
+        try:
+            without_id = output_table.intern(self._get_output(coalition_set))
+            with_id = output_table.intern(self._get_output(coalition_set | {feature}))
+            return with_id, without_id
+        finally:
+            if self.use_cache: self._unpin_pair(coalition_set, feature)
+
+
+    def _pin_pair(self, coalition_set: set[Index], feature: Index) -> None:
+        """Keep both generations of a scheduled marginal contribution cached until it completes."""
+        self.cache.pin(self._cache_key(coalition_set))
+        self.cache.pin(self._cache_key(coalition_set | {feature}))
+
+
+    def _unpin_pair(self, coalition_set: set[Index], feature: Index) -> None:
+        self.cache.unpin(self._cache_key(coalition_set))
+        self.cache.unpin(self._cache_key(coalition_set | {feature}))
+
+
+    def coalition_values(self, metric: int = 0) -> dict[frozenset, float]:
+        """
+        Value of every cached coalition generation from the last ``attribution()`` run.
+
+        Coalitions include the permanent indexes. Requires ``use_cache=True`` (otherwise
+        generations are not retained and the table is empty). ``metric`` selects the
+        value function when several were given.
+        """
+        output_table = self.output_table
+        if output_table is None: return {}
+        return {coalition: output_table.value(output_table.intern(generation))[metric] for coalition, generation in self.cache.items()}
+
+
+    def attribution(self, resume: str | CoalitionJournal | None = None):
+        """
+        Compute the attribution.
+
+        Returns an ``Attribution``, or one ``Attribution`` per value function (in order)
+        when ``value_function`` is a list. Every value function scores the same coalition
+        generations, so extra metrics add no model calls.
+
+        Args:
+            resume: Optional journal (or journal path). Generations already recorded in it
+                are replayed into the cache and every new generation is appended to it, so an
+                interrupted run can be restarted with the same argument and only the missing
+                coalitions are generated. Implies ``use_cache=True``.
+        """
+        if resume is not None: self._open_journal(resume if isinstance(resume, CoalitionJournal) else CoalitionJournal(resume))
+        try:
+            return self._run_attribution()
+        finally:
+            self._close_journal()
+
+
+    def _new_metrics(self) -> AttributionMetrics:
+        keys = self.data_handler.get_keys(exclude_permanent_keys=True)
+        features = [feature for feature in self.data_handler.get_keys() if feature not in self.data_handler.permanent_indexes]
+        counts = [self.sampler.count(feature, keys) for feature in features]
+        retry_count = getattr(self.model, "retry_count", None)
+        return AttributionMetrics(features_total=len(features),
+                                  contributions_total=None if None in counts else sum(counts), # type: ignore[arg-type]
+                                  retry_counter=(lambda: self.model.retry_count) if isinstance(retry_count, int) else None) # type: ignore[attr-defined]
+
+
+    def _update_progress(self, progress_bar: Any, feature_number: int) -> None:
+        snapshot = self.metrics.snapshot()
+        progress_bar.set_postfix_str(f"feature {feature_number}/{snapshot.features_total}, {snapshot.requests_per_second:.1f} req/s, "
+                                     f"hit {snapshot.cache_hit_rate:.0%}, in-flight {snapshot.in_flight}, retries {snapshot.retries}", refresh=False)
 
 
+    def _feature_value(self, feature: Index, output_table: OutputTable, progress_bar: Any) -> List[float]:
+        """
+        Stream the sampler's coalitions for ``feature`` through the worker pool.
 
-    def _compute_marginal_contribution(self, coalition_set: set[Index], feature: Index, weight: float, base_future: Future):
-        generation_without = self._get_output(coalition_set)
-        generation_with = self._get_output(coalition_set | {feature})
-        base_generation: Generation = base_future.result()
-        return weight * (self._v(base_generation, generation_with) - self._v(base_generation, generation_without))
+        At most ``max_in_flight`` marginal contributions are scheduled at once; new
+        coalitions are pulled from the sampler only as earlier ones complete, and
+        contributions are reduced into an exact running sum, so memory stays flat
+        regardless of the number of coalitions. Returns one value per value function;
+        the sampler observes the contributions of the first.
+        """
+        coalitions = iter(self.sampler(feature, self.data_handler.get_keys(exclude_permanent_keys=True)))
+        pending: dict[Future, tuple[set[Index], float]] = {}
+        totals = [_StreamingSum() for _ in self.value_functions]
+        metrics = self.metrics
+        feature_number = metrics.snapshot().features_done + 1
+        with ThreadPoolExecutor(max_workers = max(1, self.num_threads - 1)) as executor:
+            while True:
+                for coalition_set, weight in islice(coalitions, self.max_in_flight - len(pending)):
+                    if self.use_cache: self._pin_pair(coalition_set, feature)
+                    pending[executor.submit(self._compute_marginal_contribution, coalition_set, feature, output_table)] = (coalition_set, weight)
+                    metrics.contribution_scheduled()
+                if not pending: break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    coalition_set, weight = pending.pop(future)
+                    with_id, without_id = future.result()
+                    with_values, without_values = output_table.value(with_id), output_table.value(without_id)
+                    for total, with_value, without_value in zip(totals, with_values, without_values):
+                        total.add(weight * (with_value - without_value))
+                    self.sampler.observe(feature, coalition_set, with_values[0] - without_values[0])
+                    metrics.contribution_done()
+                if self.verbose:
+                    self._update_progress(progress_bar, feature_number)
+                    progress_bar.update(len(done))
+        return [total.value() for total in totals]
 
 
-    def attribution(self):
+    def _run_attribution(self):
         start = time.perf_counter()
+        metrics = self.metrics = self._new_metrics()
+        self._monitoring_labels = (self._monitoring_labels[0], type(self.sampler).__name__)
+        evictions_at_start = self.cache.stats().evictions
         with ThreadPoolExecutor(max_workers = 1) as base_executor:
             base_future: Future = base_executor.submit(self._get_output, self.data_handler.get_keys())
             empty_future: Future = base_executor.submit(self._get_output, set())
-            with tqdm(self.data_handler.get_keys(), desc="Features", position=0, leave=False, disable=not self.verbose,) as feature_bar:
-                for feature in feature_bar:
-                    if feature in self.data_handler.permanent_indexes: self._add_feature_score(feature, 0); continue
-                    shapley_value = 0.0
-                    tasks = []
-                    with ThreadPoolExecutor(max_workers = max(1, self.num_threads - 1)) as executor:
-                        for coalition_set, weight in list(self.sampler(feature, self.data_handler.get_keys(exclude_permanent_keys=True))):
-                            tasks.append(executor.submit(self._compute_marginal_contribution, coalition_set, feature, weight, base_future))
-
-                        with tqdm(total=len(tasks), desc=f"Coalitions", position=1, leave=False, disable=not self.verbose) as coalition_bar:
-                            contributions = []
-                            for future in as_completed(tasks):
-                                contributions.append(future.result())
-                                coalition_bar.update(1)
-                    shapley_value = fsum(contributions)
-                    self._add_feature_score(feature, shapley_value)
+            output_table = self.output_table = OutputTable(lambda generation: self._evaluate(base_future.result(), generation))
+            with _progress(self.verbose, total=metrics.contributions_total, desc="Attribution", unit="contribution", leave=False) as progress_bar:
+                for feature in self.data_handler.get_keys():
+                    if feature in self.data_handler.permanent_indexes:
+                        for result in self.results: self._add_feature_score(feature, 0, result)
+                        continue
+                    for result, shapley_value in zip(self.results, self._feature_value(feature, output_table, progress_bar)):
+                        self._add_feature_score(feature, shapley_value, result)
+                    metrics.feature_done()
             base_generation: Generation = base_future.result()
             empty_generation: Generation = empty_future.result()
-        grand_coalition_value = self._v(base_generation, base_generation)
-        empty_baseline_value = self._v(base_generation, empty_generation)
+        grand_coalition_values = output_table.value(output_table.intern(base_generation))
+        empty_baseline_values = output_table.value(output_table.intern(empty_generation))
+        if self.log_writer is not None: self.log_writer.flush()
+        monitoring.count_cache_evictions(*self._monitoring_labels, self.cache.stats().evictions - evictions_at_start)
+        metrics.finish()
         stop = time.perf_counter()
         if self.verbose: print(f"Time ({self.num_players} features): {(stop - start):.2f} seconds.")
-        return Attribution(self.result, base_generation.output, empty_baseline_value, grand_coalition_value)
+        snapshot = metrics.snapshot()
+        attributions = [Attribution(result, base_generation.output, empty_baseline_value, grand_coalition_value, metrics=snapshot)
+                        for result, empty_baseline_value, grand_coalition_value in zip(self.results, empty_baseline_values, grand_coalition_values)]
+        return attributions if self.multi_metric else attributions[0]
@@ -0,0 +1,238 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, fields, is_dataclass
+
+from llmSHAP.types import Any, Callable, Dict, Optional
+
+
+def approximate_nbytes(value: Any) -> int:
+    """Approximate the payload size of a cached value (UTF-8 text, bytes and numeric fields of dataclasses)."""
+    if isinstance(value, str): return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)): return len(value)
+    if isinstance(value, (int, float, bool)) or value is None: return 8
+    if isinstance(value, (tuple, list)): return sum(approximate_nbytes(item) for item in value)
+    if is_dataclass(value) and not isinstance(value, type):
+        return sum(approximate_nbytes(getattr(value, field.name)) for field in fields(value))
+    return sys.getsizeof(value)
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """Point-in-time counters of a ``BoundedCache``."""
+    hits: int
+    misses: int
+    evictions: int
+    inflight_joins: int
+    entries: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class BoundedCache:
+    """
+    Thread-safe cache with optional entry and byte bounds.
+
+    Entries are evicted by least-recently-used (``policy="lru"``) or
+    least-frequently-used (``policy="lfu"``, ties broken by age) order once either
+    ``max_entries`` or ``max_bytes`` is exceeded. Entry sizes are measured with
+    ``sizeof`` (default: ``approximate_nbytes``). Pinned keys are never evicted;
+    pins are reference counted and may be taken before the key is stored, so work
+    that is scheduled but not finished can protect the entries it will read. If all
+    remaining entries are pinned, the cache temporarily exceeds its bounds.
+
+    Args:
+        max_entries: Maximum number of stored entries. ``None`` means unbounded.
+        max_bytes: Maximum total size of stored entries. ``None`` means unbounded.
+        policy: ``"lru"`` or ``"lfu"``.
+        sizeof: Function returning the size of a stored value in bytes.
+    """
+    def __init__(self,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 policy: str = "lru",
+                 sizeof: Callable[[Any], int] = approximate_nbytes,) -> None:
+        if policy not in {"lru", "lfu"}: raise ValueError("policy must be 'lru' or 'lfu'.")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.sizeof = sizeof
+        self._lock = threading.RLock()
+        self._data: Dict[Any, Any] = {}
+        self._sizes: Dict[Any, int] = {}
+        self._pins: Dict[Any, int] = {}
+        self._order: OrderedDict[Any, None] = OrderedDict()        # LRU recency order.
+        self._frequency: Dict[Any, int] = {}                        # LFU use counts.
+        self._buckets: Dict[int, OrderedDict[Any, None]] = {}       # LFU count -> keys by age.
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._inflight_joins = 0
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the stored value (counting a hit) or ``default`` (counting a miss)."""
+        with self._lock:
+            if key not in self._data:
+                self._misses += 1
+                return default
+            self._hits += 1
+            self._touch(key)
+            return self._data[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        """Store ``value`` and evict unpinned entries until the cache is within its bounds."""
+        with self._lock:
+            if key in self._data: self._discard(key)
+            size = self.sizeof(value)
+            self._data[key] = value
+            self._sizes[key] = size
+            self._bytes += size
+            if self.policy == "lru": self._order[key] = None
+            else:
+                self._frequency[key] = 1
+                self._buckets.setdefault(1, OrderedDict())[key] = None
+            self._evict(protect=key)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.put(key, value)
+
+    def pop(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data: return default
+            value = self._data[key]
+            self._discard(key)
+            return value
+
+    def items(self) -> list[tuple[Any, Any]]:
+        """Snapshot of the stored ``(key, value)`` pairs (does not count as use)."""
+        with self._lock: return list(self._data.items())
+
+    def __contains__(self, key: Any) -> bool:
+        with self._lock: return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock: return len(self._data)
+
+    def clear(self) -> None:
+        """Remove all entries (pins and counters are kept)."""
+        with self._lock:
+            for key in list(self._data): self._discard(key)
+
+    def pin(self, key: Any) -> None:
+        """Protect ``key`` from eviction until a matching ``unpin``."""
+        with self._lock: self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: Any) -> None:
+        with self._lock:
+            count = self._pins.get(key, 0) - 1
+            if count > 0: self._pins[key] = count
+            else: self._pins.pop(key, None)
+            self._evict()
+
+    def record_inflight_join(self) -> None:
+        """Count a lookup that joined a value that is still being computed by another thread."""
+        with self._lock: self._inflight_joins += 1
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits,
+                              misses=self._misses,
+                              evictions=self._evictions,
+                              inflight_joins=self._inflight_joins,
+                              entries=len(self._data),
+                              bytes=self._bytes)
+
+    def _touch(self, key: Any) -> None:
+        if self.policy == "lru":
+            self._order.move_to_end(key)
+            return
+        count = self._frequency[key]
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket: del self._buckets[count]
+        self._frequency[key] = count + 1
+        self._buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def _discard(self, key: Any) -> None:
+        del self._data[key]
+        self._bytes -= self._sizes.pop(key)
+        if self.policy == "lru":
+            del self._order[key]
+            return
+        count = self._frequency.pop(key)
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket: del self._buckets[count]
+
+    def _over_bounds(self) -> bool:
+        return ((self.max_entries is not None and len(self._data) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes))
+
+    def _eviction_order(self):
+        if self.policy == "lru": yield from self._order
+        else:
+            for count in sorted(self._buckets): yield from self._buckets[count]
+
+    def _evict(self, protect: Any = None) -> None:
+        """Evict unpinned entries in policy order. ``protect`` (the entry being stored) is kept."""
+        if not self._over_bounds(): return
+        victims = []
+        projected_entries, projected_bytes = len(self._data), self._bytes
+        for key in self._eviction_order():
+            if key in self._pins or key == protect: continue
+            victims.append(key)
+            projected_entries -= 1
+            projected_bytes -= self._sizes[key]
+            if ((self.max_entries is None or projected_entries <= self.max_entries)
+                    and (self.max_bytes is None or projected_bytes <= self.max_bytes)): break
+        for key in victims:
+            self._discard(key)
+            self._evictions += 1
+
+
+
+class ScoreCache:
+    """
+    Thread-safe cache of value-function scores keyed by digests of the compared outputs.
+
+    Keys are ``(namespace, digest(first), digest(second))`` with 16-byte BLAKE2b
+    digests, so long outputs are not retained and no instance is kept alive by the
+    cache. One ``ScoreCache`` can be shared by several value functions (e.g. across
+    ``ShapleyAttribution`` instances that score against the same base output); the
+    namespace keeps different metrics apart. Concurrent misses on the same key may
+    compute the score more than once, which is harmless for deterministic metrics.
+
+    Args:
+        capacity: Maximum number of cached scores (least recently used are evicted).
+    """
+    def __init__(self, capacity: Optional[int] = 2_000) -> None:
+        self._cache = BoundedCache(max_entries=capacity, sizeof=lambda _: 8)
+
+    @staticmethod
+    def digest(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def get_or_compute(self, namespace: str, first: str, second: str, compute: Callable[[str, str], float]) -> float:
+        """Return the cached score for ``(first, second)`` or compute and store it."""
+        key = (namespace, self.digest(first), self.digest(second))
+        score = self._cache.get(key)
+        if score is None:
+            score = compute(first, second)
+            self._cache.put(key, score)
+        return score
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> CacheStats:
+        return self._cache.stats()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
@@ -0,0 +1,222 @@
+"""
+``llmshap`` command-line batch runner.
+
+Streams records from a JSONL or CSV file, runs one Shapley attribution per record
+and appends one JSON line per finished record to the output file. Each record has
+an ``id``, ``data`` (a feature mapping, or a string that is split on spaces),
+optional ``permanent_keys`` and an optional ``system`` prompt. In CSV files
+``data`` and ``permanent_keys`` may be JSON-encoded; a plain ``data`` string is
+used as text and ``permanent_keys`` may also be ``;``-separated. A JSONL line that
+is not a JSON object is reported as a failed record (with id ``line-<number>``)
+and the remaining records still run.
+
+Example:
+    llmshap records.jsonl -o results.jsonl --model gpt-4.1-mini --sampler stratified \\
+        --sampling-ratio 0.3 --threads 8 --parallel-records 4 --cache --resume
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+
+from llmSHAP.types import Any, Iterator, Optional
+
+
+def _parse_json_field(value: Any) -> Any:
+    if not isinstance(value, str): return value
+    stripped = value.strip()
+    if stripped[:1] in {"{", "["}:
+        try: return json.loads(stripped)
+        except json.JSONDecodeError: pass
+    return value
+
+
+def read_records(path: str) -> Iterator[dict[str, Any]]:
+    """
+    Lazily yield records from a ``.jsonl`` or ``.csv`` file. Records without an ``id`` get ``"line-<number>"``,
+    which cannot be mistaken for an explicit numeric id.
+
+    Malformed JSONL lines are yielded as ``{"id": "line-<number>", "error": ...}`` instead of raising.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.lower().endswith(".csv"):
+            for number, row in enumerate(csv.DictReader(file), start=1):
+                permanent_keys = _parse_json_field(row.get("permanent_keys") or [])
+                if isinstance(permanent_keys, str): permanent_keys = [key for key in permanent_keys.split(";") if key]
+                yield {"id": row.get("id") or f"line-{number}",
+                       "data": _parse_json_field(row.get("data", "")),
+                       "permanent_keys": permanent_keys,
+                       "system": row.get("system") or ""}
+            return
+        for number, line in enumerate(file, start=1):
+            if not line.strip(): continue
+            try: record = json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield {"id": f"line-{number}", "error": f"Line {number}: {type(exc).__name__}: {exc}"}
+                continue
+            if not isinstance(record, dict):
+                yield {"id": f"line-{number}", "error": f"Line {number}: expected a JSON object, got {type(record).__name__}"}
+                continue
+            record.setdefault("id", f"line-{number}")
+            yield record
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids of records already written successfully to ``path`` (truncated or failed lines are ignored)."""
+    if not os.path.exists(path): return set()
+    ids = set()
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try: result = json.loads(line)
+            except json.JSONDecodeError: continue
+            if isinstance(result, dict) and "id" in result and "error" not in result: ids.add(str(result["id"]))
+    return ids
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="llmshap", description="Run llmSHAP attributions over a JSONL/CSV file of records.")
+    parser.add_argument("input", help="Input .jsonl or .csv file.")
+    parser.add_argument("-o", "--output", default="llmshap_results.jsonl", help="Output JSONL file (appended to).")
+    parser.add_argument("--backend", choices=["openai", "transformers", "dummy"], default="openai")
+    parser.add_argument("--model", default="gpt-4.1-mini", help="Model name for the backend.")
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    parser.add_argument("--reasoning", default=None, help="Reasoning effort (OpenAI reasoning models).")
+    parser.add_argument("--sampler", choices=["full", "stratified", "sliding-window", "counterfactual"], default="full")
+    parser.add_argument("--sampling-ratio", type=float, default=0.5, help="StratifiedSampler sampling ratio.")
+    parser.add_argument("--antithetic", action="store_true", help="Antithetic StratifiedSampler.")
+    parser.add_argument("--window-size", type=int, default=3, help="SlidingWindowSampler window size.")
+    parser.add_argument("--stride", type=int, default=1, help="SlidingWindowSampler stride.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--value-function", choices=["tfidf", "embedding", "loglik"], default="tfidf")
+    parser.add_argument("--threads", type=int, default=4, help="Worker threads per attribution.")
+    parser.add_argument("--parallel-records", type=int, default=1, help="Number of records attributed concurrently.")
+    parser.add_argument("--cache", action="store_true", help="Cache generations per record.")
+    parser.add_argument("--cache-entries", type=int, default=None, help="Maximum cached generations per record.")
+    parser.add_argument("--journal-dir", default=None, help="Journal each record's generations here so interrupted records resume.")
+    parser.add_argument("--resume", action="store_true", help="Skip record ids already present in the output file.")
+    parser.add_argument("--verbose", action="store_true", help="Show per-record progress bars.")
+    return parser
+
+
+def _build_llm(args: argparse.Namespace) -> Any:
+    if args.backend == "dummy":
+        from llmSHAP.llm.dummy import DummyLLM
+        return DummyLLM(model_name=args.model, sleep_seconds=0.0)
+    if args.backend == "transformers":
+        from llmSHAP.llm.transformers import TransformersInterface
+        return TransformersInterface(model_name=args.model, max_tokens=args.max_tokens)
+    from llmSHAP.llm.openai import OpenAIInterface
+    return OpenAIInterface(model_name=args.model, temperature=args.temperature, max_tokens=args.max_tokens, reasoning=args.reasoning,
+                           max_connections=max(1, args.threads) * max(1, args.parallel_records))
+
+
+def _build_value_function(args: argparse.Namespace) -> Any:
+    from llmSHAP.value_functions import TFIDFCosineSimilarity, EmbeddingCosineSimilarity, TargetLogLikelihood
+    if args.value_function == "embedding": return EmbeddingCosineSimilarity()
+    if args.value_function == "loglik": return TargetLogLikelihood()
+    return TFIDFCosineSimilarity()
+
+
+def _build_sampler(args: argparse.Namespace, keys: list[Any]) -> Any:
+    from llmSHAP.attribution_methods.coalition_sampler import (CounterfactualSampler, FullEnumerationSampler,
+                                                               SlidingWindowSampler, StratifiedSampler)
+    if args.sampler == "stratified": return StratifiedSampler(args.sampling_ratio, seed=args.seed, antithetic=args.antithetic)
+    if args.sampler == "sliding-window": return SlidingWindowSampler(keys, w_size=args.window_size, stride=args.stride)
+    if args.sampler == "counterfactual": return CounterfactualSampler()
+    return FullEnumerationSampler(len(keys))
+
+
+def journal_filename(record_id: Any) -> str:
+    """File name of a record's journal. Ids that are not plain file names are sanitized and suffixed with a hash."""
+    record_id = str(record_id)
+    if re.fullmatch(r"[A-Za-z0-9_-][A-Za-z0-9._-]{0,127}", record_id): return f"{record_id}.journal.jsonl"
+    safe = re.sub(r"[^A-Za-z0-9._-]+", "_", record_id).lstrip(".")[:64]
+    return f"{safe}-{hashlib.sha256(record_id.encode('utf-8')).hexdigest()[:16]}.journal.jsonl"
+
+
+def run_record(record: dict[str, Any], llm: Any, value_function: Any, args: argparse.Namespace) -> dict[str, Any]:
+    """Attribute one record and return its JSON-serializable result."""
+    from llmSHAP.data_handler import DataHandler
+    from llmSHAP.prompt_codec import BasicPromptCodec
+    from llmSHAP.attribution_methods.shapley_attribution import ShapleyAttribution
+    from llmSHAP.cache import BoundedCache
+
+    start = time.perf_counter()
+    data_handler = DataHandler(record["data"], permanent_keys=set(record.get("permanent_keys") or []))
+    attribution = ShapleyAttribution(model=llm,
+                                     data_handler=data_handler,
+                                     prompt_codec=BasicPromptCodec(system=record.get("system") or ""),
+                                     sampler=_build_sampler(args, data_handler.get_keys(exclude_permanent_keys=True)),
+                                     use_cache=args.cache,
+                                     verbose=args.verbose,
+                                     num_threads=args.threads,
+                                     value_function=value_function,
+                                     cache=BoundedCache(max_entries=args.cache_entries) if args.cache_entries else None)
+    resume = None
+    if args.journal_dir:
+        os.makedirs(args.journal_dir, exist_ok=True)
+        resume = os.path.join(args.journal_dir, journal_filename(record["id"]))
+    result = attribution.attribution(resume=resume)
+    return {"id": record["id"],
+            "output": result.output,
+            "attribution": result.attribution,
+            "empty_baseline": result.empty_baseline,
+            "grand_coalition_value": result.grand_coalition_value,
+            "time": time.perf_counter() - start,
+            "metrics": result.metrics.as_dict() if result.metrics is not None else None}
+
+
+def run(args: argparse.Namespace) -> int:
+    """Run the batch described by ``args``. Returns the number of failed records."""
+    done = completed_ids(args.output) if args.resume else set()
+    records = (record for record in read_records(args.input) if str(record["id"]) not in done)
+    llm, value_function = _build_llm(args), _build_value_function(args)
+    directory = os.path.dirname(args.output)
+    if directory: os.makedirs(directory, exist_ok=True)
+    needs_newline = False
+    if os.path.exists(args.output) and os.path.getsize(args.output) > 0:
+        with open(args.output, "rb") as existing:
+            existing.seek(-1, os.SEEK_END)
+            needs_newline = existing.read(1) != b"\n"
+    failures = 0
+    pending: dict[Future, Any] = {}
+    with open(args.output, "a", encoding="utf-8") as output, \
+         ThreadPoolExecutor(max_workers=max(1, args.parallel_records)) as executor:
+        if needs_newline: output.write("\n") # Terminate a line truncated by an interrupted run.
+        while True:
+            for record in islice(records, 2 * max(1, args.parallel_records) - len(pending)):
+                if "error" in record: # Malformed input line.
+                    failures += 1
+                    print(f"Record {record['id']!r} failed: {record['error']}", file=sys.stderr)
+                    output.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    output.flush()
+                    continue
+                pending[executor.submit(run_record, record, llm, value_function, args)] = record["id"]
+            if not pending: break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record_id = pending.pop(future)
+                try: result = future.result()
+                except Exception as exc:
+                    failures += 1
+                    result = {"id": record_id, "error": f"{type(exc).__name__}: {exc}"}
+                    print(f"Record {record_id!r} failed: {result['error']}", file=sys.stderr)
+                output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+                output.flush()
+    return failures
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return 1 if run(args) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Columnar storage of attribution results in a single NumPy ``.npz`` file.
+
+Many attributions are flattened into a few arrays: per-attribution ``ids``,
+``outputs``, ``empty_baseline`` and ``grand_coalition_value``, and per-feature
+``feature_keys``, ``feature_values`` and ``scores`` indexed through ``offsets``
+(attribution ``i`` owns rows ``offsets[i]:offsets[i + 1]``). Optional coalition
+value tables are stored the same way (``coalition_offsets``, member lists in
+``members``/``member_offsets`` and ``coalition_values``). String columns are
+stored as concatenated UTF-8 bytes plus ``<name>_offsets``, so a long output
+does not pad every other row to its width.
+
+The archive is written uncompressed, so ``load_attributions`` memory-maps every
+column instead of reading it: opening a file with hundreds of thousands of
+attributions is O(1) and columns are paged in on demand. Feature values are
+stored as strings (``str(value)``); integer feature keys are restored as ``int``.
+Requires NumPy (``pip install llmSHAP[columnar]``).
+"""
+import struct
+import zipfile
+
+from llmSHAP.types import Any, Dict, List, Mapping, Optional, Sequence, FrozenSet
+from llmSHAP.attribution import Attribution
+
+
+def _numpy() -> Any:
+    try:
+        import numpy as np
+    except ImportError:
+        raise ImportError(
+            "Columnar attribution storage requires NumPy.\n"
+            "Install with: pip install llmSHAP[columnar]"
+        ) from None
+    return np
+
+
+def _encode_strings(name: str, strings: Sequence[str]) -> Dict[str, Any]:
+    """UTF-8 bytes of ``strings`` concatenated into ``name`` and their boundaries in ``<name>_offsets``."""
+    np = _numpy()
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return {name: np.frombuffer(b"".join(encoded), dtype=np.uint8), f"{name}_offsets": offsets}
+
+
+class StringColumn:
+    """Read-only sequence of strings backed by a UTF-8 byte array and an offsets array."""
+    def __init__(self, data: Any, offsets: Any) -> None:
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice): return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if not 0 <= index < len(self): raise IndexError(index)
+        return self.data[int(self.offsets[index]):int(self.offsets[index + 1])].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Any:
+        return (self[index] for index in range(len(self)))
+
+    def tolist(self) -> List[str]:
+        return list(self)
+
+
+def save_attributions(path: str,
+                      attributions: Sequence[Attribution],
+                      ids: Optional[Sequence[str]] = None,
+                      coalition_values: Optional[Sequence[Optional[Mapping[FrozenSet[int], float]]]] = None) -> None:
+    """
+    Write ``attributions`` (and optionally one coalition value table per attribution) to ``path``.
+
+    Args:
+        path: Output ``.npz`` file.
+        attributions: Attribution results.
+        ids: Identifier per attribution (defaults to the position).
+        coalition_values: Optional ``{coalition: value}`` per attribution, e.g. from
+            ``ShapleyAttribution.coalition_values()``.
+    """
+    np = _numpy()
+    ids = [str(index) for index in range(len(attributions))] if ids is None else [str(item) for item in ids]
+    if len(ids) != len(attributions): raise ValueError("ids must have one entry per attribution.")
+    keys: List[str] = []
+    key_is_int: List[bool] = []
+    values: List[str] = []
+    scores: List[float] = []
+    offsets = [0]
+    for attribution in attributions:
+        for key, item in attribution.attribution.items():
+            keys.append(str(key))
+            key_is_int.append(isinstance(key, int))
+            values.append(str(item.get("value", "")))
+            scores.append(float(item.get("score", 0.0)))
+        offsets.append(len(scores))
+    columns = {
+        **_encode_strings("ids", ids),
+        **_encode_strings("outputs", [str(attribution.output) for attribution in attributions]),
+        "empty_baseline": np.array([attribution.empty_baseline for attribution in attributions], dtype=np.float64),
+        "grand_coalition_value": np.array([attribution.grand_coalition_value for attribution in attributions], dtype=np.float64),
+        "offsets": np.array(offsets, dtype=np.int64),
+        **_encode_strings("feature_keys", keys),
+        "feature_key_is_int": np.array(key_is_int, dtype=bool),
+        **_encode_strings("feature_values", values),
+        "scores": np.array(scores, dtype=np.float64),
+    }
+    if coalition_values is not None:
+        if len(coalition_values) != len(attributions): raise ValueError("coalition_values must have one entry per attribution.")
+        coalition_offsets, member_offsets = [0], [0]
+        members: List[int] = []
+        table_values: List[float] = []
+        for table in coalition_values:
+            for coalition, value in sorted((table or {}).items(), key=lambda entry: (len(entry[0]), sorted(entry[0]))):
+                members.extend(sorted(coalition))
+                member_offsets.append(len(members))
+                table_values.append(float(value))
+            coalition_offsets.append(len(table_values))
+        columns.update({"coalition_offsets": np.array(coalition_offsets, dtype=np.int64),
+                        "member_offsets": np.array(member_offsets, dtype=np.int64),
+                        "members": np.array(members, dtype=np.int64),
+                        "coalition_values": np.array(table_values, dtype=np.float64)})
+    with open(path, "wb") as file: np.savez(file, **columns)
+
+
+def _memory_map(path: str, archive: zipfile.ZipFile, name: str) -> Any:
+    """Memory-map one uncompressed ``.npy`` member of an ``.npz`` archive (falls back to reading it)."""
+    np = _numpy()
+    info = archive.getinfo(f"{name}.npy")
+    if info.compress_type != zipfile.ZIP_STORED:
+        with archive.open(info) as member: return np.lib.format.read_array(member)
+    with open(path, "rb") as file:
+        file.seek(info.header_offset)
+        local_header = file.read(30)
+        name_length, extra_length = struct.unpack("<HH", local_header[26:30])
+        file.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(file)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(file)
+        offset = file.tell()
+    if 0 in shape: return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape, offset=offset, order="F" if fortran_order else "C")
+
+
+class AttributionTable:
+    """
+    Columnar view of attributions loaded with ``load_attributions``.
+
+    Columns are exposed as (memory-mapped) arrays, e.g. ``table.scores`` with all
+    feature scores and ``table.offsets`` delimiting each attribution; string columns
+    (``ids``, ``outputs``, ``feature_keys``, ``feature_values``) are ``StringColumn``
+    sequences decoded on access. Indexing returns a regular ``Attribution``.
+    """
+    def __init__(self, columns: Dict[str, Any]) -> None:
+        self.columns = columns
+        self.ids = StringColumn(columns["ids"], columns["ids_offsets"])
+        self.outputs = StringColumn(columns["outputs"], columns["outputs_offsets"])
+        self.empty_baseline = columns["empty_baseline"]
+        self.grand_coalition_value = columns["grand_coalition_value"]
+        self.offsets = columns["offsets"]
+        self.feature_keys = StringColumn(columns["feature_keys"], columns["feature_keys_offsets"])
+        self.feature_values = StringColumn(columns["feature_values"], columns["feature_values_offsets"])
+        self.scores = columns["scores"]
+        self._positions: Optional[Dict[str, int]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def index(self, attribution_id: str) -> int:
+        """Position of the attribution with ``attribution_id``."""
+        if self._positions is None:
+            positions: Dict[str, int] = {}
+            for position, item in enumerate(self.ids): positions.setdefault(item, position)
+            self._positions = positions
+        try: return self._positions[str(attribution_id)]
+        except KeyError: raise KeyError(attribution_id) from None
+
+    def scores_of(self, index: int) -> Any:
+        """Score array (a view) of attribution ``index``."""
+        return self.scores[self.offsets[index]:self.offsets[index + 1]]
+
+    def __getitem__(self, index: int) -> Attribution:
+        start, stop = int(self.offsets[index]), int(self.offsets[index + 1])
+        key_is_int = self.columns["feature_key_is_int"][start:stop]
+        result = {(int(key) if is_int else key): {"value": value, "score": float(score)}
+                  for key, is_int, value, score in zip(self.feature_keys[start:stop], key_is_int,
+                                                       self.feature_values[start:stop], self.scores[start:stop])}
+        return Attribution(result, self.outputs[index], float(self.empty_baseline[index]), float(self.grand_coalition_value[index])) # type: ignore[arg-type]
+
+    def to_attributions(self) -> List[Attribution]:
+        return [self[index] for index in range(len(self))]
+
+    @property
+    def has_coalition_values(self) -> bool:
+        return "coalition_values" in self.columns
+
+    def coalition_values(self, index: int) -> Dict[FrozenSet[int], float]:
+        """Coalition value table of attribution ``index`` (empty if none was saved)."""
+        if not self.has_coalition_values: return {}
+        coalition_offsets, member_offsets = self.columns["coalition_offsets"], self.columns["member_offsets"]
+        members, values = self.columns["members"], self.columns["coalition_values"]
+        return {frozenset(int(member) for member in members[member_offsets[row]:member_offsets[row + 1]]): float(values[row])
+                for row in range(int(coalition_offsets[index]), int(coalition_offsets[index + 1]))}
+
+
+def load_attributions(path: str, mmap: bool = True) -> AttributionTable:
+    """Open a file written by ``save_attributions``. With ``mmap=True`` columns are memory-mapped instead of read."""
+    np = _numpy()
+    if not mmap:
+        with np.load(path) as archive: return AttributionTable({name: archive[name] for name in archive.files})
+    with zipfile.ZipFile(path) as archive:
+        names = [name[:-len(".npy")] for name in archive.namelist() if name.endswith(".npy")]
+        return AttributionTable({name: _memory_map(path, archive, name) for name in names})
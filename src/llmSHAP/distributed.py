@@ -0,0 +1,350 @@
+"""
+Distributed execution of Shapley attributions through a SQLite task queue.
+
+A ``Coordinator`` enumerates every coalition an attribution needs and pushes one
+task per distinct coalition prompt onto a ``SQLiteTaskQueue``. ``Worker`` processes
+(on this or other machines sharing the queue file) lease tasks, call their own
+``LLMInterface`` and acknowledge the generations. Leases expire, so tasks held by a
+worker that dies are redelivered to another worker. Once every task of an
+attribution is done, the coordinator computes the Shapley values locally from the
+returned generations without any model call.
+
+Images travel inside the task as their URL, or as a data URL with the encoded
+(preprocessed) content for local files, so workers never read the coordinator's
+paths. Task keys combine the coalition with a hash of its prompt, images and the
+attribution's model settings. Re-submitting a job id after changing any of them
+therefore creates new tasks (stale tasks of the job are removed) instead of
+reusing old results, while re-submitting an unchanged job after a coordinator
+restart reuses the finished tasks. ``collect`` runs the attribution against an
+unbounded cache holding the returned generations and the coalitions sampled at
+submission, restores the attribution's own ``cache`` and ``sampler`` afterwards,
+and deletes the job from the queue once its result has been computed.
+
+SQLite is used as a local, dependency-free broker. Workers on other machines need
+the queue file on a filesystem with working POSIX locks; otherwise run the workers
+on the coordinator host or put the file behind a shared volume that supports locking.
+
+Example:
+    queue = SQLiteTaskQueue("tasks.sqlite")
+    # On each worker machine:
+    Worker(queue, OpenAIInterface(model_name="gpt-4.1-mini"), num_threads=8).run()
+    # On the coordinator:
+    results = Coordinator(queue).run({"doc-1": ShapleyAttribution(...), "doc-2": ShapleyAttribution(...)})
+"""
+import hashlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from llmSHAP.types import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Index
+from llmSHAP.attribution import Attribution
+from llmSHAP.attribution_methods.coalition_sampler import CoalitionSampler
+from llmSHAP.attribution_methods.shapley_attribution import ShapleyAttribution
+from llmSHAP.cache import BoundedCache
+from llmSHAP.image import Image
+from llmSHAP.llm.llm_interface import LLMInterface
+from llmSHAP.value_functions import TargetLogLikelihood
+
+
+class SQLiteTaskQueue:
+    """
+    Durable task queue with leases, acknowledgement and redelivery, stored in one SQLite file.
+
+    Tasks are identified by ``(job, key)``; pushing an existing task is a no-op. A
+    leased task that is not acknowledged within ``lease_seconds`` becomes available
+    again. A task that has been leased ``max_attempts`` times without success is
+    marked failed.
+
+    Args:
+        path: SQLite database file.
+        lease_seconds: Time a worker may hold a task before it is redelivered.
+        max_attempts: Number of leases after which a task is marked failed.
+    """
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 5) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        with self._transaction() as connection:
+            connection.execute("""CREATE TABLE IF NOT EXISTS tasks (
+                                      id INTEGER PRIMARY KEY,
+                                      job TEXT NOT NULL,
+                                      key TEXT NOT NULL,
+                                      payload TEXT NOT NULL,
+                                      status TEXT NOT NULL DEFAULT 'pending',
+                                      worker TEXT,
+                                      lease_until REAL,
+                                      attempts INTEGER NOT NULL DEFAULT 0,
+                                      result TEXT,
+                                      UNIQUE (job, key))""")
+            connection.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try: yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def push(self, job: str, tasks: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """Enqueue ``(key, payload)`` tasks for ``job``. Returns the number of new tasks."""
+        rows = [(job, key, json.dumps(payload, default=str)) for key, payload in tasks]
+        with self._transaction() as connection:
+            before = connection.total_changes
+            connection.executemany("INSERT OR IGNORE INTO tasks (job, key, payload) VALUES (?, ?, ?)", rows)
+            return connection.total_changes - before
+
+    def lease(self, worker: str, limit: int = 1) -> List[Tuple[int, Dict[str, Any]]]:
+        """Lease up to ``limit`` pending or expired tasks, least-attempted first. Returns ``(task id, payload)`` pairs."""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute("UPDATE tasks SET status = 'failed', result = ? "
+                               "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                               (json.dumps({"error": "lease expired too many times"}), now, self.max_attempts))
+            rows = connection.execute("SELECT id, payload FROM tasks "
+                                      "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                                      "ORDER BY attempts, id LIMIT ?", (now, limit)).fetchall()
+            connection.executemany("UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                                   [(worker, now + self.lease_seconds, task_id) for task_id, _ in rows])
+        return [(task_id, json.loads(payload)) for task_id, payload in rows]
+
+    def ack(self, task_id: int, result: Dict[str, Any]) -> None:
+        """Store the result of a task. Late acknowledgements of redelivered tasks are kept if the task is not done yet."""
+        with self._transaction() as connection:
+            connection.execute("UPDATE tasks SET status = 'done', result = ?, lease_until = NULL WHERE id = ? AND status != 'done'",
+                               (json.dumps(result, default=str), task_id))
+
+    def nack(self, task_id: int, error: str) -> None:
+        """Return a task to the queue after a failure (or mark it failed after ``max_attempts``)."""
+        with self._transaction() as connection:
+            connection.execute("UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                               "result = ?, lease_until = NULL WHERE id = ? AND status = 'leased'",
+                               (self.max_attempts, json.dumps({"error": error}), task_id))
+
+    def counts(self, job: str) -> Dict[str, int]:
+        """Number of tasks of ``job`` per status."""
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM tasks WHERE job = ? GROUP BY status", (job,)).fetchall()
+        return {status: count for status, count in rows}
+
+    def results(self, job: str) -> Dict[str, Dict[str, Any]]:
+        """Results of the finished tasks of ``job`` keyed by task key."""
+        rows = self._connection().execute("SELECT key, result FROM tasks WHERE job = ? AND status = 'done'", (job,)).fetchall()
+        return {key: json.loads(result) for key, result in rows}
+
+    def failures(self, job: str) -> Dict[str, str]:
+        rows = self._connection().execute("SELECT key, result FROM tasks WHERE job = ? AND status = 'failed'", (job,)).fetchall()
+        return {key: json.loads(result).get("error", "") for key, result in rows}
+
+    def retain(self, job: str, keys: Iterable[str]) -> int:
+        """Remove the tasks of ``job`` whose key is not in ``keys``. Returns the number removed."""
+        keep = set(keys)
+        with self._transaction() as connection:
+            stale = [(job, key) for key, in connection.execute("SELECT key FROM tasks WHERE job = ?", (job,)) if key not in keep]
+            connection.executemany("DELETE FROM tasks WHERE job = ? AND key = ?", stale)
+        return len(stale)
+
+    def delete(self, job: str) -> None:
+        """Remove all tasks of ``job``."""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM tasks WHERE job = ?", (job,))
+
+
+class Worker:
+    """
+    Pulls tasks from a ``SQLiteTaskQueue``, generates with ``model`` and acknowledges the outputs.
+
+    Args:
+        queue: Task queue shared with the coordinator.
+        model: Model used for the generations.
+        worker_id: Identifier stored with leases (defaults to host name and a random suffix).
+        num_threads: Number of concurrent model calls.
+        poll_interval: Seconds to wait when the queue is empty.
+
+    ``run`` keeps one thread pool for the worker's lifetime and leases a new task as
+    soon as a slot frees up, so a slow generation only occupies its own slot.
+    """
+    def __init__(self,
+                 queue: SQLiteTaskQueue,
+                 model: LLMInterface,
+                 worker_id: Optional[str] = None,
+                 num_threads: int = 1,
+                 poll_interval: float = 0.5) -> None:
+        self.queue = queue
+        self.model = model
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.num_threads = max(1, num_threads)
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None: self._executor = ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="llmSHAP-worker")
+            return self._executor
+
+    def _process(self, task_id: int, payload: Dict[str, Any]) -> None:
+        try:
+            images = [Image(url=image["url"]) for image in payload.get("images") or []]
+            output = self.model.generate(payload["prompt"], tools=None, images=images or None)
+        except Exception as exc:
+            self.queue.nack(task_id, f"{type(exc).__name__}: {exc}")
+            return
+        self.queue.ack(task_id, {"output": output, "worker": self.worker_id})
+
+    def run_once(self) -> int:
+        """Lease one batch of up to ``num_threads`` tasks and process it. Returns the number of tasks processed."""
+        tasks = self.queue.lease(self.worker_id, limit=self.num_threads)
+        wait([self._pool().submit(self._process, *task) for task in tasks])
+        return len(tasks)
+
+    def run(self, stop_when_idle: bool = False) -> int:
+        """Process tasks until ``stop()`` is called (or the queue is empty, with ``stop_when_idle``). Returns the task count."""
+        processed = 0
+        executor = self._pool()
+        running: set[Future] = set()
+        try:
+            while not self._stop.is_set():
+                free = self.num_threads - len(running)
+                tasks = self.queue.lease(self.worker_id, limit=free) if free else []
+                running.update(executor.submit(self._process, *task) for task in tasks)
+                if not running:
+                    if stop_when_idle: break
+                    self._stop.wait(self.poll_interval)
+                    continue
+                finished, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                processed += len(finished)
+        finally:
+            wait(running)
+            with self._executor_lock: self._executor = None
+            executor.shutdown()
+        return processed + len(running)
+
+    def stop(self) -> None:
+        """Make ``run`` return once the tasks in progress are acknowledged."""
+        self._stop.set()
+
+
+class _ReplaySampler(CoalitionSampler):
+    """Replays the coalitions recorded at submission so randomized samplers are not re-drawn."""
+    def __init__(self, sampler: CoalitionSampler, coalitions: Dict[Index, List[Tuple[Set[Index], float]]]) -> None:
+        self.sampler = sampler
+        self.coalitions = coalitions
+
+    def __call__(self, feature: Index, keys: List[Index]):
+        yield from self.coalitions.get(feature, [])
+
+    def observe(self, feature: Index, coalition: Set[Index], delta: float) -> None:
+        self.sampler.observe(feature, coalition, delta)
+
+
+class Coordinator:
+    """
+    Distributes the generations of one or many ``ShapleyAttribution`` instances to workers.
+
+    Args:
+        queue: Task queue shared with the workers.
+        poll_interval: Seconds between progress checks while waiting for results.
+        timeout: Maximum seconds to wait for an attribution's tasks (``None`` waits forever).
+    """
+    def __init__(self, queue: SQLiteTaskQueue, poll_interval: float = 0.5, timeout: Optional[float] = None) -> None:
+        self.queue = queue
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._jobs: Dict[str, Tuple[Dict[str, frozenset], _ReplaySampler]] = {} # Job -> (task key -> coalition, replay sampler).
+
+    @staticmethod
+    def _task_key(coalition: frozenset, payload: Dict[str, Any], model: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(json.dumps([payload, model], sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+        return f"{json.dumps(sorted(coalition))}#{digest}"
+
+    def submit(self, job: str, attribution: ShapleyAttribution) -> int:
+        """
+        Enumerate the coalitions of ``attribution`` and enqueue one task per distinct coalition. Returns the task count.
+
+        The sampled coalitions are kept by the coordinator for ``collect``; ``attribution.sampler`` is not modified.
+        """
+        if isinstance(attribution.value_function, TargetLogLikelihood):
+            raise ValueError("Distributed execution does not support TargetLogLikelihood.")
+        data_handler = attribution.data_handler
+        variable_keys = data_handler.get_keys(exclude_permanent_keys=True)
+        recorded: Dict[Index, List[Tuple[Set[Index], float]]] = {}
+        coalitions: Dict[frozenset, Any] = {}
+        def add(coalition: Any) -> None:
+            key = attribution._cache_key(coalition)
+            if key not in coalitions: coalitions[key] = coalition
+        add(data_handler.get_keys())
+        add(set())
+        for feature in data_handler.get_keys():
+            if feature in data_handler.permanent_indexes: continue
+            recorded[feature] = list(attribution.sampler(feature, variable_keys))
+            for coalition_set, _ in recorded[feature]:
+                add(coalition_set)
+                add(coalition_set | {feature})
+        model = attribution._model_identity()
+        tasks, task_coalitions = [], {}
+        for key, coalition in coalitions.items():
+            if data_handler.tool_list(coalition): raise ValueError("Distributed execution does not support tools.")
+            images = [{"url": image.payload_url()} for image in data_handler.image_list(coalition) or [] if isinstance(image, Image)]
+            payload = {"prompt": attribution.prompt_codec.build_prompt(data_handler, coalition), "images": images}
+            task_key = self._task_key(key, payload, model)
+            tasks.append((task_key, payload))
+            task_coalitions[task_key] = key
+        self.queue.retain(job, task_coalitions)
+        self.queue.push(job, tasks)
+        self._jobs[job] = (task_coalitions, _ReplaySampler(attribution.sampler, recorded))
+        return len(tasks)
+
+    def wait(self, job: str) -> None:
+        """Block until every task of ``job`` is done. Raises ``RuntimeError`` on failed tasks or timeout."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            counts = self.queue.counts(job)
+            if counts.get("failed"):
+                key, error = next(iter(self.queue.failures(job).items()))
+                raise RuntimeError(f"{counts['failed']} task(s) of job {job!r} failed, e.g. coalition {key}: {error}")
+            if counts.get("done", 0) == sum(counts.values()): return
+            if deadline is not None and time.monotonic() > deadline:
+                raise RuntimeError(f"Timed out waiting for job {job!r}: {counts}")
+            time.sleep(self.poll_interval)
+
+    def collect(self, job: str, attribution: ShapleyAttribution) -> Attribution:
+        """Wait for ``job``, compute ``attribution`` from the returned generations and delete the job from the queue."""
+        if job not in self._jobs: raise KeyError(f"Job {job!r} was not submitted by this coordinator.")
+        task_coalitions, sampler = self._jobs[job]
+        self.wait(job)
+        results = self.queue.results(job)
+        cache = BoundedCache() # Unbounded, so no generation is evicted and regenerated locally.
+        for task_key, coalition in task_coalitions.items(): cache.put(coalition, attribution.prompt_codec.parse_generation(results[task_key]["output"]))
+        saved = attribution.sampler, attribution.cache, attribution.use_cache
+        attribution.sampler, attribution.cache, attribution.use_cache = sampler, cache, True
+        try: result = attribution.attribution()
+        finally: attribution.sampler, attribution.cache, attribution.use_cache = saved
+        self.queue.delete(job)
+        del self._jobs[job]
+        return result
+
+    def run(self, attributions: Dict[str, ShapleyAttribution]) -> Dict[str, Attribution]:
+        """Submit all attributions, then collect them in order. Keys are used as job ids."""
+        for job, attribution in attributions.items(): self.submit(job, attribution)
+        return {job: self.collect(job, attribution) for job, attribution in attributions.items()}
@@ -4,4 +4,10 @@ from llmSHAP.types import Optional
 
 @dataclass
 class Generation:
-    output: str
\ No newline at end of file
+    output: str
+
+
+@dataclass
+class LogProbGeneration(Generation):
+    """A scored (not generated) target output with its per-token log-probabilities."""
+    token_logprobs: tuple[float, ...] = ()
@@ -1,44 +1,120 @@
 import base64
+import hashlib
+import io
+import os
 from dataclasses import dataclass
-from functools import lru_cache
 from typing import Optional
 
+from llmSHAP.cache import BoundedCache
+
+
+IMAGE_CACHE = BoundedCache(max_bytes=64 * 1024 * 1024)
+"""Process-wide cache of encoded image payloads, bounded by bytes (64 MiB by default)."""
+
+_FORMAT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
 
 @dataclass(frozen=True)
 class Image:
     """Image handler for local paths or remote URLs.
 
+    Local images can be downscaled and re-encoded before they are sent to a model,
+    which shrinks every request payload. Encoded payloads are kept in ``IMAGE_CACHE``
+    (bounded by bytes) and, when ``cache_dir`` is set, on disk keyed by a hash of the
+    file contents and the preprocessing options, so each image is processed once.
+    Preprocessing requires Pillow (``pip install llmSHAP[images]``).
+
     Args:
         url: Remote image URL.
         image_path: Local image file path.
+        max_dimension: Downscale so that neither side exceeds this many pixels.
+        format: Re-encode as ``"JPEG"``, ``"WEBP"`` or ``"PNG"``.
+        quality: Encoder quality for JPEG/WebP (1-100).
+        cache_dir: Directory for the on-disk payload cache.
 
     Example:
-        image = Image(image_path="path/to/image.jpg")
+        image = Image(image_path="path/to/image.jpg", max_dimension=1024, format="JPEG")
         data = {
-            "image": image.data_url(mime_type="image/jpeg"),
+            "image": image,
         }
     """
 
     url: Optional[str] = None
     image_path: Optional[str] = None
+    max_dimension: Optional[int] = None
+    format: Optional[str] = None
+    quality: int = 85
+    cache_dir: Optional[str] = None
 
     @staticmethod
-    @lru_cache(maxsize=256)
-    def _encoded_from_path(image_path: str) -> str:
-        with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode("utf-8")
+    def _encoded_from_path(image_path: str,
+                           max_dimension: Optional[int] = None,
+                           format: Optional[str] = None,
+                           quality: int = 85,
+                           cache_dir: Optional[str] = None) -> tuple[Optional[str], str]:
+        """Return ``(mime type or None, base64 payload)`` for the (preprocessed) image file."""
+        stat = os.stat(image_path)
+        options = (max_dimension, format.upper() if format else None, quality)
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, options)
+        cached = IMAGE_CACHE.get(key)
+        if cached is not None: return cached
+        with open(image_path, "rb") as image_file: content = image_file.read()
+        cache_path = None
+        if cache_dir:
+            digest = hashlib.sha256(content + repr(options).encode("utf-8")).hexdigest()
+            cache_path = os.path.join(cache_dir, f"{digest}.txt")
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                header, _, payload = cache_file.read().partition(",")
+            mime_type = header[len("data:"):-len(";base64")] or None
+            encoded = (mime_type, payload)
+        else:
+            mime_type, content = _preprocess(content, *options) if max_dimension or format else (None, content)
+            encoded = (mime_type, base64.b64encode(content).decode("utf-8"))
+            if cache_path: _write_atomic(cache_path, f"data:{mime_type or ''};base64,{encoded[1]}")
+        IMAGE_CACHE.put(key, encoded)
+        return encoded
 
-    def encoded_image(self) -> str:
-        """Return the base64-encoded contents of the local image."""
+    @staticmethod
+    def cache_clear() -> None:
+        """Empty the in-memory payload cache."""
+        IMAGE_CACHE.clear()
+
+    def _payload(self) -> tuple[Optional[str], str]:
         if not self.image_path:
             raise ValueError("image_path is required to encode an image.")
-        return self._encoded_from_path(self.image_path)
+        return self._encoded_from_path(self.image_path, self.max_dimension, self.format, self.quality, self.cache_dir)
+
+    def encoded_image(self) -> str:
+        """Return the base64-encoded contents of the local image (after preprocessing, if configured)."""
+        return self._payload()[1]
 
     def data_url(self, mime_type: str) -> str:
-        """Return a data URL for the local image using the given MIME type."""
+        """Return a data URL for the local image using the given MIME type.
+
+        Raises ``ValueError`` if preprocessing re-encoded the image as a different type.
+        """
         if not mime_type:
             raise ValueError("mime_type is required to build a data URL.")
-        return f"data:{mime_type};base64,{self.encoded_image()}"
+        encoded_type, encoded = self._payload()
+        if encoded_type and encoded_type != mime_type:
+            raise ValueError(f"Image was re-encoded as {encoded_type}, not {mime_type}; use payload_url() instead.")
+        return f"data:{mime_type};base64,{encoded}"
+
+    def payload_url(self) -> str:
+        """Return the URL to send to a model: the remote URL, or a data URL with the payload's MIME type."""
+        if self.url: return self.url
+        mime_type, encoded = self._payload()
+        return f"data:{self._mime_type(mime_type)};base64,{encoded}"
+
+    def payload(self) -> tuple[str, bytes]:
+        """Return ``(MIME type, bytes)`` of the (preprocessed) local image, e.g. for file uploads."""
+        mime_type, encoded = self._payload()
+        return self._mime_type(mime_type), base64.b64decode(encoded)
+
+    def _mime_type(self, mime_type: Optional[str]) -> str:
+        import mimetypes
+        return mime_type or mimetypes.guess_type(self.image_path or "")[0] or "image/png"
 
     def __str__(self) -> str:
         """Return a string representation preferring path, then URL."""
@@ -47,3 +123,39 @@ class Image:
     def to_string(self) -> str:
         """Return a string representation of the image."""
         return str(self)
+
+
+def _preprocess(content: bytes, max_dimension: Optional[int], format: Optional[str], quality: int) -> tuple[Optional[str], bytes]:
+    """Downscale and re-encode image bytes. Returns ``(mime type, encoded bytes)``."""
+    try:
+        from PIL import Image as PILImage
+    except ImportError:
+        raise ImportError(
+            "Image preprocessing requires Pillow.\n"
+            "Install with: pip install llmSHAP[images]"
+        ) from None
+    if format and format not in _FORMAT_MIME_TYPES: raise ValueError(f"Unsupported image format {format!r}; use one of {sorted(_FORMAT_MIME_TYPES)}.")
+    with PILImage.open(io.BytesIO(content)) as source:
+        target_format = format or source.format or "PNG"
+        source.load()
+        image: PILImage.Image = source
+        if max_dimension and max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), PILImage.Resampling.LANCZOS)
+        if target_format == "JPEG" and image.mode not in {"RGB", "L"}: image = image.convert("RGB")
+        buffer = io.BytesIO()
+        options = {"quality": quality} if target_format in {"JPEG", "WEBP"} else {"optimize": True}
+        image.save(buffer, format=target_format, **options)
+    return _FORMAT_MIME_TYPES.get(target_format) or PILImage.MIME.get(target_format), buffer.getvalue()
+
+
+def _write_atomic(path: str, text: str) -> None:
+    import tempfile
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w", encoding="utf-8") as file: file.write(text)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path): os.remove(temporary_path)
+        raise
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+from dataclasses import asdict, fields, is_dataclass
+
+from llmSHAP.types import Any, Optional, Dict, Type
+from llmSHAP.generation import Generation, LogProbGeneration
+
+
+class CoalitionJournal:
+    """
+    Append-only journal of completed coalition generations for crash-safe resume.
+
+    Every generation produced during an attribution is appended as one JSON line as
+    soon as it completes. Lines are flushed immediately and ``fsync``'d every
+    ``sync_every`` records (and on ``close``), so a crash, quota error or Ctrl-C loses
+    at most the records since the last sync on power loss, and nothing on a process
+    crash. ``ShapleyAttribution.attribution(resume=...)`` replays the journal into the
+    generation cache, so only the missing coalitions are sent to the model.
+
+    The first line is a header with a fingerprint of the attribution setup; resuming
+    against a different prompt raises ``ValueError``. A truncated final line (from a
+    crash mid-write) is ignored.
+
+    Generations are restored as the ``Generation`` dataclass they were recorded as
+    when that type is registered (``llmSHAP.generation`` types are, custom ones are
+    added with ``register_generation_type``); anything else is restored as a plain
+    ``Generation``. Type names read from the file are never imported.
+
+    Args:
+        path: Journal file path.
+        sync_every: Number of records between ``fsync`` calls.
+    """
+    VERSION = 1
+    _generation_types: Dict[str, Type[Generation]] = {}
+
+    def __init__(self, path: str, sync_every: int = 64) -> None:
+        self.path = path
+        self.sync_every = max(1, sync_every)
+        self._file: Optional[Any] = None
+        self._lock = threading.Lock()
+        self._unsynced = 0
+
+    def open(self, fingerprint: str) -> tuple[Dict[frozenset, Generation], Optional[str]]:
+        """
+        Open the journal for appending and return previously recorded state.
+
+        Returns:
+            A tuple of ``(generations keyed by coalition, recorded target output or None)``.
+        """
+        generations: Dict[frozenset, Generation] = {}
+        target: Optional[str] = None
+        exists = os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if exists:
+            with open(self.path, "r", encoding="utf-8") as file:
+                lines = file.read().split("\n")
+            header = json.loads(lines[0])
+            if header.get("fingerprint") != fingerprint:
+                raise ValueError(f"Journal {self.path!r} was recorded for a different attribution setup.")
+            for line in lines[1:]:
+                try: record = json.loads(line)
+                except json.JSONDecodeError: continue # Empty or truncated trailing line.
+                if "target" in record: target = record["target"]; continue
+                generations[frozenset(record["coalition"])] = self._load_generation(record["type"], record["generation"])
+        directory = os.path.dirname(self.path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._file = open(self.path, "a", encoding="utf-8")
+            if exists and lines[-1] != "": self._file.write("\n") # Terminate a truncated line.
+            if not exists: self._append({"journal": self.VERSION, "fingerprint": fingerprint})
+            self._sync()
+        return generations, target
+
+    @classmethod
+    def register_generation_type(cls, generation_type: Type[Generation]) -> Type[Generation]:
+        """Allow journals to restore ``generation_type`` (a ``Generation`` dataclass). Usable as a class decorator."""
+        if not (is_dataclass(generation_type) and issubclass(generation_type, Generation)):
+            raise TypeError("Journal generation types must be Generation dataclasses.")
+        cls._generation_types[_type_path(generation_type)] = generation_type
+        return generation_type
+
+    def record(self, coalition: frozenset, generation: Generation) -> None:
+        """Append one completed coalition generation."""
+        self._write({"coalition": sorted(coalition),
+                     "type": _type_path(type(generation)),
+                     "generation": asdict(generation)})
+
+    def record_target(self, target: str) -> None:
+        """Append the target output scored by ``TargetLogLikelihood``."""
+        self._write({"target": target})
+
+    def close(self) -> None:
+        """Sync and close the journal file."""
+        with self._lock:
+            if self._file is None: return
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: dict[str, Any]) -> None:
+        with self._lock:
+            if self._file is None: raise RuntimeError("Journal is not open.")
+            self._append(record)
+            self._unsynced += 1
+            if self._unsynced >= self.sync_every: self._sync()
+
+    def _append(self, record: dict[str, Any]) -> None:
+        assert self._file is not None
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+        self._file.flush()
+
+    def _sync(self) -> None:
+        assert self._file is not None
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    @classmethod
+    def _load_generation(cls, type_path: str, data: dict[str, Any]) -> Generation:
+        generation_type = cls._generation_types.get(type_path)
+        if generation_type is None: return Generation(output=data.get("output", ""))
+        values = {field.name: data[field.name] for field in fields(generation_type) if field.name in data}
+        for field in fields(generation_type): # JSON has no tuples.
+            if isinstance(values.get(field.name), list) and isinstance(field.default, tuple): values[field.name] = tuple(values[field.name])
+        return generation_type(**values)
+
+
+def _type_path(generation_type: type) -> str:
+    return f"{generation_type.__module__}:{generation_type.__qualname__}"
+
+
+for _generation_type in (Generation, LogProbGeneration): CoalitionJournal.register_generation_type(_generation_type)
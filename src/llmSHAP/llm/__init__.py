@@ -1,12 +1,13 @@
 from llmSHAP.types import TYPE_CHECKING
 from typing import overload
 
-__all__ = ["OpenAIInterface", "LangChainInterface", "DummyLLM"]
+__all__ = ["OpenAIInterface", "LangChainInterface", "TransformersInterface", "DummyLLM"]
 
 if TYPE_CHECKING:
     from .llm_interface import LLMInterface
     from .openai import OpenAIInterface
     from .langchain import LangChainInterface
+    from .transformers import TransformersInterface
     from .dummy import DummyLLM
 
     @overload
@@ -16,6 +17,8 @@ if TYPE_CHECKING:
     @overload
     def __getattr__(name: str) -> type[LangChainInterface]: ...
     @overload
+    def __getattr__(name: str) -> type[TransformersInterface]: ...
+    @overload
     def __getattr__(name: str) -> type[DummyLLM]: ...
 
 
@@ -29,6 +32,9 @@ def __getattr__(name: str):
     if name == "LangChainInterface":
         from .langchain import LangChainInterface
         return LangChainInterface
+    if name == "TransformersInterface":
+        from .transformers import TransformersInterface
+        return TransformersInterface
     if name == "DummyLLM":
         from .dummy import DummyLLM
         return DummyLLM
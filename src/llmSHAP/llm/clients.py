@@ -0,0 +1,79 @@
+"""
+Process-wide registry of OpenAI clients.
+
+``OpenAIInterface`` and API-mode ``EmbeddingCosineSimilarity`` share one client (and
+therefore one keep-alive HTTP connection pool) per ``(base_url, api_key)`` instead of
+each constructing their own. The pool is sized from the requested concurrency: when a
+caller asks for more connections than the current client holds, the client is
+replaced by a larger one (existing holders keep using the old client). Per-caller
+settings such as timeouts are applied with ``client.with_options(...)``, which reuses
+the shared connection pool.
+"""
+import os
+import threading
+
+from llmSHAP.types import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_CONNECTIONS = 100
+"""Connection (and keep-alive) pool size when no concurrency is given."""
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[Optional[str], str], Tuple[int, bool, Any]] = {}
+_env_loaded = False
+
+
+def api_key_from_env() -> Optional[str]:
+    """Return ``OPENAI_API_KEY``, loading ``.env`` only on the first call in the process."""
+    global _env_loaded
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+    return os.getenv("OPENAI_API_KEY")
+
+
+def shared_client(*,
+                  api_key: str,
+                  base_url: Optional[str] = None,
+                  max_connections: Optional[int] = None,
+                  http2: bool = False) -> Any:
+    """
+    Return the shared ``OpenAI`` client for ``(base_url, api_key)``.
+
+    Args:
+        api_key: API key.
+        base_url: Optional API base URL (``None`` for the SDK default).
+        max_connections: Expected number of concurrent requests (e.g. ``num_threads``).
+            The pool keeps at least this many connections alive.
+        http2: Use HTTP/2 (requires ``pip install httpx[http2]``).
+    """
+    from openai import OpenAI
+    wanted = max(1, max_connections or DEFAULT_MAX_CONNECTIONS)
+    with _lock:
+        entry = _clients.get((base_url, api_key))
+        if entry is not None and entry[0] >= wanted and (entry[1] or not http2): return entry[2]
+        if entry is not None: wanted, http2 = max(wanted, entry[0]), http2 or entry[1]
+        client = OpenAI(api_key=api_key, base_url=base_url, http_client=_http_client(wanted, http2))
+        _clients[(base_url, api_key)] = (wanted, http2, client)
+        return client
+
+
+def clear_clients() -> None:
+    """Forget all shared clients (they are closed once no longer referenced)."""
+    with _lock: _clients.clear()
+
+
+def _http_client(max_connections: int, http2: bool) -> Any:
+    import httpx
+    from openai import DefaultHttpxClient
+    if http2:
+        try:
+            import h2 # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "HTTP/2 requires the 'h2' package.\n"
+                "Install with: pip install httpx[http2]"
+            ) from None
+    limits = httpx.Limits(max_connections=max(max_connections, DEFAULT_MAX_CONNECTIONS),
+                          max_keepalive_connections=max_connections)
+    return DefaultHttpxClient(limits=limits, http2=http2)
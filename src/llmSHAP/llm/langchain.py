@@ -1,5 +1,5 @@
+import threading
 from typing import Any, Optional, Callable
-import mimetypes
 
 from llmSHAP.types import Type
 from llmSHAP.image import Image
@@ -10,12 +10,29 @@ try:
         BaseMessage, HumanMessage, AIMessage, SystemMessage
     )
     _HAS_LANGCHAIN = True
+    _ROLE_MAP: dict[str, Type[BaseMessage]] = {
+        "system": SystemMessage,
+        "user": HumanMessage,
+        "assistant": AIMessage,
+    }
 except ImportError:
     _HAS_LANGCHAIN = False
 
 
 
 class LangChainInterface(LLMInterface):
+    """
+    Interface for LangChain chat models (and agents that take ``{"messages": [...]}``).
+
+    Models bound to a tool set (via ``bind_tools`` or ``tool_factory``) are memoized
+    per tool-set identity, so repeated tool subsets across coalitions are bound once.
+    The invocation shape (a message list, or ``{"messages": ...}`` for agents) is
+    detected on the first successful call of each model (the plain chat model and
+    every bound model or agent) and reused for that model afterwards. ``agenerate`` and
+    ``agenerate_batch`` use ``ainvoke``/``abatch``, so many requests can be driven
+    concurrently from one event loop instead of one thread per request;
+    ``generate_batch`` uses ``batch``.
+    """
     def __init__(
         self,
         chat_model: Any,
@@ -30,6 +47,9 @@ class LangChainInterface(LLMInterface):
         self.chat_model = chat_model
         self._name = name or getattr(chat_model, "model_name", chat_model.__class__.__name__)
         self._tool_factory = tool_factory
+        self._bound_lock = threading.Lock()
+        self._bound: dict[tuple[int, ...], tuple[list[Any], Any]] = {} # Tool ids -> (tools kept alive, model).
+        self._wrap_messages: dict[int, bool] = {} # Model id -> invocation shape, once known.
 
     def generate(
         self,
@@ -38,43 +58,114 @@ class LangChainInterface(LLMInterface):
         images: Optional[list[Any]] = None,
     ) -> str:
         messages = self._prompt_to_messages(prompt, images=images)
-        model = self.chat_model
-        if tools:
-            if self._tool_factory is not None:
-                model = self._tool_factory(tools)
-            elif hasattr(model, "bind_tools"):
-                try:
-                    model = model.bind_tools(tools)
-                except Exception:
-                    model = self.chat_model
+        model = self._model_for(tools)
+        wrap_messages = self._wrap_messages.get(id(model))
+        if wrap_messages is not None:
+            return self._content(model.invoke(self._shape(messages, wrap_messages)))
         try:
             result = model.invoke(messages)
+            wrap_messages = False
         except Exception as exc:
             try:
                 result = model.invoke({"messages": messages})
             except Exception:
                 raise exc
-            if isinstance(result, dict) and result.get("messages"):
-                last = result["messages"][-1]
-                return getattr(last, "content", str(last)) or ""
+            wrap_messages = True
+        self._wrap_messages[id(model)] = wrap_messages
+        return self._content(result)
+
+    async def agenerate(
+        self,
+        prompt: Any,
+        tools: Optional[list[Any]] = None,
+        images: Optional[list[Any]] = None,
+    ) -> str:
+        """Async ``generate`` using the model's ``ainvoke``."""
+        messages = self._prompt_to_messages(prompt, images=images)
+        model = self._model_for(tools)
+        wrap_messages = self._wrap_messages.get(id(model))
+        if wrap_messages is not None:
+            return self._content(await model.ainvoke(self._shape(messages, wrap_messages)))
+        try:
+            result = await model.ainvoke(messages)
+            wrap_messages = False
+        except Exception as exc:
+            try:
+                result = await model.ainvoke({"messages": messages})
+            except Exception:
+                raise exc
+            wrap_messages = True
+        self._wrap_messages[id(model)] = wrap_messages
+        return self._content(result)
+
+    def generate_batch(
+        self,
+        prompts: list[Any],
+        tools: Optional[list[Any]] = None,
+        images: Optional[list[Any]] = None,
+    ) -> list[str]:
+        """Generate for several prompts sharing ``tools`` and ``images`` with one ``batch`` call."""
+        if not prompts: return []
+        model = self._model_for(tools)
+        wrap_messages = self._wrap_messages.get(id(model))
+        if wrap_messages is None: # Detect the invocation shape on the first prompt.
+            return [self.generate(prompts[0], tools=tools, images=images), *self.generate_batch(prompts[1:], tools, images)]
+        inputs = [self._shape(self._prompt_to_messages(prompt, images=images), wrap_messages) for prompt in prompts]
+        return [self._content(result) for result in model.batch(inputs)]
+
+    async def agenerate_batch(
+        self,
+        prompts: list[Any],
+        tools: Optional[list[Any]] = None,
+        images: Optional[list[Any]] = None,
+    ) -> list[str]:
+        """Async ``generate_batch`` using the model's ``abatch``."""
+        if not prompts: return []
+        model = self._model_for(tools)
+        wrap_messages = self._wrap_messages.get(id(model))
+        if wrap_messages is None: # Detect the invocation shape on the first prompt.
+            return [await self.agenerate(prompts[0], tools=tools, images=images), *await self.agenerate_batch(prompts[1:], tools, images)]
+        inputs = [self._shape(self._prompt_to_messages(prompt, images=images), wrap_messages) for prompt in prompts]
+        return [self._content(result) for result in await model.abatch(inputs)]
+
+    def _model_for(self, tools: Optional[list[Any]]) -> Any:
+        """Return the chat model bound to ``tools``, binding each distinct tool set once."""
+        if not tools: return self.chat_model
+        key = tuple(id(tool) for tool in tools)
+        with self._bound_lock:
+            bound = self._bound.get(key)
+        if bound is not None: return bound[1]
+        model = self.chat_model
+        if self._tool_factory is not None:
+            model = self._tool_factory(tools)
+        elif hasattr(model, "bind_tools"):
+            try:
+                model = model.bind_tools(tools)
+            except Exception:
+                model = self.chat_model
+        with self._bound_lock:
+            return self._bound.setdefault(key, (list(tools), model))[1]
+
+    @staticmethod
+    def _shape(messages: list[Any], wrap_messages: bool) -> Any:
+        return {"messages": messages} if wrap_messages else messages
+
+    @staticmethod
+    def _content(result: Any) -> str:
+        if isinstance(result, dict) and result.get("messages"):
+            last = result["messages"][-1]
+            return getattr(last, "content", str(last)) or ""
         return getattr(result, "content", str(result)) or ""
-    
+
     def _prompt_to_messages(self, prompt: Any, images: Optional[list[Any]] = None):
-        role_map: dict[str, Type[BaseMessage]] = {
-            "system": SystemMessage,
-            "user": HumanMessage,
-            "assistant": AIMessage,
-        }
         content_blocks = [
-            {"type": "image_url", "image_url": {"url": image.url}}
-            if image.url else
-            {"type": "image_url", "image_url": {"url": image.data_url(mimetypes.guess_type(image.image_path)[0] or "image/png")}} # type: ignore
+            {"type": "image_url", "image_url": {"url": image.payload_url()}}
             for image in images or [] if isinstance(image, Image) and (image.url or image.image_path)
         ]
-        
+
         messages = []
         for item in prompt:
-            message_class = role_map.get(item.get("role", "user")) or HumanMessage
+            message_class = _ROLE_MAP.get(item.get("role", "user")) or HumanMessage
             if content_blocks and item.get("role") == "user":
                 text = item.get("content", "")
                 messages.append(message_class(content=[{"type": "text", "text": text}, *content_blocks]))
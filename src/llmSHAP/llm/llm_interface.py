@@ -10,4 +10,12 @@ class LLMInterface(ABC):
                  images: Optional[list[Any]] = None,
                  ) -> Any:
         pass
-    
\ No newline at end of file
+
+    def score(self,
+              prompt: Any,
+              target: str,
+              tools: Optional[list[Any]] = None,
+              images: Optional[list[Any]] = None,
+              ) -> list[float]:
+        """Return the per-token log-probabilities of ``target`` as a continuation of ``prompt``."""
+        raise NotImplementedError(f"{type(self).__name__} does not support log-probability scoring.")
@@ -1,19 +1,44 @@
+import hashlib
+import json
 import mimetypes
 import os
+import queue
 import random
+import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
 
-from llmSHAP.types import Optional, Any
+from llmSHAP.types import Optional, Any, Callable
 from llmSHAP.image import Image
 from llmSHAP.llm.llm_interface import LLMInterface
+from llmSHAP.llm.clients import api_key_from_env, shared_client
+from llmSHAP import monitoring
+
+_REJECTED_FILE_CODES = frozenset({"file_not_found", "invalid_file", "invalid_file_id"})
+"""API error codes meaning an uploaded file id can no longer be used."""
+
+@dataclass(frozen=True)
+class HedgeStats:
+    """Point-in-time request hedging counters of an ``OpenAIInterface``."""
+    requests: int
+    hedged: int
+    hedge_wins: int
+    threshold: Optional[float]
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
 
 class OpenAIInterface(LLMInterface):
     """
         OpenAI Responses API interface with llmSHAP-managed retry behavior.
 
         Retries are handled entirely by llmSHAP. 
-        The underlying ``OpenAI`` client is
-        constructed with ``max_retries=1``, otherwise the retry budget and backoff are controlled
+        The underlying (shared) ``OpenAI`` client is
+        used with ``max_retries=1``, otherwise the retry budget and backoff are controlled
         by ``max_retries``, ``backoff_base``, and ``backoff_max`` on this interface.
 
         Requests use an explicit default timeout of ``600.0`` seconds (10 minutes) rather
@@ -45,6 +70,32 @@ class OpenAIInterface(LLMInterface):
         :param timeout: Request timeout in seconds passed to the underlying OpenAI client.
         :param backoff_base: Base delay in seconds for exponential backoff.
         :param backoff_max: Maximum backoff delay in seconds.
+        :param base_url: Optional API base URL (e.g. an OpenAI-compatible server).
+        :param upload_images: Upload each local ``Image`` once through the Files API and
+            reference it by ``file_id`` instead of re-sending it inline as base64 with
+            every coalition request. Use the interface as a context manager (or call
+            ``delete_uploaded_files()``) to delete the uploaded files afterwards.
+        :param file_cache: Optional JSON file mapping image content hashes to uploaded
+            file ids, so images are reused across runs. Entries are scoped to the API
+            endpoint and account (a hash of the API key), so one file can be shared safely.
+            Files deleted through ``delete_uploaded_files()`` are removed from it, and a
+            cached id that the API rejects (e.g. an expired file) is uploaded again.
+        :param hedge_percentile: Enable request hedging. Once a generation request has been
+            running longer than this percentile (e.g. ``0.95``) of recent request latencies, a
+            duplicate request is issued and whichever response arrives first is returned (the
+            other one is ignored). Hedging only starts after ``hedge_min_samples`` latencies
+            have been observed, and is only allowed for deterministic settings
+            (``temperature=0`` without ``reasoning``) unless ``hedge_accept_any`` is set.
+        :param hedge_max_fraction: Upper bound on hedged requests as a fraction of all
+            generation requests.
+        :param hedge_min_samples: Number of observed latencies before hedging starts.
+        :param hedge_accept_any: Allow hedging for non-deterministic settings, accepting
+            whichever of the two samples arrives first.
+        :param max_connections: Expected number of concurrent requests (e.g. the attribution's
+            ``num_threads``). Interfaces and embedding value functions with the same
+            ``base_url`` and API key share one client whose keep-alive pool holds at least
+            this many connections (see ``llmSHAP.llm.clients``).
+        :param http2: Use HTTP/2 for the shared client (requires ``httpx[http2]``).
     """
     def __init__(self,
                  *,
@@ -56,22 +107,33 @@ class OpenAIInterface(LLMInterface):
                  max_retries: int = 5,
                  timeout: float = 600.0,
                  backoff_base: float = 1.0,
-                 backoff_max: float = 30.0,):
+                 backoff_max: float = 30.0,
+                 base_url: Optional[str] = None,
+                 upload_images: bool = False,
+                 file_cache: Optional[str] = None,
+                 hedge_percentile: Optional[float] = None,
+                 hedge_max_fraction: float = 0.05,
+                 hedge_min_samples: int = 20,
+                 hedge_accept_any: bool = False,
+                 max_connections: Optional[int] = None,
+                 http2: bool = False,):
         try:
             from openai import OpenAI
-            from dotenv import load_dotenv
+            from dotenv import load_dotenv # noqa: F401
         except ImportError:
             raise ImportError(
                 "OpenAIInterface requires the 'openai' extra.\n"
                 "Install with: pip install llmSHAP[openai]"
             ) from None
         
-        load_dotenv()
-        api_key = os.getenv("OPENAI_API_KEY")
+        api_key = api_key_from_env()
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is not set. Set it (e.g. in your .env) before using OpenAIInterface.")
-        self.client: OpenAI = OpenAI(api_key=api_key, max_retries=1, timeout=timeout)
+        client = shared_client(api_key=api_key, base_url=base_url, max_connections=max_connections, http2=http2)
+        self.client: OpenAI = client.with_options(max_retries=1, timeout=timeout)
+        self._file_scope = f"{self.client.base_url}|{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}" # Endpoint and account of file ids.
         self.model_name = model_name
+        self.base_url = base_url
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.reasoning = {"effort": reasoning} if reasoning is not None else None
@@ -79,10 +141,45 @@ class OpenAIInterface(LLMInterface):
         self.max_retries = max_retries
         self.backoff_base = backoff_base
         self.backoff_max = backoff_max
+        self.upload_images = upload_images
+        self.file_cache = file_cache
+        self._upload_lock = threading.Lock()
+        self._uploads: dict[Image, Future[str]] = {}
+        self._file_ids: dict[str, str] = {} # "<scope>|<content digest>" -> file id.
+        self._uploaded: dict[str, str] = {}
+        if file_cache and os.path.exists(file_cache):
+            with open(file_cache, "r", encoding="utf-8") as file: self._file_ids = json.load(file)
+        if hedge_percentile is not None:
+            if not 0.0 < hedge_percentile < 1.0: raise ValueError("hedge_percentile must be in (0, 1).")
+            if not 0.0 <= hedge_max_fraction <= 1.0: raise ValueError("hedge_max_fraction must be in [0, 1].")
+            deterministic = temperature == 0 and reasoning is None
+            if not (deterministic or hedge_accept_any):
+                raise ValueError("Request hedging returns whichever of two samples arrives first. "
+                                 "Use temperature=0 without reasoning, or set hedge_accept_any=True.")
+        self.hedge_percentile = hedge_percentile
+        self.hedge_max_fraction = hedge_max_fraction
+        self.hedge_min_samples = max(1, hedge_min_samples)
+        self._hedge_lock = threading.Lock()
+        self._latencies: deque[float] = deque(maxlen=512)
+        self._hedge_threshold: Optional[float] = None
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._retry_lock = threading.Lock()
+        self.retry_count = 0 # Retried requests over the interface's lifetime.
 
 
     def generate(self, prompt: Any, tools: Optional[list[Any]] = None, images: Optional[list[Any]] = None,) -> Any:
-        if images: prompt = self._attach_images(prompt, images)
+        if not images: return self._generate_with_retries(self._request_kwargs(prompt))
+        attached = self._attach_images(prompt, images)
+        try:
+            return self._generate_with_retries(self._request_kwargs(attached))
+        except Exception as exc:
+            if not self._forget_rejected_files(exc, attached): raise
+        return self._generate_with_retries(self._request_kwargs(self._attach_images(prompt, images)))
+
+
+    def _request_kwargs(self, prompt: Any) -> dict[str, Any]:
         kwargs = {
             "model": self.model_name,
             "input": prompt,
@@ -94,20 +191,106 @@ class OpenAIInterface(LLMInterface):
             kwargs["temperature"] = self.temperature
         if self.text_format is not None:
             kwargs["text_format"] = self.text_format
-        return self._generate_with_retries(kwargs)
+        return kwargs
+
+
+    def score(self, prompt: Any, target: str, tools: Optional[list[Any]] = None, images: Optional[list[Any]] = None,) -> list[float]:
+        """
+            Score ``target`` as a continuation of ``prompt`` using the completions endpoint.
+
+            The prompt and target are sent together with ``echo=True`` and ``logprobs=0``
+            so the endpoint returns the log-probability of every prompt token while
+            generating a single throwaway token. Only tokens that start inside the target
+            are returned. This requires a model/endpoint with prompt echo support (for
+            example ``davinci-002`` or an OpenAI-compatible vLLM server). Chat prompts are
+            flattened to ``role: content`` lines followed by ``assistant:``, so the target
+            should carry its own leading space (e.g. ``" flu"``).
+        """
+        if tools or images: raise ValueError("OpenAIInterface.score does not support tools or images.")
+        prompt_text = prompt if isinstance(prompt, str) else (
+            "".join(f"{message.get('role', 'user')}: {message.get('content', '')}\n" for message in prompt) + "assistant:")
+        kwargs = {"model": self.model_name, "prompt": prompt_text + target, "echo": True, "logprobs": 0, "max_tokens": 1}
+        response = self._with_retries(lambda: self.client.completions.create(**kwargs))
+        self._count_tokens(response, "prompt_tokens", "completion_tokens")
+        logprobs = response.choices[0].logprobs
+        target_start, target_end = len(prompt_text), len(prompt_text) + len(target)
+        return [float(logprob) for offset, logprob in zip(logprobs.text_offset, logprobs.token_logprobs)
+                if target_start <= offset < target_end and logprob is not None]
 
 
     def _generate_with_retries(self, kwargs: dict[str, Any]) -> Any:
+        def request() -> Any:
+            if self.text_format is None:
+                response = self.client.responses.create(**kwargs)
+                self._count_tokens(response, "input_tokens", "output_tokens")
+                return response.output_text or ""
+            response = self.client.responses.parse(**kwargs)
+            self._count_tokens(response, "input_tokens", "output_tokens")
+            return response.output_parsed
+        if self.hedge_percentile is not None: return self._with_retries(lambda: self._hedged_request(request))
+        return self._with_retries(request)
+
+
+    def _hedged_request(self, request: Callable[[], Any]) -> Any:
+        """
+        Run ``request``; if it outlives the latency threshold, race it against a duplicate.
+
+        Until a threshold exists, or while the hedge budget is spent, the request runs
+        on the caller's thread. Otherwise the primary runs on a reused pool thread so
+        the caller can stop waiting for it, and a new thread is started only for a hedge.
+        """
+        with self._hedge_lock:
+            self._requests += 1
+            threshold = self._hedge_threshold
+            can_hedge = threshold is not None and self._hedged + 1 <= self.hedge_max_fraction * self._requests
+        start = time.perf_counter()
+        if not can_hedge:
+            result = request()
+            self._record_latency(time.perf_counter() - start)
+            return result
+        primary = _pool.submit(request)
+        if wait([primary], timeout=threshold).done:
+            result = primary.result()
+            self._record_latency(time.perf_counter() - start)
+            return result
+        with self._hedge_lock:
+            hedge_allowed = self._hedged + 1 <= self.hedge_max_fraction * self._requests
+            if hedge_allowed: self._hedged += 1
+        if not hedge_allowed:
+            result = primary.result()
+            self._record_latency(time.perf_counter() - start)
+            return result
+        hedge = _spawn(request)
+        pending = {primary, hedge}
+        while True:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in finished if future.exception() is None), None)
+            if winner is not None: break
+            if not pending: return primary.result() # Both failed: surface the original error.
+        self._record_latency(time.perf_counter() - start) # At least the threshold, even when the hedge won.
+        if winner is hedge:
+            with self._hedge_lock: self._hedge_wins += 1
+        return winner.result()
+
+
+    def _record_latency(self, seconds: float) -> None:
+        with self._hedge_lock:
+            self._latencies.append(seconds)
+            if len(self._latencies) < self.hedge_min_samples: return
+            ordered = sorted(self._latencies)
+            self._hedge_threshold = ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))] # type: ignore[operator]
+
+
+    def hedge_stats(self) -> HedgeStats:
+        with self._hedge_lock:
+            return HedgeStats(requests=self._requests, hedged=self._hedged, hedge_wins=self._hedge_wins, threshold=self._hedge_threshold)
+
+
+    def _with_retries(self, request: Callable[[], Any]) -> Any:
         from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
         for attempt in range(self.max_retries + 1):
             try:
-                # response = self.client.responses.create(**kwargs) # type: ignore[arg-type]
-                # return response.output_text or ""
-                if self.text_format is None:
-                    response = self.client.responses.create(**kwargs)
-                    return response.output_text or ""
-                response = self.client.responses.parse(**kwargs)
-                return response.output_parsed
+                return request()
             except RateLimitError as exc:
                 if self._is_quota_exhausted(exc):
                     raise RuntimeError(self._format_error(
@@ -115,15 +298,28 @@ class OpenAIInterface(LLMInterface):
                 if attempt >= self.max_retries:
                     raise RuntimeError(self._format_error(
                         "OpenAI rate limit exceeded after retries", attempt=attempt, detail=self._extract_error_message(exc),)) from exc
-                time.sleep(self._backoff_seconds(attempt))
+                time.sleep(self._record_retry("rate_limit", self._backoff_seconds(attempt)))
             except (APIConnectionError, APITimeoutError, InternalServerError) as exc:
                 if attempt >= self.max_retries:
                     raise RuntimeError(self._format_error(
                         "OpenAI request failed after retries", attempt=attempt, detail=self._extract_error_message(exc),)) from exc
-                time.sleep(self._backoff_seconds(attempt))
+                time.sleep(self._record_retry("error", self._backoff_seconds(attempt)))
         raise RuntimeError(self._format_error("OpenAI request failed", attempt=self.max_retries))
 
 
+    def _record_retry(self, reason: str, delay: float) -> float:
+        """Count a retry (and its backoff ``delay``) and return ``delay``."""
+        with self._retry_lock: self.retry_count += 1
+        monitoring.count_retry(self.model_name, reason, delay)
+        return delay
+
+
+    def _count_tokens(self, response: Any, input_field: str, output_field: str) -> None:
+        if not monitoring.enabled(): return
+        usage = getattr(response, "usage", None)
+        monitoring.count_tokens(self.model_name, getattr(usage, input_field, None), getattr(usage, output_field, None))
+
+
     def _backoff_seconds(self, attempt: int) -> float:
         base_delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
         return base_delay * (0.5 + random.random())
@@ -159,15 +355,97 @@ class OpenAIInterface(LLMInterface):
         return f"{message} for model '{self.model_name}' after {attempts} attempt(s)."
 
 
+    def _file_id(self, image: Image) -> str:
+        """Return the Files API id of ``image``, uploading its payload once per content hash."""
+        with self._upload_lock:
+            future = self._uploads.get(image)
+            owner = future is None
+            if owner: future = self._uploads[image] = Future()
+        assert future is not None
+        if not owner: return future.result()
+        try:
+            mime_type, content = image.payload()
+            digest = f"{self._file_scope}|{hashlib.sha256(content).hexdigest()}"
+            with self._upload_lock: file_id = self._file_ids.get(digest)
+            if file_id is None:
+                name = os.path.splitext(os.path.basename(image.image_path or "image"))[0] + (mimetypes.guess_extension(mime_type) or "")
+                uploaded = self._with_retries(lambda: self.client.files.create(file=(name, content, mime_type), purpose="vision"))
+                file_id = uploaded.id
+                with self._upload_lock:
+                    self._file_ids[digest] = file_id
+                    self._uploaded[digest] = file_id
+                    self._save_file_cache()
+        except Exception as exc:
+            with self._upload_lock: self._uploads.pop(image, None)
+            future.set_exception(exc)
+            raise
+        future.set_result(file_id)
+        return file_id
+
+
+    def _forget_rejected_files(self, exc: Exception, prompt: Any) -> bool:
+        """Drop the file ids used in ``prompt`` when the API rejected them. Returns whether any was dropped."""
+        from openai import BadRequestError, NotFoundError
+        if not isinstance(exc, (BadRequestError, NotFoundError)): return False
+        file_ids = {block["file_id"] for message in prompt if isinstance(message.get("content"), list)
+                    for block in message["content"] if "file_id" in block}
+        if not file_ids: return False
+        message = self._extract_error_message(exc)
+        code, param = str(getattr(exc, "code", None) or ""), str(getattr(exc, "param", None) or "")
+        names_file = any(file_id in message for file_id in file_ids)
+        file_error = code in _REJECTED_FILE_CODES or (isinstance(exc, NotFoundError) and "file" in param)
+        if not (names_file or file_error): return False
+        with self._upload_lock:
+            for image, future in list(self._uploads.items()):
+                if future.done() and future.exception() is None and future.result() in file_ids: del self._uploads[image]
+            for digest, file_id in list(self._file_ids.items()):
+                if file_id in file_ids:
+                    del self._file_ids[digest]
+                    self._uploaded.pop(digest, None)
+            self._save_file_cache()
+        return True
+
+
+    def delete_uploaded_files(self) -> None:
+        """Delete every file uploaded by this interface and forget the corresponding ids."""
+        with self._upload_lock:
+            uploaded = dict(self._uploaded)
+            self._uploads.clear()
+        for digest, file_id in uploaded.items():
+            self._with_retries(lambda: self.client.files.delete(file_id))
+            with self._upload_lock:
+                self._uploaded.pop(digest, None)
+                self._file_ids.pop(digest, None)
+                self._save_file_cache()
+
+
+    def _save_file_cache(self) -> None:
+        if not self.file_cache: return
+        directory = os.path.dirname(self.file_cache)
+        if directory: os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{self.file_cache}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file: json.dump(self._file_ids, file)
+        os.replace(temporary_path, self.file_cache)
+
+
+    def __enter__(self) -> "OpenAIInterface":
+        return self
+
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.delete_uploaded_files()
+
+
     def _attach_images(self, prompt: Any, images: list[Any]) -> Any:
         content_blocks: list[dict[str, Any]] = []
         for item in images:
             if isinstance(item, Image):
                 if item.url:
                     content_blocks.append({"type": "input_image", "image_url": item.url})
+                elif item.image_path and self.upload_images:
+                    content_blocks.append({"type": "input_image", "file_id": self._file_id(item)})
                 elif item.image_path:
-                    mime = mimetypes.guess_type(item.image_path)[0] or "image/png"
-                    content_blocks.append({"type": "input_image", "image_url": item.data_url(mime)})
+                    content_blocks.append({"type": "input_image", "image_url": item.payload_url()})
         
         if not content_blocks: return prompt
         updated_prompt: Any = []
@@ -180,3 +458,58 @@ class OpenAIInterface(LLMInterface):
             else:
                 updated_prompt.append(message)
         return updated_prompt if attached else prompt
+
+
+class _DaemonPool:
+    """
+    Reusable daemon threads for primary requests of hedged calls.
+
+    Threads are started only when none is idle and exit after ``idle_seconds``
+    without work. They are daemons, so a request that lost its race never delays
+    interpreter exit.
+    """
+    def __init__(self, idle_seconds: float = 60.0) -> None:
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._tasks: queue.SimpleQueue[tuple[Future, Callable[[], Any]]] = queue.SimpleQueue()
+        self._idle = 0
+
+    def submit(self, request: Callable[[], Any]) -> Future:
+        future: Future = Future()
+        with self._lock:
+            start_thread = self._idle == 0
+            if not start_thread: self._idle -= 1 # Reserve an idle thread for this task.
+        self._tasks.put((future, request))
+        if start_thread: threading.Thread(target=self._work, name="llmSHAP-hedge", daemon=True).start()
+        return future
+
+    def _work(self) -> None:
+        while True:
+            try: future, request = self._tasks.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                with self._lock:
+                    if self._idle == 0: continue # Reserved by a submit whose task is about to arrive.
+                    self._idle -= 1
+                return
+            result, error, running = None, None, future.set_running_or_notify_cancel()
+            if running:
+                try: result = request()
+                except BaseException as exc: error = exc
+            with self._lock: self._idle += 1 # Idle before the caller wakes up, so its next request reuses this thread.
+            if not running: continue
+            if error is None: future.set_result(result)
+            else: future.set_exception(error)
+
+
+_pool = _DaemonPool()
+
+
+def _spawn(request: Callable[[], Any]) -> Future:
+    """Run ``request`` on a daemon thread so a hedged race does not wait for the losing request."""
+    future: Future = Future()
+    def run() -> None:
+        if not future.set_running_or_notify_cancel(): return
+        try: future.set_result(request())
+        except BaseException as exc: future.set_exception(exc)
+    threading.Thread(target=run, daemon=True).start()
+    return future
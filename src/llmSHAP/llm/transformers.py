@@ -0,0 +1,218 @@
+import copy
+import queue
+import threading
+from concurrent.futures import Future
+
+from llmSHAP.types import Optional, Any
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class TransformersInterface(LLMInterface):
+    """
+        Local Hugging Face causal LM interface with greedy decoding.
+
+        Designed for CPU-only attribution runs. Every coalition prompt shares a long
+        prefix (chat template, system prompt and leading permanent keys), so the
+        interface keeps the KV cache of the longest token prefix shared by all prompts
+        seen so far and only runs the variable tail of each prompt through the model.
+        The shared prefix starts as the first prompt and is shrunk (and its cache
+        recomputed) whenever a prompt diverges earlier, so it converges to the true
+        common prefix after a handful of calls.
+
+        Calls to ``generate`` from several threads are collected by a single worker
+        thread into batches of up to ``max_batch_size`` prompts, which are then decoded
+        together. Decoding is always greedy, so outputs are deterministic and safe to
+        cache. Batching pads the tails of shorter prompts, which can introduce
+        floating-point differences between batch compositions; use
+        ``max_batch_size=1`` if bitwise reproducibility matters more than throughput.
+
+        :param model_name: Hugging Face model identifier or local path. Ignored when both
+            ``model`` and ``tokenizer`` are provided.
+        :param model: Optional preloaded causal LM.
+        :param tokenizer: Optional preloaded tokenizer.
+        :param max_tokens: Maximum number of new tokens to decode.
+        :param max_batch_size: Maximum number of concurrent requests decoded together.
+        :param batch_timeout: Seconds to wait for more requests before decoding a batch.
+        :param device: Torch device used for inference.
+        :param torch_threads: Optional number of intra-op threads for torch on CPU.
+        :param model_kwargs: Extra keyword arguments for ``from_pretrained``.
+    """
+    def __init__(self,
+                 *,
+                 model_name: Optional[str] = None,
+                 model: Optional[Any] = None,
+                 tokenizer: Optional[Any] = None,
+                 max_tokens: int = 512,
+                 max_batch_size: int = 8,
+                 batch_timeout: float = 0.01,
+                 device: str = "cpu",
+                 torch_threads: Optional[int] = None,
+                 model_kwargs: Optional[dict[str, Any]] = None,):
+        try:
+            import torch
+            from transformers import AutoModelForCausalLM, AutoTokenizer
+        except ImportError:
+            raise ImportError(
+                "TransformersInterface requires the 'transformers' extra.\n"
+                "Install with: pip install llmSHAP[transformers]"
+            ) from None
+        if (model is None or tokenizer is None) and not model_name:
+            raise ValueError("model_name is required unless both model and tokenizer are provided.")
+        assert max_batch_size >= 1, "max_batch_size must be >= 1"
+
+        if torch_threads is not None: torch.set_num_threads(torch_threads)
+        self._torch = torch
+        self.model_name = model_name or getattr(getattr(model, "config", None), "_name_or_path", "local-model")
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_name)
+        self.model = model if model is not None else AutoModelForCausalLM.from_pretrained(model_name, **(model_kwargs or {}))
+        self.model.to(device)
+        self.model.eval()
+        self.device = device
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.batch_timeout = batch_timeout
+
+        self._eos_ids = self._resolve_eos_ids()
+        pad_id = getattr(self.tokenizer, "pad_token_id", None)
+        self._pad_id: int = pad_id if pad_id is not None else (min(self._eos_ids) if self._eos_ids else 0)
+
+        self._prefix_ids: Optional[list[int]] = None
+        self._prefix_cache: Any = None
+        self._model_lock = threading.Lock()
+        self._requests: queue.Queue[tuple[list[int], Future]] = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+
+    def generate(self, prompt: Any, tools: Optional[list[Any]] = None, images: Optional[list[Any]] = None,) -> str:
+        if images: raise ValueError("TransformersInterface does not support images.")
+        if self.max_batch_size == 1: return self.generate_batch([prompt])[0]
+        self._ensure_worker()
+        future: Future[str] = Future()
+        self._requests.put((self._encode_prompt(prompt), future))
+        return future.result()
+
+
+    def generate_batch(self, prompts: list[Any]) -> list[str]:
+        """Greedy-decode a list of prompts in one batch and return the decoded outputs."""
+        return self._decode_batch([self._encode_prompt(prompt) for prompt in prompts])
+
+
+    def score(self, prompt: Any, target: str, tools: Optional[list[Any]] = None, images: Optional[list[Any]] = None,) -> list[float]:
+        """Return the per-token log-probabilities of ``target`` following ``prompt`` (one forward pass, no decoding)."""
+        if images: raise ValueError("TransformersInterface does not support images.")
+        prompt_ids = self._encode_prompt(prompt)
+        target_ids = list(self.tokenizer.encode(target, add_special_tokens=False))
+        if not target_ids: return []
+        torch = self._torch
+        with self._model_lock, torch.inference_mode():
+            logits, _, _, _ = self._forward_tails([prompt_ids + target_ids], tail_starts=[len(prompt_ids) - 1])
+            tail_start = len(prompt_ids) + len(target_ids) - logits.shape[1]
+            predicting = logits[0, len(prompt_ids) - 1 - tail_start:-1, :].log_softmax(dim=-1)
+            return predicting.gather(-1, torch.tensor(target_ids, device=self.device).unsqueeze(-1)).squeeze(-1).tolist()
+
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._batch_worker, name="llmSHAP-transformers", daemon=True)
+                self._worker.start()
+
+
+    def _batch_worker(self) -> None:
+        while True:
+            batch = [self._requests.get()]
+            while len(batch) < self.max_batch_size:
+                try: batch.append(self._requests.get(timeout=self.batch_timeout))
+                except queue.Empty: break
+            try:
+                outputs = self._decode_batch([ids for ids, _ in batch])
+            except Exception as exc:
+                for _, future in batch: future.set_exception(exc)
+                continue
+            for (_, future), output in zip(batch, outputs): future.set_result(output)
+
+
+    def _encode_prompt(self, prompt: Any) -> list[int]:
+        if isinstance(prompt, str): text = prompt
+        elif getattr(self.tokenizer, "chat_template", None):
+            text = self.tokenizer.apply_chat_template(prompt, tokenize=False, add_generation_prompt=True)
+        else:
+            text = "".join(f"{message.get('role', 'user')}: {message.get('content', '')}\n" for message in prompt) + "assistant: "
+        ids = list(self.tokenizer.encode(text, add_special_tokens=False))
+        if not ids: raise ValueError("Prompt encodes to zero tokens.")
+        return ids
+
+
+    def _resolve_eos_ids(self) -> set[int]:
+        generation_config = getattr(self.model, "generation_config", None)
+        eos = getattr(generation_config, "eos_token_id", None)
+        if eos is None: eos = getattr(self.tokenizer, "eos_token_id", None)
+        if eos is None: return set()
+        return set(eos) if isinstance(eos, (list, tuple)) else {eos}
+
+
+    def _shared_prefix(self, rows: list[list[int]], tail_starts: list[int]) -> tuple[int, Any]:
+        """Shrink the stored prefix to fit ``rows`` and return its length and a private cache copy."""
+        reference = self._prefix_ids if self._prefix_ids is not None else rows[0]
+        limit = min(len(reference), *tail_starts)
+        length = 0
+        while length < limit and all(row[length] == reference[length] for row in rows): length += 1
+
+        if self._prefix_ids is None or length < len(self._prefix_ids):
+            self._prefix_ids, self._prefix_cache = None, None
+            if length > 0:
+                output = self.model(self._torch.tensor([rows[0][:length]], device=self.device), use_cache=True)
+                self._prefix_ids, self._prefix_cache = rows[0][:length], output.past_key_values
+
+        if self._prefix_ids is None: return 0, None
+        cache = copy.deepcopy(self._prefix_cache)
+        if len(rows) > 1: cache.batch_repeat_interleave(len(rows))
+        return len(self._prefix_ids), cache
+
+
+    def _forward_tails(self, rows: list[list[int]], tail_starts: Optional[list[int]] = None) -> tuple[Any, Any, Any, Any]:
+        """
+        Run the non-shared tails through the model. Returns (logits, cache, attention_mask, last_positions).
+
+        ``tail_starts`` bounds the reused prefix per row so logits are available from those
+        positions on; by default only the last token of each row is required.
+        """
+        torch = self._torch
+        prefix_length, cache = self._shared_prefix(rows, tail_starts or [len(row) - 1 for row in rows])
+        tails = [row[prefix_length:] for row in rows]
+        width = max(len(tail) for tail in tails)
+        input_ids = torch.tensor([[self._pad_id] * (width - len(tail)) + tail for tail in tails], device=self.device)
+        attention_mask = torch.tensor([[1] * prefix_length + [0] * (width - len(tail)) + [1] * len(tail) for tail in tails], device=self.device)
+        positions = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+        output = self.model(input_ids=input_ids,
+                            attention_mask=attention_mask,
+                            position_ids=positions[:, prefix_length:],
+                            past_key_values=cache,
+                            use_cache=True)
+        return output.logits, output.past_key_values, attention_mask, positions[:, -1]
+
+
+    def _decode_batch(self, rows: list[list[int]]) -> list[str]:
+        torch = self._torch
+        with self._model_lock, torch.inference_mode():
+            logits, cache, attention_mask, positions = self._forward_tails(rows)
+            generated: list[list[int]] = [[] for _ in rows]
+            finished = [False] * len(rows)
+            for _ in range(self.max_tokens):
+                next_tokens = logits[:, -1, :].argmax(dim=-1)
+                for index, token in enumerate(next_tokens.tolist()):
+                    if finished[index]: continue
+                    if token in self._eos_ids: finished[index] = True
+                    else: generated[index].append(token)
+                if all(finished): break
+                next_tokens = torch.where(torch.tensor(finished, device=self.device), self._pad_id, next_tokens)
+                attention_mask = torch.cat([attention_mask, attention_mask.new_ones((len(rows), 1))], dim=-1)
+                positions = positions + 1
+                output = self.model(input_ids=next_tokens.unsqueeze(-1),
+                                    attention_mask=attention_mask,
+                                    position_ids=positions.unsqueeze(-1),
+                                    past_key_values=cache,
+                                    use_cache=True)
+                logits, cache = output.logits, output.past_key_values
+        return [self.tokenizer.decode(tokens, skip_special_tokens=True) for tokens in generated]
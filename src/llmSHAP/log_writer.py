@@ -0,0 +1,159 @@
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+
+from llmSHAP.types import Any, Optional
+
+
+class JSONLLogWriter:
+    """
+    Asynchronous JSON-lines sink used by ``AttributionFunction`` when ``logging=True``.
+
+    Records are put on a bounded queue and written by a single background thread,
+    so worker threads doing LLM calls never block on file I/O (only on a full queue,
+    which provides back-pressure). The writer drains up to ``batch_size`` records per
+    write, flushes the file after every batch, and rotates the file once
+    it exceeds ``max_bytes`` (``log.jsonl`` -> ``log.jsonl.1`` ... ``log.jsonl.<backup_count>``),
+    optionally gzip-compressing rotated segments.
+
+    Args:
+        path: Target ``.jsonl`` file. Parent directories are created once.
+        max_queue: Maximum number of pending records before ``write`` blocks.
+        batch_size: Maximum number of records written per batch.
+        flush_interval: Seconds the background thread waits on an empty queue before polling again.
+        max_bytes: Rotate when the active file would exceed this size. ``None`` disables rotation.
+        backup_count: Number of rotated segments to keep.
+        compress: Gzip rotated segments (``log.jsonl.1.gz``).
+    """
+    _SENTINEL: Any = object()
+    _shared: dict[str, "JSONLLogWriter"] = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path: str) -> "JSONLLogWriter":
+        """
+        Process-wide writer for ``path`` (created with default settings on first use).
+
+        Attributions created with ``logging=True`` use this, so every instance logging
+        to the same file shares one background thread and one rotation state.
+        """
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            writer = cls._shared.get(key)
+            if writer is None or writer._error is not None: writer = cls._shared[key] = cls(path)
+            return writer
+
+    def __init__(self,
+                 path: str,
+                 *,
+                 max_queue: int = 10_000,
+                 batch_size: int = 256,
+                 flush_interval: float = 1.0,
+                 max_bytes: Optional[int] = None,
+                 backup_count: int = 5,
+                 compress: bool = False,) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self._queue: queue.Queue[Any] = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Enqueue one record. Blocks only while the queue is full."""
+        if self._error is not None: raise RuntimeError(f"Log writer for {self.path!r} failed.") from self._error
+        self._ensure_started()
+        self._queue.put(record)
+
+    def flush(self) -> None:
+        """Block until every enqueued record has been written and flushed (raises if the writer failed)."""
+        thread = self._thread
+        if thread is not None:
+            with self._queue.all_tasks_done:
+                while self._queue.unfinished_tasks and thread.is_alive(): self._queue.all_tasks_done.wait(self.flush_interval)
+        if self._error is not None: raise RuntimeError(f"Log writer for {self.path!r} failed.") from self._error
+
+    def close(self) -> None:
+        """Flush pending records and stop the background thread."""
+        with self._start_lock:
+            thread, self._thread = self._thread, None
+        if thread is None: return
+        self._queue.put(self._SENTINEL)
+        thread.join()
+
+    def __enter__(self) -> "JSONLLogWriter":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None: return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="llmSHAP-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        file = None
+        running = True
+        try:
+            directory = os.path.dirname(self.path)
+            if directory: os.makedirs(directory, exist_ok=True)
+            file = open(self.path, "a", encoding="utf-8")
+            size = file.tell()
+            while running:
+                try: batch = [self._queue.get(timeout=self.flush_interval)]
+                except queue.Empty: continue
+                while len(batch) < self.batch_size:
+                    try: batch.append(self._queue.get_nowait())
+                    except queue.Empty: break
+                lines = []
+                for record in batch:
+                    if record is self._SENTINEL: running = False; continue
+                    lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+                chunk = "".join(lines)
+                chunk_size = len(chunk.encode("utf-8"))
+                if self.max_bytes is not None and size > 0 and size + chunk_size > self.max_bytes:
+                    file.close()
+                    file = None
+                    self._rotate()
+                    file = open(self.path, "a", encoding="utf-8")
+                    size = 0
+                if chunk:
+                    file.write(chunk)
+                    file.flush()
+                    size += chunk_size
+                for _ in batch: self._queue.task_done()
+        except BaseException as exc: # Surfaced by the next ``write`` or ``flush``.
+            self._error = exc
+            while True: # Unblock writers and flushers.
+                try: self._queue.get_nowait(); self._queue.task_done()
+                except queue.Empty: break
+        finally:
+            if file is not None: file.close()
+
+    def _segment(self, index: int) -> str:
+        return f"{self.path}.{index}.gz" if self.compress else f"{self.path}.{index}"
+
+    def _rotate(self) -> None:
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        oldest = self._segment(self.backup_count)
+        if os.path.exists(oldest): os.remove(oldest)
+        for index in range(self.backup_count - 1, 0, -1):
+            if os.path.exists(self._segment(index)): os.replace(self._segment(index), self._segment(index + 1))
+        if self.compress:
+            with open(self.path, "rb") as source, gzip.open(self._segment(1), "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._segment(1))
@@ -0,0 +1,142 @@
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from llmSHAP.types import Any, Callable, Dict, Optional
+
+
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    """Point-in-time view of an ``AttributionMetrics``."""
+    elapsed_seconds: float
+    generations: int
+    failures: int
+    cache_hits: int
+    inflight_joins: int
+    retries: int
+    generation_seconds: float
+    in_flight: int
+    contributions_done: int
+    contributions_total: Optional[int]
+    features_done: int
+    features_total: int
+    finished: bool
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.generations / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of coalition lookups served from the cache or by joining an in-flight generation."""
+        served = self.cache_hits + self.inflight_joins
+        lookups = served + self.generations + self.failures
+        return served / lookups if lookups else 0.0
+
+    @property
+    def mean_generation_seconds(self) -> float:
+        return self.generation_seconds / self.generations if self.generations else 0.0
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Completed fraction of the run (by marginal contributions when their total is known, else by features)."""
+        if self.finished: return 1.0
+        if self.contributions_total: return min(1.0, self.contributions_done / self.contributions_total)
+        if self.features_total: return self.features_done / self.features_total
+        return None
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated remaining seconds at the throughput observed so far (``None`` before any progress)."""
+        progress = self.progress
+        if not progress: return None
+        return self.elapsed_seconds * (1.0 - progress) / progress
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Counters and derived rates as a JSON-serializable dict."""
+        return {**asdict(self),
+                "requests_per_second": self.requests_per_second,
+                "cache_hit_rate": self.cache_hit_rate,
+                "mean_generation_seconds": self.mean_generation_seconds,
+                "progress": self.progress,
+                "eta_seconds": self.eta_seconds}
+
+
+class AttributionMetrics:
+    """
+    Thread-safe counters of one attribution run.
+
+    Updated on every coalition lookup and completed marginal contribution;
+    ``snapshot()`` may be called from any thread while the run is in progress.
+    Retries are read from ``retry_counter`` (e.g. ``OpenAIInterface.retry_count``)
+    relative to its value when the run started.
+
+    Args:
+        features_total: Number of features to attribute.
+        contributions_total: Number of marginal contributions the run schedules, if known.
+        retry_counter: Returns the model's cumulative retry count.
+    """
+    def __init__(self,
+                 features_total: int = 0,
+                 contributions_total: Optional[int] = None,
+                 retry_counter: Optional[Callable[[], int]] = None,) -> None:
+        self.features_total = features_total
+        self.contributions_total = contributions_total
+        self._retry_counter = retry_counter
+        self._retries_at_start = retry_counter() if retry_counter is not None else 0
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._stop: Optional[float] = None
+        self._generations = 0
+        self._failures = 0
+        self._cache_hits = 0
+        self._inflight_joins = 0
+        self._generation_seconds = 0.0
+        self._in_flight = 0
+        self._contributions_done = 0
+        self._features_done = 0
+
+    def record_generation(self, seconds: float) -> None:
+        with self._lock:
+            self._generations += 1
+            self._generation_seconds += seconds
+
+    def record_failure(self) -> None:
+        with self._lock: self._failures += 1
+
+    def record_cache_hit(self) -> None:
+        with self._lock: self._cache_hits += 1
+
+    def record_inflight_join(self) -> None:
+        with self._lock: self._inflight_joins += 1
+
+    def contribution_scheduled(self) -> None:
+        with self._lock: self._in_flight += 1
+
+    def contribution_done(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._contributions_done += 1
+
+    def feature_done(self) -> None:
+        with self._lock: self._features_done += 1
+
+    def finish(self) -> None:
+        with self._lock: self._stop = time.perf_counter()
+
+    def snapshot(self) -> MetricsSnapshot:
+        retries = self._retry_counter() - self._retries_at_start if self._retry_counter is not None else 0
+        with self._lock:
+            return MetricsSnapshot(elapsed_seconds=(self._stop or time.perf_counter()) - self._start,
+                                   generations=self._generations,
+                                   failures=self._failures,
+                                   cache_hits=self._cache_hits,
+                                   inflight_joins=self._inflight_joins,
+                                   retries=retries,
+                                   generation_seconds=self._generation_seconds,
+                                   in_flight=self._in_flight,
+                                   contributions_done=self._contributions_done,
+                                   contributions_total=self.contributions_total,
+                                   features_done=self._features_done,
+                                   features_total=self.features_total,
+                                   finished=self._stop is not None)
@@ -0,0 +1,267 @@
+"""
+Optional Prometheus-style metrics for long-running attribution services.
+
+Instrumentation is off by default: every hook first checks the module-level
+registry and returns immediately when none is installed, so a disabled hook
+costs one function call. ``enable()`` installs a ``MetricsRegistry`` that
+records counters and histograms labeled by model and sampler:
+
+- ``llmshap_generations_total`` / ``llmshap_generation_seconds``: model calls (``status`` ok/error).
+- ``llmshap_value_function_evaluations_total`` / ``llmshap_value_function_seconds``.
+- ``llmshap_cache_lookups_total`` (``result`` hit/miss/join) and ``llmshap_cache_evictions_total``.
+- ``llmshap_retries_total`` (``reason`` rate_limit/error) and ``llmshap_rate_limit_wait_seconds_total``.
+- ``llmshap_tokens_total`` (``kind`` input/output).
+
+The registry renders the Prometheus text exposition format (``exposition()``),
+dumps it to a file (``write(path)``) or serves it over HTTP (``serve(port)``).
+
+Example:
+    registry = monitoring.enable()
+    server = registry.serve(port=9464)   # GET /metrics
+    ...
+    registry.write("llmshap.prom")
+"""
+import math
+import os
+import threading
+from bisect import bisect_left
+
+from llmSHAP.types import Any, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+"""Default buckets (seconds) of the generation latency histogram."""
+FAST_BUCKETS: Tuple[float, ...] = (1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0)
+"""Default buckets (seconds) of the value function latency histogram."""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra: pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value): return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Family:
+    """A named metric with a fixed set of label names; children are created per label value tuple."""
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: Any) -> Any:
+        """Return the child for the label ``values`` (in ``labelnames`` order)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is not None: return child
+        if len(key) != len(self.labelnames): raise ValueError(f"{self.name} expects labels {self.labelnames}.")
+        with self._lock: return self._children.setdefault(key, self._new_child())
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def exposition(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+        return "\n".join(lines) + "\n"
+
+
+class _CounterChild:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock: self.value += amount
+
+
+class Counter(_Family):
+    """Monotonically increasing counter."""
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _samples(self) -> List[str]:
+        with self._lock: children = list(self._children.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}" for key, child in sorted(children)]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot: above the largest bound.
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Family):
+    """Histogram with fixed cumulative buckets (``_bucket``, ``_sum`` and ``_count`` samples)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _samples(self) -> List[str]:
+        with self._lock: children = list(self._children.items())
+        lines = []
+        for key, child in sorted(children):
+            with child._lock: counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                bucket_label = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of llmSHAP metric families with text exposition, file dump and an HTTP endpoint."""
+    def __init__(self) -> None:
+        self._families: Dict[str, _Family] = {}
+        self.generations = self.counter("llmshap_generations_total", "Model calls made for coalitions.", ("model", "sampler", "status"))
+        self.generation_seconds = self.histogram("llmshap_generation_seconds", "Model call latency.", ("model", "sampler"))
+        self.value_function_evaluations = self.counter("llmshap_value_function_evaluations_total", "Value function evaluations.",
+                                                       ("model", "sampler", "value_function"))
+        self.value_function_seconds = self.histogram("llmshap_value_function_seconds", "Value function latency.",
+                                                     ("model", "sampler", "value_function"), buckets=FAST_BUCKETS)
+        self.cache_lookups = self.counter("llmshap_cache_lookups_total", "Generation cache lookups by result.", ("model", "sampler", "result"))
+        self.cache_evictions = self.counter("llmshap_cache_evictions_total", "Generation cache evictions.", ("model", "sampler"))
+        self.retries = self.counter("llmshap_retries_total", "Retried model requests.", ("model", "reason"))
+        self.rate_limit_wait_seconds = self.counter("llmshap_rate_limit_wait_seconds_total", "Backoff time spent after rate limits.", ("model",))
+        self.tokens = self.counter("llmshap_tokens_total", "Tokens reported by the model API.", ("model", "kind"))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames)) # type: ignore[return-value]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets)) # type: ignore[return-value]
+
+    def _register(self, family: _Family) -> _Family:
+        if family.name in self._families: raise ValueError(f"Metric {family.name!r} is already registered.")
+        self._families[family.name] = family
+        return family
+
+    def exposition(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        return "".join(family.exposition() for family in self._families.values())
+
+    def write(self, path: str) -> None:
+        """Atomically write ``exposition()`` to ``path`` (e.g. for the node exporter's textfile collector)."""
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file: file.write(self.exposition())
+        os.replace(temporary_path, path)
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> Any:
+        """Serve ``exposition()`` at ``/metrics`` on a daemon thread. Call ``shutdown()`` on the returned server to stop."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args: Any) -> None: pass
+
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] not in {"/", "/metrics"}:
+                    self.send_error(404)
+                    return
+                payload = registry.exposition().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="llmSHAP-metrics", daemon=True).start()
+        return server
+
+
+_registry: Optional[MetricsRegistry] = None
+
+
+def enable(registry: Optional[MetricsRegistry] = None) -> MetricsRegistry:
+    """Install ``registry`` (a new one by default) as the process-wide metrics sink and return it."""
+    global _registry
+    _registry = registry or MetricsRegistry()
+    return _registry
+
+
+def disable() -> None:
+    """Stop recording metrics."""
+    global _registry
+    _registry = None
+
+
+def get_registry() -> Optional[MetricsRegistry]:
+    return _registry
+
+
+def enabled() -> bool:
+    return _registry is not None
+
+
+def observe_generation(model: str, sampler: str, seconds: float, ok: bool = True) -> None:
+    registry = _registry
+    if registry is None: return
+    registry.generations.labels(model, sampler, "ok" if ok else "error").inc()
+    if ok: registry.generation_seconds.labels(model, sampler).observe(seconds)
+
+
+def observe_value_function(model: str, sampler: str, value_function: str, seconds: float) -> None:
+    registry = _registry
+    if registry is None: return
+    registry.value_function_evaluations.labels(model, sampler, value_function).inc()
+    registry.value_function_seconds.labels(model, sampler, value_function).observe(seconds)
+
+
+def count_cache_lookup(model: str, sampler: str, result: str) -> None:
+    registry = _registry
+    if registry is None: return
+    registry.cache_lookups.labels(model, sampler, result).inc()
+
+
+def count_cache_evictions(model: str, sampler: str, count: int) -> None:
+    registry = _registry
+    if registry is None or count <= 0: return
+    registry.cache_evictions.labels(model, sampler).inc(count)
+
+
+def count_retry(model: str, reason: str, wait_seconds: float) -> None:
+    registry = _registry
+    if registry is None: return
+    registry.retries.labels(model, reason).inc()
+    if reason == "rate_limit": registry.rate_limit_wait_seconds.labels(model).inc(wait_seconds)
+
+
+def count_tokens(model: str, input_tokens: Optional[int], output_tokens: Optional[int]) -> None:
+    registry = _registry
+    if registry is None: return
+    if input_tokens: registry.tokens.labels(model, "input").inc(input_tokens)
+    if output_tokens: registry.tokens.labels(model, "output").inc(output_tokens)
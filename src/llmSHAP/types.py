@@ -3,8 +3,12 @@ from typing import (
     Type,
     Dict,
     Set,
+    FrozenSet,
     Any,
     Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
     Union,
     Optional,
     List,
@@ -1,12 +1,14 @@
 from abc import ABC, abstractmethod
 from collections import Counter
-from functools import lru_cache
+from concurrent.futures import Future
+import importlib.util
 import math
-import os
 import re
+import threading
 
 from llmSHAP.types import TYPE_CHECKING, ClassVar, Optional, Any
-from llmSHAP.generation import Generation
+from llmSHAP.generation import Generation, LogProbGeneration
+from llmSHAP.cache import ScoreCache
 
 if TYPE_CHECKING:
     from sentence_transformers import SentenceTransformer
@@ -57,15 +59,28 @@ class TFIDFCosineSimilarity(ValueFunction):
     `"hello, world!"` -> `["hello", "world"]`
     `"state-of-the-art"` -> `["state", "of", "the", "art"]`
     `"a b c test"` -> `["test"]`
+
+    Parameters
+    ----------
+    score_cache:
+        Optional ``ScoreCache`` to share scores between instances. By default each
+        instance owns a cache with ``cache_size`` entries.
+    cache_size:
+        Capacity of the per-instance score cache.
     """
     _token_pattern: ClassVar[re.Pattern[str]] = re.compile(r"(?u)\b\w\w+\b")
     _DOCUMENT_COUNT = 2
 
+    def __init__(self, score_cache: Optional[ScoreCache] = None, cache_size: int = 2_000):
+        self.score_cache = score_cache if score_cache is not None else ScoreCache(cache_size)
+
     def __call__(self, g1: Generation, g2: Generation) -> float:
         return self._cached(g1.output, g2.output)
-    
-    @lru_cache(maxsize=2_000)
+
     def _cached(self, string1: str, string2: str) -> float:
+        return self.score_cache.get_or_compute("tfidf", string1, string2, self._similarity)
+
+    def _similarity(self, string1: str, string2: str) -> float:
         if not string1.strip() or not string2.strip(): return 0.0
 
         term_counts_document_1 = Counter(self._token_pattern.findall(string1.lower()))
@@ -96,6 +111,29 @@ class TFIDFCosineSimilarity(ValueFunction):
 
 
 
+#########################################################
+# Exact Match.
+#########################################################
+class ExactMatch(ValueFunction):
+    """
+    ``1.0`` if the coalition output equals the base output, else ``0.0``.
+
+    Parameters
+    ----------
+    normalize:
+        Compare outputs after stripping surrounding whitespace and case folding
+        (default). With ``False`` outputs must match character for character.
+    """
+    def __init__(self, normalize: bool = True):
+        self.normalize = normalize
+
+    def __call__(self, base_generation: Generation, coalition_generation: Generation) -> float:
+        base, coalition = base_generation.output, coalition_generation.output
+        if self.normalize: base, coalition = base.strip().casefold(), coalition.strip().casefold()
+        return float(base == coalition)
+
+
+
 #########################################################
 # Embedding-Based Similarity Funciton.
 #########################################################
@@ -120,71 +158,116 @@ class EmbeddingCosineSimilarity(ValueFunction):
         for example ``https://api.openai.com/v1`` or a self-hosted proxy. When
         set, local ``sentence-transformers`` are not initialized. Requires
         ``OPENAI_API_KEY`` when provided.
+    score_cache:
+        Optional ``ScoreCache`` to share scores between instances. By default each
+        instance owns a cache with ``cache_size`` entries.
+    cache_size:
+        Capacity of the per-instance score cache.
+    warm_up:
+        Local mode only. ``"lazy"`` (default) loads the model on the first
+        comparison, ``"background"`` starts loading it on a daemon thread right
+        away (the first comparison waits for it) and ``"eager"`` loads it in the
+        constructor.
+    max_connections:
+        API mode only: expected number of concurrent embedding requests. The client is
+        shared with other API users of the same endpoint and key (see
+        ``llmSHAP.llm.clients``).
 
     Notes
     -----
     - Returns ``0.0`` if either compared output is empty/whitespace.
-    - Uses an internal LRU cache to avoid recomputing repeated pairs.
-    - Local mode loads the sentence-transformers model lazily and shares it
-      across instances.
+    - Uses a ``ScoreCache`` to avoid recomputing repeated pairs.
+    - Local mode loads the sentence-transformers model lazily (see ``warm_up``)
+      and shares it across instances.
     """
     DEFAULT_LOCAL_EMBEDDING_MODEL: ClassVar[str] = "sentence-transformers/all-MiniLM-L6-v2"
     DEFAULT_API_EMBEDDING_MODEL: ClassVar[str] = "text-embedding-3-small"
     _model: ClassVar[Optional["SentenceTransformer"]] = None
+    _model_future: ClassVar[Optional[Future]] = None
+    _model_lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __init__(
         self,
         model_name: Optional[str] = None,
         api_url_endpoint: Optional[str] = None,
+        score_cache: Optional[ScoreCache] = None,
+        cache_size: int = 2_000,
+        warm_up: str = "lazy",
+        max_connections: Optional[int] = None,
     ):
+        self.score_cache = score_cache if score_cache is not None else ScoreCache(cache_size)
         self._api_client: Optional[Any] = None
         resolved_model_name = model_name or self.DEFAULT_LOCAL_EMBEDDING_MODEL
         self._api_model_name: str = resolved_model_name
 
         if api_url_endpoint:
             try:
-                from openai import OpenAI
-                from dotenv import load_dotenv
+                from openai import OpenAI # noqa: F401
+                from dotenv import load_dotenv # noqa: F401
             except ImportError:
                 raise ImportError(
                     "EmbeddingCosineSimilarity with api_url_endpoint requires the 'openai' extra.\n"
                     "Install with: pip install llmSHAP[openai]"
                 ) from None
+            from llmSHAP.llm.clients import api_key_from_env, shared_client
 
-            load_dotenv()
-            api_key = os.getenv("OPENAI_API_KEY")
+            api_key = api_key_from_env()
             if not api_key:
                 raise RuntimeError("OPENAI_API_KEY is not set. Set it before using api_url_endpoint.")
 
             if resolved_model_name == self.DEFAULT_LOCAL_EMBEDDING_MODEL:
                 self._api_model_name = self.DEFAULT_API_EMBEDDING_MODEL
-            self._api_client = OpenAI(api_key=api_key, base_url=api_url_endpoint)
+            self._api_client = shared_client(api_key=api_key, base_url=api_url_endpoint, max_connections=max_connections)
             return
 
-        if EmbeddingCosineSimilarity._model is None:
+        if warm_up not in {"lazy", "background", "eager"}: raise ValueError("warm_up must be 'lazy', 'background' or 'eager'.")
+        if EmbeddingCosineSimilarity._model is None and importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError(
+                "EmbeddingCosineSimilarity requires the 'embeddings' extra.\n"
+                "Install with: pip install llmSHAP[embeddings]"
+            )
+        self._local_model_name = resolved_model_name
+        if warm_up == "background": self._load_model(resolved_model_name, background=True)
+        elif warm_up == "eager": self._load_model(resolved_model_name).result()
+
+    @classmethod
+    def _load_model(cls, model_name: str, background: bool = False) -> Future:
+        """Start loading the shared sentence-transformers model once; the returned future resolves to it."""
+        with cls._model_lock:
+            if cls._model_future is not None: return cls._model_future
+            future = cls._model_future = Future()
+        if cls._model is not None:
+            future.set_result(cls._model)
+            return future
+        def load() -> None:
             try:
                 from sentence_transformers import SentenceTransformer
-            except ImportError:
-                raise ImportError(
-                    "EmbeddingCosineSimilarity requires the 'embeddings' extra.\n"
-                    "Install with: pip install llmSHAP[embeddings]"
-                ) from None
-            print(f"Loading sentence transformer model {resolved_model_name}...")
-            EmbeddingCosineSimilarity._model = SentenceTransformer(resolved_model_name)
+                print(f"Loading sentence transformer model {model_name}...")
+                cls._model = SentenceTransformer(model_name)
+                future.set_result(cls._model)
+            except BaseException as exc:
+                with cls._model_lock: cls._model_future = None # Let a later call retry.
+                future.set_exception(exc)
+        if background: threading.Thread(target=load, name="llmSHAP-embedding-warm-up", daemon=True).start()
+        else: load()
+        return future
 
     def __call__(self, g1: Generation, g2: Generation) -> float:
         return self._cached(g1.output, g2.output)
-    
-    @lru_cache(maxsize=2_000)
+
     def _cached(self, string1: str, string2: str) -> float:
+        namespace = f"embedding:{self._api_model_name if self._api_client is not None else 'local'}"
+        return self.score_cache.get_or_compute(namespace, string1, string2, self._similarity)
+
+    def _similarity(self, string1: str, string2: str) -> float:
         if not string1.strip() or not string2.strip(): return 0.0
         if self._api_client is not None:
             response = self._api_client.embeddings.create(model=self._api_model_name, input=[string1, string2])
             embedding1 = response.data[0].embedding
             embedding2 = response.data[1].embedding
             return self._cosine_from_vectors(embedding1, embedding2)
-        assert self._model is not None
-        embeddings = self._model.encode([string1, string2], convert_to_numpy=True)
+        model = self._load_model(self._local_model_name).result()
+        embeddings = model.encode([string1, string2], convert_to_numpy=True)
         return self._cosine_from_vectors(embeddings[0], embeddings[1])
 
     @staticmethod
@@ -199,3 +282,46 @@ class EmbeddingCosineSimilarity(ValueFunction):
         norm2 = float(np.linalg.norm(array2))
         if norm1 == 0.0 or norm2 == 0.0: return 0.0
         return dot / (norm1 * norm2)
+
+
+
+#########################################################
+# Log-Likelihood of a Fixed Target Output.
+#########################################################
+class TargetLogLikelihood(ValueFunction):
+    """
+    Log-likelihood of a fixed target output given each coalition's prompt.
+
+    Instead of generating free text for every coalition and comparing it to the
+    base output, the attribution generates the base output once and then only
+    *scores* it under each coalition prompt via ``LLMInterface.score``. Scoring is
+    deterministic and needs (at most) a single output token per call.
+
+    Parameters
+    ----------
+    target:
+        Optional fixed answer to score (e.g. a known diagnosis). When omitted, the
+        output generated from the full prompt is used as the target.
+    reduction:
+        ``"mean"`` (default) averages the token log-probabilities so that targets of
+        different lengths are comparable, ``"sum"`` returns the total log-likelihood.
+
+    Notes
+    -----
+    - Requires an ``LLMInterface`` that implements ``score`` (``OpenAIInterface``
+      against a completions endpoint with echo support, or ``TransformersInterface``).
+    - Returns ``0.0`` for a target without tokens.
+    """
+    def __init__(self, target: Optional[str] = None, reduction: str = "mean"):
+        if reduction not in {"mean", "sum"}: raise ValueError("reduction must be 'mean' or 'sum'.")
+        self.target = target
+        self.reduction = reduction
+
+    def __call__(self, base_generation: Generation, coalition_generation: Generation) -> float:
+        if not isinstance(coalition_generation, LogProbGeneration):
+            raise TypeError("TargetLogLikelihood requires scored generations (LogProbGeneration).")
+        token_logprobs = coalition_generation.token_logprobs
+        if not token_logprobs: return 0.0
+        total = math.fsum(token_logprobs)
+        return total / len(token_logprobs) if self.reduction == "mean" else total
+
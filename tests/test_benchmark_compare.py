@@ -0,0 +1,44 @@
+import importlib.util
+import random
+from pathlib import Path
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("matplotlib")
+
+_spec = importlib.util.spec_from_file_location("benchmark_utils", Path(__file__).resolve().parents[1] / "analysis" / "benchmark" / "utils.py")
+benchmark_utils = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(benchmark_utils)
+
+
+def _random_data(seed, number_of_datapoints=40):
+    rng = random.Random(seed)
+    gold, methods = [], {"Sampled": [], "Sparse": [], "Zero": []}
+    for _ in range(number_of_datapoints):
+        feature_count = rng.randint(1, 7)
+        keys = [f"f{index}" for index in range(feature_count)]
+        gold.append({"feature_count": feature_count, "attribution": {key: {"score": rng.uniform(-1, 1)} for key in keys}})
+        methods["Sampled"].append({"attribution": {key: {"score": rng.uniform(-1, 1)} for key in keys}})
+        methods["Sparse"].append({"attribution": {key: rng.choice([rng.uniform(-1, 1), "n/a", {"value": 1}]) for key in keys if rng.random() < 0.6}})
+        methods["Zero"].append({"attribution": {}})
+    return {"Shapley value": gold, **methods}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_compare_arrays_matches_compare(seed):
+    comparator = benchmark_utils.AttributionComparator()
+    data = _random_data(seed)
+    expected, actual = comparator.compare(data), comparator.compare_arrays(data)
+    assert actual.keys() == expected.keys()
+    for method_name, stats in expected.items():
+        assert actual[method_name]["per_datapoint"] == pytest.approx(stats["per_datapoint"], abs=1e-12)
+        assert actual[method_name]["mean_similarity"] == pytest.approx(stats["mean_similarity"], abs=1e-12)
+        assert actual[method_name]["by_feature_count"] == pytest.approx(stats["by_feature_count"], abs=1e-12)
+        assert actual[method_name]["feature_count_summary"] == pytest.approx(stats["feature_count_summary"], abs=1e-12)
+
+
+def test_compare_arrays_with_only_the_gold_method():
+    comparator = benchmark_utils.AttributionComparator()
+    data = {"Shapley value": _random_data(0)["Shapley value"]}
+    assert comparator.compare(data) == comparator.compare_arrays(data) == {}
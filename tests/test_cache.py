@@ -0,0 +1,79 @@
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution
+from llmSHAP.cache import BoundedCache, approximate_nbytes
+from llmSHAP.generation import Generation
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class EchoLLM(LLMInterface):
+    def generate(self, prompt, tools=None, images=None) -> str:
+        return prompt[-1]["content"]
+
+
+def test_lru_evicts_least_recently_used():
+    cache = BoundedCache(max_entries=2)
+    cache.put("a", 1); cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.stats().evictions == 1
+
+
+def test_lfu_evicts_least_frequently_used():
+    cache = BoundedCache(max_entries=2, policy="lfu")
+    cache.put("a", 1); cache.put("b", 2)
+    cache.get("a"); cache.get("a"); cache.get("b")
+    cache.put("c", 3)
+    assert "a" in cache and "c" in cache and "b" not in cache
+
+
+def test_lfu_ties_evict_oldest():
+    cache = BoundedCache(max_entries=2, policy="lfu")
+    cache.put("a", 1); cache.put("b", 2); cache.put("c", 3)
+    assert "a" not in cache and "b" in cache and "c" in cache
+
+
+def test_byte_bound_and_accounting():
+    cache = BoundedCache(max_bytes=10)
+    cache.put("a", Generation(output="12345"))
+    cache.put("b", Generation(output="678"))
+    assert cache.stats().bytes == 8
+    cache.put("c", Generation(output="abcd"))
+    assert "a" not in cache
+    assert cache.stats().bytes == 7
+    assert approximate_nbytes(Generation(output="ä")) == 2
+
+
+def test_pinned_entries_are_not_evicted():
+    cache = BoundedCache(max_entries=1)
+    cache.pin("a")
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert "a" in cache and "b" not in cache and "c" in cache
+    cache.unpin("a")
+    assert "a" not in cache and "c" in cache
+
+
+def test_stats_track_hits_and_misses():
+    cache = BoundedCache()
+    cache.get("missing")
+    cache.put("a", 1)
+    cache.get("a")
+    cache.record_inflight_join()
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.inflight_joins, stats.entries) == (1, 1, 1, 1)
+    assert stats.hit_rate == 0.5
+
+
+def test_bounded_cache_attribution_matches_unbounded():
+    data = "one two three four"
+    unbounded = ShapleyAttribution(model=EchoLLM(), data_handler=DataHandler(data), prompt_codec=BasicPromptCodec(),
+                                   use_cache=True, verbose=False, num_threads=3)
+    expected = unbounded.attribution().attribution
+    cache = BoundedCache(max_entries=3, policy="lfu")
+    bounded = ShapleyAttribution(model=EchoLLM(), data_handler=DataHandler(data), prompt_codec=BasicPromptCodec(),
+                                 verbose=False, num_threads=3, cache=cache)
+    assert bounded.attribution().attribution == expected
+    assert len(cache) <= 3
+    assert cache.stats().evictions > 0
+    assert len(unbounded.cache) == 2 ** 4
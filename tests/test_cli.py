@@ -0,0 +1,80 @@
+import json
+
+from llmSHAP.cli import completed_ids, main, read_records
+
+
+def _write_jsonl(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+
+
+def _read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+RECORDS = [
+    {"id": "a", "data": {"question": "Why?", "first": "one", "second": "two"}, "permanent_keys": ["question"], "system": "Be brief."},
+    {"id": "b", "data": "the quick brown fox"},
+    {"id": "c", "data": {"x": "1", "y": "2"}},
+]
+
+
+def test_cli_streams_one_result_per_record(tmp_path):
+    source, output = tmp_path / "records.jsonl", tmp_path / "out" / "results.jsonl"
+    _write_jsonl(source, RECORDS)
+    assert main([str(source), "-o", str(output), "--backend", "dummy", "--parallel-records", "2",
+                 "--sampler", "stratified", "--sampling-ratio", "0.5", "--seed", "1", "--cache"]) == 0
+    results = {result["id"]: result for result in _read_results(output)}
+    assert set(results) == {"a", "b", "c"}
+    assert set(results["a"]["attribution"]) == {"question", "first", "second"}
+    assert results["a"]["output"] == "DUMMY_RESPONSE"
+    assert len(results["b"]["attribution"]) == 4
+
+
+def test_cli_resume_skips_completed_ids_and_retries_failures(tmp_path):
+    source, output = tmp_path / "records.jsonl", tmp_path / "results.jsonl"
+    _write_jsonl(source, RECORDS)
+    output.write_text(json.dumps({"id": "a", "attribution": {}}) + "\n" + json.dumps({"id": "b", "error": "boom"}) + "\n" + '{"id": "c", "attr', encoding="utf-8")
+    assert main([str(source), "-o", str(output), "--backend", "dummy", "--resume"]) == 0
+    lines = output.read_text(encoding="utf-8").splitlines()
+    new_ids = [json.loads(line)["id"] for line in lines[3:]]
+    assert sorted(new_ids) == ["b", "c"]
+
+
+def test_cli_journal_dir_and_failed_records(tmp_path):
+    source, output, journals = tmp_path / "records.jsonl", tmp_path / "results.jsonl", tmp_path / "journals"
+    _write_jsonl(source, [RECORDS[2], {"id": "bad"}])
+    assert main([str(source), "-o", str(output), "--backend", "dummy", "--journal-dir", str(journals)]) == 1
+    results = {result["id"]: result for result in _read_results(output)}
+    assert "error" in results["bad"] and "attribution" in results["c"]
+    assert (journals / "c.journal.jsonl").exists()
+
+
+def test_read_records_from_csv(tmp_path):
+    source = tmp_path / "records.csv"
+    source.write_text('id,data,permanent_keys,system\n'
+                      'r1,"{""q"": ""Why?"", ""f"": ""x""}",q,Answer.\n'
+                      ',plain text record,,\n', encoding="utf-8")
+    records = list(read_records(str(source)))
+    assert records[0] == {"id": "r1", "data": {"q": "Why?", "f": "x"}, "permanent_keys": ["q"], "system": "Answer."}
+    assert records[1] == {"id": "line-2", "data": "plain text record", "permanent_keys": [], "system": ""}
+
+
+def test_cli_malformed_lines_fail_alone_and_journal_names_stay_in_the_directory(tmp_path):
+    source, output, journals = tmp_path / "records.jsonl", tmp_path / "results.jsonl", tmp_path / "journals"
+    source.write_text(json.dumps({"id": "../../escape", "data": "a b"}) + "\n" + '{"id": "broken", "data"\n' + "[1, 2]\n"
+                      + json.dumps(RECORDS[2]) + "\n", encoding="utf-8")
+    assert main([str(source), "-o", str(output), "--backend", "dummy", "--journal-dir", str(journals)]) == 1
+    results = {result["id"]: result for result in _read_results(output)}
+    assert "JSONDecodeError" in results["line-2"]["error"] and "expected a JSON object" in results["line-3"]["error"]
+    assert "attribution" in results["../../escape"] and "attribution" in results["c"]
+    assert not (tmp_path.parent / "escape.journal.jsonl").exists()
+    names = sorted(path.name for path in journals.iterdir())
+    assert len(names) == 2 and "c.journal.jsonl" in names
+    assert all(name.endswith(".journal.jsonl") and "/" not in name for name in names)
+
+
+def test_completed_ids_skip_truncated_and_non_object_lines(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(json.dumps({"id": "3", "attribution": {}}) + "\n" + json.dumps({"id": "line-4", "error": "x"}) + "\n"
+                      + "[1, 2]\n" + '"text"\n' + json.dumps({"attribution": {}}) + "\n" + '{"id": "trunc', encoding="utf-8")
+    assert completed_ids(str(output)) == {"3"}
@@ -0,0 +1,58 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from llmSHAP import Attribution, DataHandler, BasicPromptCodec, ShapleyAttribution
+from llmSHAP.columnar import load_attributions, save_attributions
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class KeywordLLM(LLMInterface):
+    def generate(self, prompt, tools=None, images=None) -> str:
+        return "flu" if "fever" in prompt[-1]["content"] else "cold"
+
+
+def _attribution(**items):
+    return Attribution({key: {"value": f"v-{key}", "score": score} for key, score in items.items()}, "out", 0.1, 0.9)
+
+
+def test_vectorized_accessors():
+    attribution = _attribution(a=0.2, b=-0.7, c=0.5)
+    assert attribution.keys() == ["a", "b", "c"]
+    assert attribution.scores().tolist() == [0.2, -0.7, 0.5]
+    assert attribution.argsort().tolist() == [2, 0, 1]
+    assert attribution.argsort(descending=False).tolist() == [1, 0, 2]
+    assert attribution.top_k(2) == [("b", -0.7), ("c", 0.5)]
+    assert attribution.top_k(1, by_abs=False) == [("c", 0.5)]
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_round_trip_with_coalition_values(tmp_path, mmap):
+    shapley = ShapleyAttribution(model=KeywordLLM(), data_handler=DataHandler("fever cough"), prompt_codec=BasicPromptCodec(),
+                                 use_cache=True, verbose=False)
+    computed = shapley.attribution()
+    table_values = shapley.coalition_values()
+    assert len(table_values) == 4 and table_values[frozenset({0, 1})] == 1.0
+    path = tmp_path / "results.npz"
+    save_attributions(str(path), [computed, _attribution(x=1.0), Attribution({}, "", 0.0, 0.0)],
+                      ids=["doc", "other", "empty"], coalition_values=[table_values, None, {}])
+    table = load_attributions(str(path), mmap=mmap)
+    assert isinstance(table.scores, np.memmap) == mmap
+    assert len(table) == 3 and table.index("other") == 1
+    loaded = table[0]
+    assert loaded.attribution == {key: {"value": str(item["value"]), "score": item["score"]} for key, item in computed.attribution.items()}
+    assert (loaded.output, loaded.empty_baseline, loaded.grand_coalition_value) == (computed.output, computed.empty_baseline, computed.grand_coalition_value)
+    assert table.scores_of(1).tolist() == [1.0]
+    assert table.coalition_values(0) == table_values
+    assert table.coalition_values(1) == {} and table[2].attribution == {}
+
+
+def test_string_columns_are_not_padded_to_the_longest_row(tmp_path):
+    attributions = [_attribution(a=0.1, b=0.2) for _ in range(2000)] + [Attribution({"é": {"value": "x", "score": 1.0}}, "ü" * 20_000, 0.0, 0.0)]
+    path = tmp_path / "results.npz"
+    save_attributions(str(path), attributions)
+    assert path.stat().st_size < 1_000_000 # Fixed-width UCS4 columns took about 160 MB.
+    table = load_attributions(str(path))
+    assert table.outputs[-1] == "ü" * 20_000 and table.outputs[0] == "out"
+    assert table[2000].attribution == {"é": {"value": "x", "score": 1.0}}
+    assert table.ids[-2:] == ["1999", "2000"] and table.index("2000") == 2000
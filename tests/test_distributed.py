@@ -0,0 +1,143 @@
+import threading
+import time
+
+import pytest
+
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution, StratifiedSampler
+from llmSHAP.cache import BoundedCache
+from llmSHAP.distributed import Coordinator, SQLiteTaskQueue, Worker
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class KeywordLLM(LLMInterface):
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, tools=None, images=None) -> str:
+        with self._lock: self.calls += 1
+        content = prompt[-1]["content"]
+        return " ".join(word for word in ("fever", "cough", "rash") if word in content) or "healthy"
+
+
+class FlakyLLM(KeywordLLM):
+    def generate(self, prompt, tools=None, images=None) -> str:
+        with self._lock:
+            self.calls += 1
+            if self.calls % 3 == 0: raise RuntimeError("transient")
+        return super().generate(prompt, tools, images)
+
+
+def _attribution(llm, sampler=None):
+    return ShapleyAttribution(model=llm, data_handler=DataHandler("fever cough rash tired"), prompt_codec=BasicPromptCodec(),
+                              sampler=sampler, verbose=False)
+
+
+def test_lease_ack_and_redelivery_after_expiry(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"), lease_seconds=0.05)
+    assert queue.push("job", [("a", {"prompt": 1}), ("b", {"prompt": 2})]) == 2
+    assert queue.push("job", [("a", {"prompt": 1})]) == 0
+    first = queue.lease("dead-worker", limit=1)
+    assert [payload for _, payload in first] == [{"prompt": 1}]
+    assert [payload for _, payload in queue.lease("worker", limit=5)] == [{"prompt": 2}]
+    time.sleep(0.1) # Neither worker acknowledges in time; both leases expire.
+    redelivered = queue.lease("worker", limit=5)
+    assert [task_id for task_id, _ in redelivered][0] == first[0][0]
+    queue.ack(first[0][0], {"output": "late"}) # A late acknowledgement still completes the task.
+    for task_id, _ in redelivered: queue.ack(task_id, {"output": "x"})
+    assert queue.counts("job") == {"done": 2}
+    assert set(queue.results("job")) == {"a", "b"}
+
+
+def test_nack_marks_failed_after_max_attempts(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"), max_attempts=2)
+    queue.push("job", [("a", {})])
+    for _ in range(2):
+        (task_id, _), = queue.lease("worker")
+        queue.nack(task_id, "boom")
+    assert queue.counts("job") == {"failed": 1}
+    with pytest.raises(RuntimeError, match="boom"):
+        Coordinator(queue, poll_interval=0.01).wait("job")
+
+
+@pytest.mark.parametrize("llm_type", [KeywordLLM, FlakyLLM])
+def test_coordinator_and_workers_match_local_attribution(tmp_path, llm_type):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"), max_attempts=10)
+    coordinator_llm = KeywordLLM()
+    attributions = {"full": _attribution(coordinator_llm),
+                    "sampled": _attribution(coordinator_llm, StratifiedSampler(0.5, seed=4))}
+    workers = [Worker(queue, llm_type(), num_threads=2, poll_interval=0.01) for _ in range(2)]
+    threads = [threading.Thread(target=worker.run) for worker in workers]
+    for thread in threads: thread.start()
+    try: results = Coordinator(queue, poll_interval=0.01, timeout=30).run(attributions)
+    finally:
+        for worker in workers: worker.stop()
+        for thread in threads: thread.join()
+    assert coordinator_llm.calls == 0
+    local = _attribution(KeywordLLM()).attribution()
+    assert results["full"].attribution == local.attribution
+    assert results["full"].output == local.output
+    assert set(results["sampled"].attribution) == set(local.attribution)
+
+
+def test_resubmitting_a_changed_job_does_not_reuse_old_results(tmp_path):
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    coordinator = Coordinator(queue, poll_interval=0.01, timeout=30)
+    worker = Worker(queue, KeywordLLM())
+    old = ShapleyAttribution(model=KeywordLLM(), data_handler=DataHandler("fever cough"), prompt_codec=BasicPromptCodec(), verbose=False)
+    coordinator.submit("doc", old)
+    worker.run(stop_when_idle=True)
+    assert queue.counts("doc") == {"done": 4}
+
+    coordinator_llm = KeywordLLM()
+    sampler = StratifiedSampler(0.5, seed=1)
+    new = ShapleyAttribution(model=coordinator_llm, data_handler=DataHandler("rash cough"), prompt_codec=BasicPromptCodec(),
+                             sampler=sampler, cache=BoundedCache(max_entries=1), verbose=False)
+    coordinator.submit("doc", new)
+    assert queue.counts("doc").get("pending")
+    worker.run(stop_when_idle=True)
+    result = coordinator.collect("doc", new)
+    assert coordinator_llm.calls == 0
+    assert result.output == "cough rash"
+    assert new.sampler is sampler and new.cache.max_entries == 1
+    assert queue.counts("doc") == {}
+
+
+def test_images_are_sent_as_content_not_coordinator_paths(tmp_path):
+    from llmSHAP.image import Image
+
+    class ImageLLM(KeywordLLM):
+        def generate(self, prompt, tools=None, images=None) -> str:
+            return ",".join(image.payload_url()[:22] for image in images or []) or "none"
+
+    image_path = tmp_path / "chart.png"
+    image_path.write_bytes(b"png-bytes")
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    coordinator = Coordinator(queue, poll_interval=0.01, timeout=30)
+    attribution = ShapleyAttribution(model=KeywordLLM(), data_handler=DataHandler({"question": "What?", "chart": Image(image_path=str(image_path))}),
+                                     prompt_codec=BasicPromptCodec(), verbose=False)
+    coordinator.submit("doc", attribution)
+    image_path.unlink() # Workers must not need the coordinator's file.
+    Worker(queue, ImageLLM()).run(stop_when_idle=True)
+    assert coordinator.collect("doc", attribution).output == "data:image/png;base64,"
+
+
+def test_a_slow_task_does_not_block_the_other_slots(tmp_path):
+    release = threading.Event()
+
+    class SlowLLM(KeywordLLM):
+        def generate(self, prompt, tools=None, images=None) -> str:
+            if prompt == "slow": release.wait(10)
+            return super().generate([{"content": prompt}])
+
+    queue = SQLiteTaskQueue(str(tmp_path / "queue.sqlite"))
+    queue.push("job", [("slow", {"prompt": "slow"}), *((f"fast-{index}", {"prompt": "fever"}) for index in range(6))])
+    worker = Worker(queue, SlowLLM(), num_threads=2, poll_interval=0.01)
+    thread = threading.Thread(target=worker.run, kwargs={"stop_when_idle": True})
+    thread.start()
+    deadline = time.monotonic() + 10
+    while queue.counts("job").get("done", 0) < 6 and time.monotonic() < deadline: time.sleep(0.01)
+    assert queue.counts("job") == {"done": 6, "leased": 1}
+    release.set()
+    thread.join()
+    assert queue.counts("job") == {"done": 7}
@@ -42,7 +42,7 @@ def test_encoded_image_is_cached_for_same_file(tmp_path, monkeypatch):
     image_path.write_bytes(content)
     image = Image(image_path=str(image_path))
 
-    Image._encoded_from_path.cache_clear()
+    Image.cache_clear()
     open_calls = {"count": 0}
     real_open = builtins.open
 
@@ -58,3 +58,60 @@ def test_encoded_image_is_cached_for_same_file(tmp_path, monkeypatch):
     assert encoded_once == encoded_twice
     assert data_url == f"data:image/png;base64,{encoded_once}"
     assert open_calls["count"] == 1
+
+def _write_png(path, size=(400, 200)):
+    PILImage = pytest.importorskip("PIL.Image")
+    PILImage.new("RGBA", size, (200, 30, 60, 255)).save(path, format="PNG")
+
+def test_payload_url_downscales_and_reencodes(tmp_path):
+    PILImage = pytest.importorskip("PIL.Image")
+    import io
+    image_path = tmp_path / "photo.png"
+    _write_png(image_path)
+    image = Image(image_path=str(image_path), max_dimension=100, format="jpeg", quality=70)
+    url = image.payload_url()
+    assert url.startswith("data:image/jpeg;base64,")
+    with PILImage.open(io.BytesIO(base64.b64decode(url.partition(",")[2]))) as decoded:
+        assert decoded.format == "JPEG" and decoded.size == (100, 50)
+
+def test_data_url_refuses_a_mismatching_mime_type(tmp_path):
+    pytest.importorskip("PIL.Image")
+    image_path = tmp_path / "photo.png"
+    _write_png(image_path)
+    image = Image(image_path=str(image_path), format="JPEG")
+    assert image.data_url("image/jpeg") == image.payload_url()
+    with pytest.raises(ValueError):
+        image.data_url("image/png")
+
+def test_payload_url_without_options_is_the_raw_file(tmp_path):
+    image_path = tmp_path / "img.png"
+    image_path.write_bytes(b"raw-bytes")
+    assert Image(image_path=str(image_path)).payload_url() == "data:image/png;base64," + base64.b64encode(b"raw-bytes").decode("utf-8")
+    assert Image(url="https://example.com/a.png").payload_url() == "https://example.com/a.png"
+
+def test_disk_cache_is_reused_across_processes(tmp_path, monkeypatch):
+    pytest.importorskip("PIL.Image")
+    image_path = tmp_path / "photo.png"
+    _write_png(image_path)
+    cache_dir = tmp_path / "cache"
+    image = Image(image_path=str(image_path), max_dimension=64, format="WEBP", cache_dir=str(cache_dir))
+    first = image.payload_url()
+    assert len(list(cache_dir.iterdir())) == 1
+    Image.cache_clear()
+    import llmSHAP.image as image_module
+    monkeypatch.setattr(image_module, "_preprocess", lambda *args: pytest.fail("preprocessed again"))
+    assert image.payload_url() == first
+    monkeypatch.undo()
+    Image(image_path=str(image_path), max_dimension=32, format="WEBP", cache_dir=str(cache_dir)).payload_url()
+    assert len(list(cache_dir.iterdir())) == 2
+
+def test_memory_cache_is_bounded_by_bytes(tmp_path, monkeypatch):
+    from llmSHAP.image import IMAGE_CACHE
+    monkeypatch.setattr(IMAGE_CACHE, "max_bytes", 100)
+    Image.cache_clear()
+    for index in range(5):
+        image_path = tmp_path / f"img{index}.png"
+        image_path.write_bytes(bytes(40))
+        Image(image_path=str(image_path)).encoded_image()
+    assert IMAGE_CACHE.stats().bytes <= 100
+    assert len(IMAGE_CACHE) < 5
@@ -0,0 +1,98 @@
+import json
+import sys
+import threading
+
+import pytest
+
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution
+from llmSHAP.journal import CoalitionJournal
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class FlakyLLM(LLMInterface):
+    """Echoes the prompt and fails once ``fail_after`` calls have succeeded."""
+    def __init__(self, fail_after: int | None = None):
+        self.fail_after = fail_after
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt, tools=None, images=None) -> str:
+        with self._lock:
+            if self.fail_after is not None and self.calls >= self.fail_after: raise RuntimeError("quota exhausted")
+            self.calls += 1
+        return prompt[-1]["content"]
+
+
+def _attribution(llm, data="alpha beta gamma delta"):
+    return ShapleyAttribution(model=llm, data_handler=DataHandler(data), prompt_codec=BasicPromptCodec(), verbose=False)
+
+
+def test_resume_only_generates_missing_coalitions(tmp_path):
+    journal_path = str(tmp_path / "run.journal")
+    with pytest.raises(RuntimeError):
+        _attribution(FlakyLLM(fail_after=5)).attribution(resume=journal_path)
+
+    llm = FlakyLLM()
+    resumed = _attribution(llm).attribution(resume=journal_path)
+    assert llm.calls == 2 ** 4 - 5
+    expected = _attribution(FlakyLLM()).attribution()
+    assert resumed.attribution == expected.attribution
+
+    llm = FlakyLLM()
+    _attribution(llm).attribution(resume=journal_path)
+    assert llm.calls == 0
+
+
+def test_truncated_trailing_line_is_ignored(tmp_path):
+    journal_path = tmp_path / "run.journal"
+    _attribution(FlakyLLM(), "a b").attribution(resume=str(journal_path))
+    lines = journal_path.read_text().splitlines()
+    journal_path.write_text("\n".join(lines[:-1]) + "\n" + lines[-1][:5])
+    llm = FlakyLLM()
+    _attribution(llm, "a b").attribution(resume=CoalitionJournal(str(journal_path), sync_every=1))
+    assert llm.calls == 1
+    assert "coalition" in json.loads(journal_path.read_text().splitlines()[-1])
+
+
+def test_journal_rejects_different_setup(tmp_path):
+    journal_path = str(tmp_path / "run.journal")
+    _attribution(FlakyLLM(), "a b").attribution(resume=journal_path)
+    with pytest.raises(ValueError):
+        _attribution(FlakyLLM(), "a c").attribution(resume=journal_path)
+
+
+def test_journal_rejects_different_target_or_model(tmp_path):
+    from llmSHAP import TargetLogLikelihood
+
+    class ScoringLLM(FlakyLLM):
+        def __init__(self, model_name="a"):
+            super().__init__()
+            self.model_name = model_name
+
+        def score(self, prompt, target, tools=None, images=None):
+            return [-1.0]
+
+    def run(target, model_name, journal_path):
+        return ShapleyAttribution(model=ScoringLLM(model_name), data_handler=DataHandler("a b"), prompt_codec=BasicPromptCodec(),
+                                  value_function=TargetLogLikelihood(target=target), verbose=False).attribution(resume=journal_path)
+    journal_path = str(tmp_path / "run.journal")
+    run("flu", "a", journal_path)
+    with pytest.raises(ValueError):
+        run("cold", "a", journal_path)
+    with pytest.raises(ValueError):
+        run("flu", "b", journal_path)
+    assert run("flu", "a", journal_path).output == "flu"
+
+
+def test_journal_never_imports_recorded_types(tmp_path):
+    journal_path = tmp_path / "run.journal"
+    _attribution(FlakyLLM(), "a b").attribution(resume=str(journal_path))
+    lines = journal_path.read_text().splitlines()
+    record = json.loads(lines[1])
+    record["type"] = "antigravity:Generation"
+    journal_path.write_text("\n".join([lines[0], json.dumps(record), *lines[2:]]) + "\n")
+    journal = CoalitionJournal(str(journal_path))
+    generations, _ = journal.open(json.loads(lines[0])["fingerprint"])
+    journal.close()
+    assert "antigravity" not in sys.modules
+    assert type(generations[frozenset(record["coalition"])]).__name__ == "Generation"
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage
+
+from llmSHAP.llm.langchain import LangChainInterface
+
+
+class FakeChatModel:
+    """Echoes the last message; ``agent=True`` only accepts ``{"messages": [...]}`` inputs."""
+    def __init__(self, agent=False, tools=None, counters=None):
+        self.agent = agent
+        self.tools = tools
+        self.counters = counters if counters is not None else {"bind": 0, "invoke": 0, "batch": 0}
+
+    def bind_tools(self, tools):
+        self.counters["bind"] += 1
+        return FakeChatModel(self.agent, list(tools), self.counters)
+
+    def _reply(self, value):
+        if self.agent != isinstance(value, dict): raise TypeError("unsupported input")
+        messages = value["messages"] if self.agent else value
+        reply = AIMessage(content=f"{messages[-1].content}|{len(self.tools or [])}")
+        return {"messages": [*messages, reply]} if self.agent else reply
+
+    def invoke(self, value):
+        self.counters["invoke"] += 1
+        return self._reply(value)
+
+    async def ainvoke(self, value):
+        return self.invoke(value)
+
+    def batch(self, values):
+        self.counters["batch"] += 1
+        return [self._reply(value) for value in values]
+
+    async def abatch(self, values):
+        return self.batch(values)
+
+
+def _prompt(text):
+    return [{"role": "system", "content": "sys"}, {"role": "user", "content": text}]
+
+
+def test_tools_are_bound_once_per_tool_set():
+    model = FakeChatModel()
+    interface = LangChainInterface(model)
+    first, second = object(), object()
+    for _ in range(3):
+        assert interface.generate(_prompt("a"), tools=[first, second]) == "a|2"
+        assert interface.generate(_prompt("b"), tools=[first]) == "b|1"
+    assert interface.generate(_prompt("c")) == "c|0"
+    assert model.counters["bind"] == 2
+
+
+def test_agent_invocation_shape_is_remembered():
+    model = FakeChatModel(agent=True)
+    interface = LangChainInterface(model)
+    assert interface.generate(_prompt("a")) == "a|0"
+    assert model.counters["invoke"] == 2
+    assert interface.generate(_prompt("b")) == "b|0"
+    assert model.counters["invoke"] == 3
+
+
+@pytest.mark.parametrize("agent", [False, True])
+def test_async_and_batch_paths(agent):
+    model = FakeChatModel(agent=agent)
+    interface = LangChainInterface(model)
+    prompts = [_prompt(text) for text in "abcd"]
+    assert interface.generate_batch(prompts) == ["a|0", "b|0", "c|0", "d|0"]
+    assert model.counters["batch"] == 1
+
+    async def run():
+        single = await asyncio.gather(*(interface.agenerate(prompt) for prompt in prompts))
+        return single, await interface.agenerate_batch(prompts)
+    assert asyncio.run(run()) == (["a|0", "b|0", "c|0", "d|0"], ["a|0", "b|0", "c|0", "d|0"])
+
+
+def test_invocation_shape_is_tracked_per_bound_model():
+    chat_model = FakeChatModel()
+    interface = LangChainInterface(chat_model, tool_factory=lambda tools: FakeChatModel(agent=True, tools=tools))
+    tool = object()
+    assert interface.generate(_prompt("a"), tools=[tool]) == "a|1"
+    assert interface.generate(_prompt("b")) == "b|0"
+    assert interface.generate(_prompt("c"), tools=[tool]) == "c|1"
+    assert interface.generate_batch([_prompt("d")]) == ["d|0"]
+    assert interface.generate_batch([_prompt("e"), _prompt("f")], tools=[tool]) == ["e|1", "f|1"]
+    assert chat_model.counters["invoke"] == 1
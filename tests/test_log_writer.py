@@ -0,0 +1,77 @@
+import gzip
+import json
+import threading
+
+import pytest
+
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution
+from llmSHAP.llm.llm_interface import LLMInterface
+from llmSHAP.log_writer import JSONLLogWriter
+
+
+class EchoLLM(LLMInterface):
+    def generate(self, prompt, tools=None, images=None) -> str:
+        return prompt[-1]["content"]
+
+
+def test_records_are_written_as_compact_json_lines(tmp_path):
+    path = tmp_path / "nested" / "log.jsonl"
+    with JSONLLogWriter(str(path), batch_size=3) as writer:
+        for index in range(10): writer.write({"index": index, "text": "ä"})
+        writer.flush()
+        lines = path.read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line)["index"] for line in lines] == list(range(10))
+        assert lines[0] == '{"index":0,"text":"ä"}'
+
+
+def test_rotation_keeps_backups_and_compresses(tmp_path):
+    path = tmp_path / "log.jsonl"
+    with JSONLLogWriter(str(path), batch_size=1, max_bytes=60, backup_count=2, compress=True) as writer:
+        for index in range(12): writer.write({"index": index, "padding": "x" * 20})
+    assert path.exists()
+    assert (tmp_path / "log.jsonl.1.gz").exists() and (tmp_path / "log.jsonl.2.gz").exists()
+    assert not (tmp_path / "log.jsonl.3.gz").exists()
+    with gzip.open(tmp_path / "log.jsonl.1.gz", "rt", encoding="utf-8") as segment:
+        rotated = [json.loads(line)["index"] for line in segment]
+    current = [json.loads(line)["index"] for line in path.read_text().splitlines()]
+    assert rotated and max(rotated) < min(current)
+    assert current[-1] == 11
+
+
+def test_attribution_logging_includes_coalition_and_timing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ShapleyAttribution(model=EchoLLM(),
+                       data_handler=DataHandler("a b c"),
+                       prompt_codec=BasicPromptCodec(),
+                       use_cache=True,
+                       verbose=False,
+                       logging=True,
+                       num_threads=3).attribution()
+    records = [json.loads(line) for line in (tmp_path / "logs" / "log.jsonl").read_text().splitlines()]
+    assert len(records) == 2 ** 3
+    assert sorted(map(tuple, (record["coalition"] for record in records))) == sorted(
+        [(), (0,), (1,), (2,), (0, 1), (0, 2), (1, 2), (0, 1, 2)])
+    assert all(record["duration"] >= 0 and record["started_at"] > 0 for record in records)
+    assert all(record["generation"]["output"] == record["prompt"][-1]["content"] for record in records)
+
+
+def test_flush_does_not_hang_when_the_log_file_cannot_be_opened(tmp_path):
+    (tmp_path / "blocker").write_text("not a directory")
+    writer = JSONLLogWriter(str(tmp_path / "blocker" / "log.jsonl"), flush_interval=0.05)
+    writer.write({"index": 0})
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    with pytest.raises(RuntimeError):
+        writer.write({"index": 1})
+    writer.close()
+
+
+def test_default_writers_are_shared_per_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    attributions = [ShapleyAttribution(model=EchoLLM(), data_handler=DataHandler("a b"), prompt_codec=BasicPromptCodec(),
+                                       use_cache=True, verbose=False, logging=True) for _ in range(3)]
+    for attribution in attributions: attribution.attribution()
+    assert len({id(attribution.log_writer) for attribution in attributions}) == 1
+    threads = [thread for thread in threading.enumerate() if thread.name == "llmSHAP-log-writer"]
+    assert sum(thread is attributions[0].log_writer._thread for thread in threads) == 1
+    assert len((tmp_path / "logs" / "log.jsonl").read_text().splitlines()) == 3 * 2 ** 2
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from llmSHAP import Attribution, BasicPromptCodec, DataHandler, ShapleyAttribution
+from llmSHAP.attribution_methods.coalition_sampler import StratifiedSampler
+from llmSHAP.llm.dummy import DummyLLM
+from llmSHAP.metrics import AttributionMetrics
+
+
+def _attribution(**kwargs):
+    return ShapleyAttribution(model=DummyLLM(model_name="dummy", sleep_seconds=kwargs.pop("sleep_seconds", 0.0)),
+                              data_handler=DataHandler("a b c d", permanent_keys={0}),
+                              prompt_codec=BasicPromptCodec(),
+                              verbose=False,
+                              **kwargs)
+
+
+def test_metrics_are_attached_to_the_attribution():
+    result = _attribution(use_cache=True, num_threads=4).attribution()
+    metrics = result.metrics
+    assert isinstance(result, Attribution) and metrics is not None and metrics.finished
+    assert (metrics.features_done, metrics.features_total) == (3, 3)
+    assert metrics.contributions_total == metrics.contributions_done == 3 * 4
+    assert metrics.generations == 2 ** 3 and metrics.failures == 0 and metrics.in_flight == 0
+    assert metrics.cache_hits + metrics.inflight_joins == 2 * 12 + 2 - metrics.generations
+    assert metrics.cache_hit_rate == pytest.approx(1 - 8 / 26)
+    assert metrics.progress == 1.0 and metrics.eta_seconds == 0.0
+    assert metrics.as_dict()["requests_per_second"] == metrics.requests_per_second > 0
+
+
+def test_sampler_counts_drive_the_total():
+    sampler = StratifiedSampler(0.5, seed=0, antithetic=True)
+    result = _attribution(sampler=sampler).attribution()
+    assert result.metrics.contributions_total == result.metrics.contributions_done == 3 * sampler.count(1, [1, 2, 3])
+
+
+def test_metrics_can_be_queried_while_running():
+    attribution = _attribution(num_threads=3, sleep_seconds=0.01)
+    snapshots = []
+    worker = threading.Thread(target=attribution.attribution)
+    worker.start()
+    while worker.is_alive():
+        snapshots.append(attribution.metrics.snapshot())
+        time.sleep(0.005)
+    worker.join()
+    running = [snapshot for snapshot in snapshots if not snapshot.finished and snapshot.contributions_total]
+    assert running and any(0 < snapshot.progress < 1 and snapshot.eta_seconds is not None for snapshot in running)
+    assert max(snapshot.in_flight for snapshot in running) <= attribution.max_in_flight
+
+
+def test_retries_are_read_relative_to_the_start():
+    class Model: retry_count = 5
+    model = Model()
+    metrics = AttributionMetrics(features_total=1, retry_counter=lambda: model.retry_count)
+    model.retry_count = 7
+    assert metrics.snapshot().retries == 2
+    assert metrics.snapshot().eta_seconds is None
@@ -0,0 +1,89 @@
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from llmSHAP import BasicPromptCodec, DataHandler, ShapleyAttribution
+from llmSHAP import monitoring
+from llmSHAP.llm.dummy import DummyLLM
+
+
+@pytest.fixture
+def registry():
+    registry = monitoring.enable()
+    yield registry
+    monitoring.disable()
+
+
+def _samples(text, name):
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(name)}
+
+
+def test_disabled_hooks_are_cheap():
+    monitoring.disable()
+    calls = 100_000
+    best = min(_time_hooks(calls) for _ in range(5))
+    assert best / calls < 1e-6
+
+
+def _time_hooks(calls):
+    start = time.perf_counter()
+    for _ in range(calls): monitoring.count_cache_lookup("model", "sampler", "hit")
+    return time.perf_counter() - start
+
+
+def test_attribution_is_instrumented(registry):
+    ShapleyAttribution(model=DummyLLM(model_name="dummy", sleep_seconds=0.0),
+                       data_handler=DataHandler("a b c"),
+                       prompt_codec=BasicPromptCodec(),
+                       use_cache=True,
+                       verbose=False).attribution()
+    text = registry.exposition()
+    labels = 'model="dummy",sampler="FullEnumerationSampler"'
+    assert _samples(text, "llmshap_generations_total")[f'llmshap_generations_total{{{labels},status="ok"}}'] == 8
+    lookups = _samples(text, "llmshap_cache_lookups_total")
+    assert lookups[f'llmshap_cache_lookups_total{{{labels},result="miss"}}'] == 8
+    assert lookups[f'llmshap_cache_lookups_total{{{labels},result="hit"}}'] + lookups.get(f'llmshap_cache_lookups_total{{{labels},result="join"}}', 0) == 2 * 12 + 2 - 8
+    histogram = _samples(text, "llmshap_generation_seconds")
+    assert histogram[f'llmshap_generation_seconds_bucket{{{labels},le="+Inf"}}'] == histogram[f"llmshap_generation_seconds_count{{{labels}}}"] == 8
+    evaluations = _samples(text, "llmshap_value_function_evaluations_total")
+    assert evaluations[f'llmshap_value_function_evaluations_total{{{labels},value_function="TFIDFCosineSimilarity"}}'] >= 1
+    assert "# TYPE llmshap_generation_seconds histogram" in text
+
+
+def test_exposition_file_and_endpoint(registry, tmp_path):
+    registry.generations.labels('quote"model', "sampler", "ok").inc(2)
+    path = tmp_path / "metrics" / "llmshap.prom"
+    registry.write(str(path))
+    assert 'llmshap_generations_total{model="quote\\"model",sampler="sampler",status="ok"} 2.0' in path.read_text()
+    server = registry.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert response.read().decode() == registry.exposition()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_openai_retries_and_tokens(registry, monkeypatch):
+    openai = pytest.importorskip("openai")
+    pytest.importorskip("dotenv")
+    from llmSHAP.llm.openai import OpenAIInterface
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    llm = OpenAIInterface(model_name="mock", backoff_base=0.0)
+    attempts = []
+
+    def create(**kwargs):
+        attempts.append(kwargs)
+        if len(attempts) == 1: raise openai.APIConnectionError(request=None) # type: ignore[arg-type]
+        return SimpleNamespace(output_text="ok", usage=SimpleNamespace(input_tokens=3, output_tokens=5))
+
+    llm.client = SimpleNamespace(responses=SimpleNamespace(create=create)) # type: ignore[assignment]
+    assert llm.generate([{"role": "user", "content": "hi"}]) == "ok"
+    text = registry.exposition()
+    assert 'llmshap_retries_total{model="mock",reason="error"} 1.0' in text
+    assert 'llmshap_tokens_total{model="mock",kind="input"} 3.0' in text
+    assert 'llmshap_tokens_total{model="mock",kind="output"} 5.0' in text
+    assert llm.retry_count == 1
@@ -0,0 +1,61 @@
+import pytest
+
+from llmSHAP import Attribution, BasicPromptCodec, DataHandler, ExactMatch, ShapleyAttribution, TFIDFCosineSimilarity, TargetLogLikelihood
+from llmSHAP.generation import Generation
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class KeywordLLM(LLMInterface):
+    """Answers from the words present in the prompt and counts its calls."""
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, prompt, tools=None, images=None):
+        self.calls += 1
+        text = " ".join(message["content"] for message in prompt)
+        return " ".join(word for word in ("paris", "france", "tower") if word in text)
+
+    def is_local(self): return True
+    def name(self): return "keyword"
+    def cleanup(self): pass
+
+
+def _run(value_function, llm):
+    return ShapleyAttribution(model=llm,
+                              data_handler=DataHandler("the tower in paris france"),
+                              prompt_codec=BasicPromptCodec(),
+                              value_function=value_function,
+                              use_cache=True,
+                              verbose=False).attribution()
+
+
+def test_one_attribution_per_metric_from_one_set_of_generations():
+    shared = KeywordLLM()
+    tfidf, exact = _run([TFIDFCosineSimilarity(), ExactMatch()], shared)
+    assert isinstance(tfidf, Attribution) and isinstance(exact, Attribution)
+    assert shared.calls == 2 ** 5
+    for value_function, combined in ((TFIDFCosineSimilarity(), tfidf), (ExactMatch(), exact)):
+        single = _run(value_function, KeywordLLM())
+        assert {key: item["score"] for key, item in combined.attribution.items()} == pytest.approx(
+               {key: item["score"] for key, item in single.attribution.items()})
+        assert combined.grand_coalition_value == single.grand_coalition_value
+        assert combined.empty_baseline == single.empty_baseline
+    assert tfidf.output == exact.output and tfidf.metrics is exact.metrics
+
+
+def test_v_override_still_applies_to_a_single_value_function():
+    class Constant(ShapleyAttribution):
+        def _v(self, base_generation: Generation, coalition_generation: Generation) -> float:
+            return 2.0
+    result = Constant(model=KeywordLLM(), data_handler=DataHandler("a b"), prompt_codec=BasicPromptCodec(), verbose=False).attribution()
+    assert result.grand_coalition_value == 2.0 and all(item["score"] == 0 for item in result.attribution.values())
+
+
+def test_invalid_value_function_lists():
+    with pytest.raises(ValueError): _run([], KeywordLLM())
+    with pytest.raises(ValueError): _run([TargetLogLikelihood(), ExactMatch()], KeywordLLM())
+
+
+def test_exact_match_normalization():
+    assert ExactMatch()(Generation(output=" Paris "), Generation(output="paris")) == 1.0
+    assert ExactMatch(normalize=False)(Generation(output=" Paris "), Generation(output="paris")) == 0.0
@@ -0,0 +1,48 @@
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+from llmSHAP.llm import clients
+from llmSHAP.llm.openai import OpenAIInterface
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    clients.clear_clients()
+    yield
+    clients.clear_clients()
+
+
+def _pool(client):
+    return client._client._transport._pool
+
+
+def test_interfaces_share_one_connection_pool_per_endpoint():
+    first = OpenAIInterface(model_name="mock", base_url="http://127.0.0.1:1/v1", timeout=5.0)
+    second = OpenAIInterface(model_name="mock", base_url="http://127.0.0.1:1/v1", timeout=30.0)
+    other = OpenAIInterface(model_name="mock", base_url="http://127.0.0.1:2/v1")
+    assert first.client._client is second.client._client
+    assert first.client.timeout == 5.0 and second.client.timeout == 30.0
+    assert other.client._client is not first.client._client
+
+
+def test_pool_grows_with_requested_concurrency():
+    small = clients.shared_client(api_key="test-key", base_url="http://127.0.0.1:1/v1", max_connections=8)
+    assert _pool(small)._max_keepalive_connections == 8
+    assert clients.shared_client(api_key="test-key", base_url="http://127.0.0.1:1/v1", max_connections=4) is small
+    large = clients.shared_client(api_key="test-key", base_url="http://127.0.0.1:1/v1", max_connections=256)
+    assert large is not small
+    assert _pool(large)._max_keepalive_connections == 256 and _pool(large)._max_connections >= 256
+
+
+def test_dotenv_is_loaded_once(monkeypatch):
+    calls = []
+    monkeypatch.setitem(sys.modules, "dotenv", types.SimpleNamespace(load_dotenv=lambda: calls.append(1)))
+    monkeypatch.setattr(clients, "_env_loaded", False)
+    for _ in range(3): OpenAIInterface(model_name="mock")
+    assert calls == [1]
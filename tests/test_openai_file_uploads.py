@@ -0,0 +1,160 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+openai = pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+from llmSHAP.image import Image
+from llmSHAP.llm.openai import OpenAIInterface
+
+
+RESPONSE = {
+    "id": "resp_1", "object": "response", "created_at": 0, "model": "mock", "status": "completed",
+    "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+    "output": [{"type": "message", "id": "msg_1", "status": "completed", "role": "assistant",
+                "content": [{"type": "output_text", "text": "ok", "annotations": []}]}],
+}
+
+
+class MockFilesServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockFilesHandler)
+        self.uploads: list[bytes] = []
+        self.deleted: list[str] = []
+        self.responses: list[dict] = []
+        self.expired: set[str] = set()
+        self.error: dict | None = None
+
+
+class MockFilesHandler(BaseHTTPRequestHandler):
+    server: MockFilesServer
+
+    def log_message(self, *args): pass
+
+    def _reply(self, body: dict, status: int = 200) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            self.server.uploads.append(body)
+            file_id = f"file-{len(self.server.uploads)}"
+            self._reply({"id": file_id, "object": "file", "bytes": len(body), "created_at": 0,
+                         "filename": "image", "purpose": "vision", "status": "processed"})
+        else:
+            request = json.loads(body)
+            self.server.responses.append(request)
+            expired = [block["file_id"] for block in _image_blocks(request) if block.get("file_id") in self.server.expired]
+            if self.server.error is not None:
+                error, self.server.error = self.server.error, None
+                self._reply({"error": {"type": "invalid_request_error", "param": None, **error}}, status=400)
+                return
+            if expired:
+                self._reply({"error": {"message": f"No such File object: {expired[0]}", "type": "invalid_request_error",
+                                       "param": None, "code": None}}, status=404)
+                return
+            self._reply(RESPONSE)
+
+    def do_DELETE(self):
+        file_id = self.path.rsplit("/", 1)[-1]
+        self.server.deleted.append(file_id)
+        self._reply({"id": file_id, "object": "file", "deleted": True})
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    server = MockFilesServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _interface(server, **kwargs):
+    return OpenAIInterface(model_name="mock", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0, **kwargs)
+
+
+def _image_blocks(request):
+    return [block for message in request["input"] if isinstance(message["content"], list)
+            for block in message["content"] if block["type"] == "input_image"]
+
+
+def test_image_is_uploaded_once_and_referenced_by_file_id(server, tmp_path):
+    image_path = tmp_path / "chart.png"
+    image_path.write_bytes(b"png-bytes")
+    image = Image(image_path=str(image_path))
+    prompt = [{"role": "user", "content": "Describe the chart."}]
+    with _interface(server, upload_images=True) as llm:
+        for _ in range(3): assert llm.generate(prompt, images=[image]) == "ok"
+    assert len(server.uploads) == 1 and b"png-bytes" in server.uploads[0]
+    assert all(_image_blocks(request) == [{"type": "input_image", "file_id": "file-1"}] for request in server.responses)
+    assert server.deleted == ["file-1"]
+
+
+def test_file_cache_reuses_uploads_across_runs(server, tmp_path):
+    image_path = tmp_path / "chart.png"
+    image_path.write_bytes(b"png-bytes")
+    cache = tmp_path / "files.json"
+    prompt = [{"role": "user", "content": "Describe the chart."}]
+    _interface(server, upload_images=True, file_cache=str(cache)).generate(prompt, images=[Image(image_path=str(image_path))])
+    second = _interface(server, upload_images=True, file_cache=str(cache))
+    second.generate(prompt, images=[Image(image_path=str(image_path))])
+    assert len(server.uploads) == 1
+    assert _image_blocks(server.responses[-1]) == [{"type": "input_image", "file_id": "file-1"}]
+    second.delete_uploaded_files()
+    assert server.deleted == [] # Uploaded by the first run only.
+
+
+def test_inline_images_without_upload(server, tmp_path):
+    image_path = tmp_path / "chart.png"
+    image_path.write_bytes(b"png-bytes")
+    _interface(server).generate([{"role": "user", "content": "Hi"}], images=[Image(image_path=str(image_path))])
+    assert server.uploads == []
+    assert _image_blocks(server.responses[0])[0]["image_url"].startswith("data:image/png;base64,")
+
+
+def test_file_cache_is_scoped_to_account_and_replaces_expired_ids(server, tmp_path, monkeypatch):
+    image_path = tmp_path / "chart.png"
+    image_path.write_bytes(b"png-bytes")
+    cache = tmp_path / "files.json"
+    prompt = [{"role": "user", "content": "Describe the chart."}]
+    _interface(server, upload_images=True, file_cache=str(cache)).generate(prompt, images=[Image(image_path=str(image_path))])
+    monkeypatch.setenv("OPENAI_API_KEY", "other-account")
+    _interface(server, upload_images=True, file_cache=str(cache)).generate(prompt, images=[Image(image_path=str(image_path))])
+    assert len(server.uploads) == 2
+    assert _image_blocks(server.responses[-1]) == [{"type": "input_image", "file_id": "file-2"}]
+
+    server.expired.add("file-2")
+    llm = _interface(server, upload_images=True, file_cache=str(cache))
+    assert llm.generate(prompt, images=[Image(image_path=str(image_path))]) == "ok"
+    assert len(server.uploads) == 3
+    assert _image_blocks(server.responses[-1]) == [{"type": "input_image", "file_id": "file-3"}]
+    assert sorted(json.loads(cache.read_text()).values()) == ["file-1", "file-3"]
+
+
+def test_only_errors_about_the_files_invalidate_uploads(server, tmp_path):
+    image_path = tmp_path / "chart.png"
+    image_path.write_bytes(b"png-bytes")
+    prompt = [{"role": "user", "content": "Describe the chart."}]
+    llm = _interface(server, upload_images=True)
+    llm.generate(prompt, images=[Image(image_path=str(image_path))])
+
+    server.error = {"message": "Too many files or images in the input.", "code": None}
+    with pytest.raises(openai.BadRequestError):
+        llm.generate(prompt, images=[Image(image_path=str(image_path))])
+    assert len(server.uploads) == 1
+
+    server.error = {"message": "The uploaded image could not be used.", "code": "invalid_file"}
+    assert llm.generate(prompt, images=[Image(image_path=str(image_path))]) == "ok"
+    assert len(server.uploads) == 2
+    assert _image_blocks(server.responses[-1]) == [{"type": "input_image", "file_id": "file-2"}]
@@ -0,0 +1,79 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+from llmSHAP.llm.openai import OpenAIInterface
+
+
+class FakeResponses:
+    """Answers instantly, except that the calls listed in ``slow_calls`` hang for ``delay`` seconds."""
+    def __init__(self, slow_calls=(), delay=2.0):
+        self.slow_calls, self.delay = set(slow_calls), delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call in self.slow_calls: time.sleep(self.delay)
+        return SimpleNamespace(output_text=f"answer-{call}")
+
+
+def _interface(monkeypatch, responses, **kwargs):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    llm = OpenAIInterface(model_name="mock", temperature=0.0, hedge_percentile=0.9, hedge_min_samples=5, **kwargs)
+    llm.client = SimpleNamespace(responses=responses) # type: ignore[assignment]
+    return llm
+
+
+def test_hedging_requires_deterministic_settings(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    with pytest.raises(ValueError): OpenAIInterface(model_name="mock", hedge_percentile=0.9)
+    with pytest.raises(ValueError): OpenAIInterface(model_name="mock", temperature=0.0, reasoning="low", hedge_percentile=0.9)
+    OpenAIInterface(model_name="mock", temperature=0.7, hedge_percentile=0.9, hedge_accept_any=True)
+
+
+def test_straggler_is_hedged_and_the_duplicate_wins(monkeypatch):
+    responses = FakeResponses(slow_calls={11})
+    llm = _interface(monkeypatch, responses, hedge_max_fraction=0.5)
+    prompt = [{"role": "user", "content": "hi"}]
+    for _ in range(10): llm.generate(prompt)
+    start = time.perf_counter()
+    assert llm.generate(prompt) == "answer-12"
+    assert time.perf_counter() - start < 1.0
+    stats = llm.hedge_stats()
+    assert (stats.requests, stats.hedged, stats.hedge_wins) == (11, 1, 1)
+    assert stats.threshold is not None
+
+
+def test_hedges_are_capped_by_fraction(monkeypatch):
+    responses = FakeResponses(slow_calls={6}, delay=0.3)
+    llm = _interface(monkeypatch, responses, hedge_max_fraction=0.1)
+    prompt = [{"role": "user", "content": "hi"}]
+    for _ in range(5): llm.generate(prompt)
+    assert llm.generate(prompt) == "answer-6" # 1 hedge would exceed 10% of 6 requests.
+    assert llm.hedge_stats().hedged == 0
+    assert responses.calls == 6
+
+
+def test_threads_are_started_only_for_hedges(monkeypatch):
+    responses = FakeResponses()
+    threads = []
+    create = responses.create
+    def recording_create(**kwargs):
+        threads.append(threading.current_thread())
+        return create(**kwargs)
+    responses.create = recording_create
+    llm = _interface(monkeypatch, responses, hedge_max_fraction=0.5)
+    prompt = [{"role": "user", "content": "hi"}]
+    for _ in range(5): llm.generate(prompt)
+    assert threads == [threading.current_thread()] * 5 # No threshold yet: the caller's thread.
+    for _ in range(50): llm.generate(prompt)
+    assert len({thread.ident for thread in threads[5:]}) == 1 # One pool thread, reused.
+    assert llm.hedge_stats().hedged == 0
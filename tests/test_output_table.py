@@ -0,0 +1,73 @@
+import threading
+from dataclasses import dataclass
+
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution
+from llmSHAP.attribution_methods.output_table import OutputTable
+from llmSHAP.generation import Generation
+from llmSHAP.llm.llm_interface import LLMInterface
+from llmSHAP.value_functions import ValueFunction
+
+
+class ShortAnswerLLM(LLMInterface):
+    def generate(self, prompt, tools=None, images=None) -> str:
+        return "flu" if "fever" in prompt[-1]["content"] else "cold"
+
+
+class CountingValue(ValueFunction):
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, base_generation, coalition_generation) -> float:
+        with self._lock: self.calls += 1
+        return float(base_generation.output == coalition_generation.output)
+
+
+@dataclass
+class LabeledGeneration(Generation):
+    label: str
+
+
+def test_identical_outputs_share_an_id_and_are_scored_once():
+    calls = []
+    table = OutputTable(lambda generation: calls.append(generation.output) or len(generation.output))
+    first = table.intern(Generation(output="abc"))
+    second = table.intern(Generation(output="abc"))
+    third = table.intern(Generation(output="de"))
+    assert first == second != third
+    assert calls == ["abc", "de"]
+    assert table.values() == [3.0, 2.0]
+
+
+def test_failed_valuation_is_retried_under_the_same_id():
+    attempts = []
+    def score(generation):
+        attempts.append(generation.output)
+        if len(attempts) == 1: raise RuntimeError("transient")
+        return 1.0
+    table = OutputTable(score)
+    try: table.intern(Generation(output="abc"))
+    except RuntimeError: pass
+    assert table.intern(Generation(output="abc")) == 0
+    assert attempts == ["abc", "abc"]
+    assert table.values() == [1.0]
+
+
+def test_subclass_fields_are_part_of_the_identity():
+    table = OutputTable(lambda generation: 0.0)
+    assert table.intern(LabeledGeneration(output="x", label="a")) != table.intern(LabeledGeneration(output="x", label="b"))
+    assert table.intern(Generation(output="x")) != table.intern(LabeledGeneration(output="x", label="a"))
+
+
+def test_value_function_runs_once_per_distinct_output():
+    value_function = CountingValue()
+    result = ShapleyAttribution(model=ShortAnswerLLM(),
+                                data_handler=DataHandler("fever cough headache nausea"),
+                                prompt_codec=BasicPromptCodec(),
+                                use_cache=True,
+                                verbose=False,
+                                num_threads=4,
+                                value_function=value_function).attribution()
+    assert value_function.calls == 2
+    assert result.attribution[0]["score"] == 1.0
+    assert all(result.attribution[key]["score"] == 0.0 for key in (1, 2, 3))
@@ -70,12 +70,12 @@ def test_openai_embedding_endpoint(monkeypatch):
             return types.SimpleNamespace(data=data)
 
     class FakeOpenAI:
-        def __init__(self, *, api_key, base_url):
+        def __init__(self, *, api_key, base_url, http_client=None):
             captured["api_key"] = api_key
             captured["base_url"] = base_url
             self.embeddings = FakeEmbeddingsAPI()
 
-    fake_openai_module = types.SimpleNamespace(OpenAI=FakeOpenAI)
+    fake_openai_module = types.SimpleNamespace(OpenAI=FakeOpenAI, DefaultHttpxClient=lambda **kwargs: None)
     fake_dotenv_module = types.SimpleNamespace(load_dotenv=lambda: None)
     monkeypatch.setitem(sys.modules, "openai", fake_openai_module)
     monkeypatch.setitem(sys.modules, "dotenv", fake_dotenv_module)
@@ -89,3 +89,34 @@ def test_openai_embedding_endpoint(monkeypatch):
     assert captured["model"] == "text-embedding-3-small"
     assert captured["input"] == ["A", "B"]
     assert score == pytest.approx(0.7071067, rel=1e-6)
+
+
+def test_tfidf_score_cache_is_per_instance_and_counts_hits():
+    first = TFIDFCosineSimilarity(cache_size=10)
+    second = TFIDFCosineSimilarity(cache_size=10)
+    base, other = Generation(output="alpha beta"), Generation(output="alpha gamma")
+    first(base, other); first(base, other)
+    assert first.score_cache.stats().hits == 1
+    assert first.score_cache.stats().hit_rate == pytest.approx(0.5)
+    assert len(second.score_cache) == 0
+
+
+def test_shared_score_cache_across_instances():
+    from llmSHAP.cache import ScoreCache
+    shared = ScoreCache(capacity=100)
+    first = TFIDFCosineSimilarity(score_cache=shared)
+    second = TFIDFCosineSimilarity(score_cache=shared)
+    base, other = Generation(output="alpha beta"), Generation(output="alpha gamma")
+    assert first(base, other) == second(base, other)
+    assert shared.stats().hits == 1 and len(shared) == 1
+
+
+def test_value_function_instances_are_not_kept_alive_by_cache():
+    import gc
+    import weakref
+    similarity = TFIDFCosineSimilarity()
+    similarity(Generation(output="alpha beta"), Generation(output="alpha"))
+    reference = weakref.ref(similarity)
+    del similarity
+    gc.collect()
+    assert reference() is None
@@ -44,4 +44,27 @@ def test_sliding_window_sampler_windows_cover_and_weights(target):
     assert len(coalitions) == expected_count
 
     # Total weights sum to 1.
-    assert pytest.approx(total_weight, rel=1e-12) == 1.0
\ No newline at end of file
+    assert pytest.approx(total_weight, rel=1e-12) == 1.0
+
+
+@pytest.mark.parametrize("target", FEATURES)
+def test_plan_mode_matches_on_the_fly_enumeration(target):
+    planned = SlidingWindowSampler(ordered_keys=FEATURES, w_size=WINDOW_SIZE, stride=STRIDE, plan=True)
+    on_the_fly = SlidingWindowSampler(ordered_keys=FEATURES, w_size=WINDOW_SIZE, stride=STRIDE)
+    assert [(set(coalition), weight) for coalition, weight in planned(target, FEATURES)] == list(on_the_fly(target, FEATURES))
+    for without_index, with_index, _ in planned.feature_plan(target):
+        assert planned.plan_coalitions[with_index] == planned.plan_coalitions[without_index] | {target}
+
+
+def test_plan_shares_coalitions_across_features():
+    sampler = SlidingWindowSampler(ordered_keys=FEATURES, w_size=WINDOW_SIZE, stride=STRIDE, plan=True)
+    emitted = [coalition for feature in FEATURES for coalition, _ in sampler(feature, FEATURES)]
+    assert len(set(sampler.plan_coalitions)) == len(sampler.plan_coalitions)
+    assert set(emitted) <= set(sampler.plan_coalitions)
+    assert len(sampler.plan_coalitions) < 2 * len(emitted)
+
+
+def test_plan_falls_back_when_keys_differ():
+    sampler = SlidingWindowSampler(ordered_keys=FEATURES, w_size=WINDOW_SIZE, stride=STRIDE, plan=True)
+    subset = FEATURES[:6]
+    assert all("feat10" not in coalition for coalition, _ in sampler("feat1", subset))
@@ -0,0 +1,67 @@
+import importlib.machinery
+import subprocess
+import sys
+import threading
+import types
+
+import pytest
+
+from llmSHAP import EmbeddingCosineSimilarity
+from llmSHAP.generation import Generation
+
+
+def test_importing_attribution_does_not_load_optional_modules():
+    code = ("import sys\n"
+            "from llmSHAP import ShapleyAttribution, DataHandler, BasicPromptCodec\n"
+            "from llmSHAP.llm import DummyLLM\n"
+            "attribution = ShapleyAttribution(model=DummyLLM(model_name='dummy', sleep_seconds=0.0),\n"
+            "                                 data_handler=DataHandler('a b c'), prompt_codec=BasicPromptCodec(), verbose=False)\n"
+            "attribution.attribution()\n"
+            "print(sorted(name for name in ('tqdm', 'openai', 'llmSHAP.llm.openai', 'sentence_transformers') if name in sys.modules))\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+class FakeSentenceTransformer:
+    loads = 0
+    started = threading.Event()
+    release = threading.Event()
+
+    def __init__(self, name):
+        FakeSentenceTransformer.loads += 1
+        FakeSentenceTransformer.started.set()
+        FakeSentenceTransformer.release.wait(5)
+
+    def encode(self, texts, convert_to_numpy=True):
+        return [[1.0, 0.0] if text == "A" else [1.0, 1.0] for text in texts]
+
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    module = types.ModuleType("sentence_transformers")
+    module.__spec__ = importlib.machinery.ModuleSpec("sentence_transformers", None)
+    module.SentenceTransformer = FakeSentenceTransformer # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+    monkeypatch.setattr(EmbeddingCosineSimilarity, "_model", None)
+    monkeypatch.setattr(EmbeddingCosineSimilarity, "_model_future", None)
+    FakeSentenceTransformer.loads = 0
+    FakeSentenceTransformer.started.clear()
+    FakeSentenceTransformer.release.clear()
+    return FakeSentenceTransformer
+
+
+def test_embedding_model_loads_lazily_once(fake_sentence_transformers):
+    fake_sentence_transformers.release.set()
+    first, second = EmbeddingCosineSimilarity(), EmbeddingCosineSimilarity()
+    assert fake_sentence_transformers.loads == 0
+    assert first(Generation(output="A"), Generation(output="B")) == pytest.approx(2 ** -0.5)
+    second(Generation(output="A"), Generation(output="A"))
+    assert fake_sentence_transformers.loads == 1
+
+
+def test_embedding_model_background_warm_up(fake_sentence_transformers):
+    similarity = EmbeddingCosineSimilarity(warm_up="background") # Returns while the model is loading.
+    assert fake_sentence_transformers.started.wait(5)
+    fake_sentence_transformers.release.set()
+    assert similarity(Generation(output="A"), Generation(output="A")) == pytest.approx(1.0)
+    assert fake_sentence_transformers.loads == 1
@@ -55,3 +55,94 @@ def test_deterministic_with_seed():
     sampler1 = StratifiedSampler(0.3, seed=123)
     sampler2 = StratifiedSampler(0.3, seed=123)
     assert list(sampler1("A", keys)) == list(sampler2("A", keys)) # type: ignore
+
+
+def test_unrank_combination_enumerates_in_lexicographic_order():
+    from itertools import combinations
+    from llmSHAP.attribution_methods.coalition_sampler import unrank_combination
+    for n, k in [(5, 0), (5, 2), (6, 3), (7, 7)]:
+        assert [unrank_combination(rank, n, k) for rank in range(comb(n, k))] == [list(c) for c in combinations(range(n), k)]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_high_ratio_draws_distinct_coalitions(streaming):
+    keys = list(range(14))
+    sampler = StratifiedSampler(0.99, seed=1, streaming=streaming)
+    results = list(sampler(0, keys)) # type: ignore
+    for size in range(len(keys)):
+        stratum = [frozenset(coalition) for coalition, _ in results if len(coalition) == size]
+        assert len(stratum) == len(set(stratum)) == ceil(0.99 * comb(len(keys) - 1, size))
+
+
+def test_streaming_handles_huge_strata():
+    keys = list(range(64))
+    sampler = StratifiedSampler(1e-17, seed=3, streaming=True)
+    results = list(sampler(0, keys)) # type: ignore
+    middle = [coalition for coalition, _ in results if len(coalition) == 31]
+    assert len(middle) == ceil(1e-17 * comb(63, 31))
+    assert all(0 not in coalition and coalition <= set(keys) for coalition in middle)
+    assert sum(weight for _, weight in results) == pytest.approx(1.0)
+
+
+def test_streaming_is_deterministic_with_seed():
+    keys = list(range(10))
+    assert list(StratifiedSampler(0.3, seed=7, streaming=True)(0, keys)) == list(StratifiedSampler(0.3, seed=7, streaming=True)(0, keys)) # type: ignore
+
+
+@pytest.mark.parametrize("num_keys", [1, 2, 5, 6])
+def test_antithetic_pairs_complements_and_keeps_stratum_weights(num_keys):
+    keys = list(range(num_keys))
+    sampler = StratifiedSampler(0.4, seed=5, antithetic=True)
+    results = list(sampler(0, keys)) # type: ignore
+    others = set(keys) - {0}
+    if others:
+        for (first, first_weight), (second, second_weight) in zip(results[::2], results[1::2]):
+            assert first | second == others and not first & second
+            assert first_weight == second_weight
+    weight_by_size: dict[int, float] = {}
+    for coalition, weight in results: weight_by_size[len(coalition)] = weight_by_size.get(len(coalition), 0.0) + weight
+    assert sorted(weight_by_size) == list(range(num_keys))
+    assert all(weight == pytest.approx(1 / num_keys) for weight in weight_by_size.values())
+    assert len({frozenset(coalition) for coalition, _ in results}) == len(results)
+
+
+def test_antithetic_full_ratio_enumerates_every_coalition():
+    keys = list(range(6))
+    results = list(StratifiedSampler(1.0, antithetic=True)(0, keys)) # type: ignore
+    assert len(results) == 2 ** 5
+
+
+def _observe_all(sampler, feature, keys, game):
+    for coalition, _ in sampler(feature, keys):
+        sampler.observe(feature, coalition, game(coalition | {feature}) - game(coalition))
+    return sampler.variance_estimate(feature)
+
+
+def test_antithetic_variance_is_lower_for_symmetric_game():
+    keys = list(range(9))
+    game = lambda coalition: sum(coalition) - 18 + 0.1 * (sum(coalition) % 3) if 0 in coalition else 0.0
+    independent = _observe_all(StratifiedSampler(0.3, seed=11), 0, keys, game)
+    antithetic = _observe_all(StratifiedSampler(0.3, seed=11, antithetic=True), 0, keys, game)
+    assert independent > 0
+    assert antithetic < independent / 10
+    assert StratifiedSampler(0.3, seed=11).standard_error(0) == 0.0
+
+
+def test_full_enumeration_has_zero_variance():
+    keys = list(range(5))
+    assert _observe_all(StratifiedSampler(1.0, seed=1), 0, keys, lambda coalition: sum(coalition) ** 2) == 0.0
+
+
+def test_attribution_reports_contributions_to_sampler():
+    from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution
+    from llmSHAP.llm.llm_interface import LLMInterface
+
+    class LengthLLM(LLMInterface):
+        def generate(self, prompt, tools=None, images=None) -> str:
+            return "x" * len(prompt[-1]["content"])
+
+    sampler = StratifiedSampler(0.5, seed=3, antithetic=True)
+    ShapleyAttribution(model=LengthLLM(), data_handler=DataHandler("alpha beta gamma delta epsilon"),
+                       prompt_codec=BasicPromptCodec(), sampler=sampler, verbose=False).attribution()
+    assert all(stratum.count > 0 for stratum in sampler._strata[0].values())
+    assert sampler.variance_estimate(0) >= 0.0
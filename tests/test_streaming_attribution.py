@@ -0,0 +1,61 @@
+import threading
+from math import fsum
+
+import pytest
+
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution
+from llmSHAP.attribution_methods import FullEnumerationSampler
+from llmSHAP.attribution_methods.shapley_attribution import _StreamingSum
+from llmSHAP.generation import Generation
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class CountingLLM(LLMInterface):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def generate(self, prompt, tools=None, images=None) -> str:
+        with self._lock: self.calls += 1
+        return str(prompt)
+
+
+class BoundedCheckSampler(FullEnumerationSampler):
+    """Fails if more coalitions are pulled than the in-flight window allows."""
+    def __init__(self, num_players, llm, window):
+        super().__init__(num_players)
+        self.llm, self.window = llm, window
+        self.max_ahead = 0
+
+    def __call__(self, feature, keys):
+        start_calls = self.llm.calls
+        for pulled, item in enumerate(super().__call__(feature, keys), start=1):
+            completed = (self.llm.calls - start_calls) // 2
+            self.max_ahead = max(self.max_ahead, pulled - completed)
+            yield item
+
+
+class LengthShapley(ShapleyAttribution):
+    def _v(self, base_generation: Generation, coalition_generation: Generation) -> float:
+        return float(len(coalition_generation.output))
+
+
+def test_streaming_sum_is_exact():
+    values = [1e16, 1.0, -1e16, 1e-3] * 1000
+    total = _StreamingSum()
+    for value in values: total.add(value)
+    assert total.value() == fsum(values)
+
+
+@pytest.mark.parametrize("num_threads", [1, 3])
+def test_in_flight_window_bounds_pulled_coalitions(num_threads):
+    llm = CountingLLM()
+    data_handler = DataHandler("a b c d e f")
+    sampler = BoundedCheckSampler(6, llm, window=2)
+    attribution = LengthShapley(model=llm, data_handler=data_handler, prompt_codec=BasicPromptCodec(),
+                                sampler=sampler, verbose=False, num_threads=num_threads, max_in_flight=2)
+    result = attribution.attribution()
+    reference = LengthShapley(model=CountingLLM(), data_handler=DataHandler("a b c d e f"), prompt_codec=BasicPromptCodec(),
+                              verbose=False, num_threads=num_threads, max_in_flight=10_000).attribution()
+    assert sampler.max_ahead <= 2
+    assert result.attribution == reference.attribution
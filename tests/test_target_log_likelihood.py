@@ -0,0 +1,102 @@
+import types
+
+import pytest
+
+from llmSHAP import DataHandler, BasicPromptCodec, ShapleyAttribution, TargetLogLikelihood
+from llmSHAP.generation import Generation, LogProbGeneration
+from llmSHAP.llm.llm_interface import LLMInterface
+
+
+class ScoringLLM(LLMInterface):
+    """Each present word adds log-probability to the target; generation is only used for the target."""
+    def __init__(self):
+        self.generate_calls = 0
+        self.score_calls = 0
+
+    def generate(self, prompt, tools=None, images=None):
+        self.generate_calls += 1
+        return "flu"
+
+    def score(self, prompt, target, tools=None, images=None):
+        self.score_calls += 1
+        words = prompt[-1]["content"].split()
+        return [-1.0 + 0.1 * len(words), -2.0]
+
+
+def test_reduction_mean_and_sum():
+    generation = LogProbGeneration(output="x", token_logprobs=(-1.0, -3.0))
+    assert TargetLogLikelihood()(generation, generation) == pytest.approx(-2.0)
+    assert TargetLogLikelihood(reduction="sum")(generation, generation) == pytest.approx(-4.0)
+    assert TargetLogLikelihood()(generation, LogProbGeneration(output="")) == 0.0
+
+
+def test_requires_scored_generations():
+    with pytest.raises(TypeError):
+        TargetLogLikelihood()(Generation(output="a"), Generation(output="b"))
+    with pytest.raises(ValueError):
+        TargetLogLikelihood(reduction="max")
+
+
+def test_attribution_scores_instead_of_generating():
+    llm = ScoringLLM()
+    data_handler = DataHandler("fever cough headache")
+    result = ShapleyAttribution(model=llm,
+                                data_handler=data_handler,
+                                prompt_codec=BasicPromptCodec(),
+                                use_cache=True,
+                                verbose=False,
+                                num_threads=4,
+                                value_function=TargetLogLikelihood(reduction="sum")).attribution()
+    assert llm.generate_calls == 1
+    assert llm.score_calls == 2 ** 3
+    assert result.output == "flu"
+    assert result.grand_coalition_value == pytest.approx(-3.0 + 0.3)
+    assert result.empty_baseline == pytest.approx(-3.0)
+    assert all(item["score"] == pytest.approx(0.1) for item in result.attribution.values())
+
+
+def test_fixed_target_skips_generation():
+    llm = ScoringLLM()
+    result = ShapleyAttribution(model=llm,
+                                data_handler=DataHandler("fever cough"),
+                                prompt_codec=BasicPromptCodec(),
+                                use_cache=True,
+                                verbose=False,
+                                value_function=TargetLogLikelihood(target="measles")).attribution()
+    assert llm.generate_calls == 0
+    assert result.output == "measles"
+
+
+def test_openai_score_uses_echo_logprobs(monkeypatch):
+    pytest.importorskip("openai")
+    from llmSHAP.llm import OpenAIInterface
+    monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+    llm = OpenAIInterface(model_name="davinci-002")
+    captured: dict[str, object] = {}
+
+    def create(**kwargs):
+        captured.update(kwargs)
+        text = kwargs["prompt"]
+        prompt_length = len(text) - len(" flu")
+        logprobs = types.SimpleNamespace(text_offset=[0, prompt_length - 2, prompt_length, prompt_length + 2, len(text)],
+                                         token_logprobs=[None, -0.5, -0.25, -0.75, -9.0])
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(logprobs=logprobs)])
+
+    llm.client = types.SimpleNamespace(completions=types.SimpleNamespace(create=create)) # type: ignore[assignment]
+    token_logprobs = llm.score([{"role": "user", "content": "fever"}], " flu")
+    assert token_logprobs == [-0.25, -0.75]
+    assert captured["echo"] is True and captured["logprobs"] == 0 and captured["max_tokens"] == 1
+    assert captured["prompt"] == "user: fever\nassistant: flu"
+
+
+def test_score_fingerprint_ignores_sampling_settings():
+    def fingerprint(value_function, temperature):
+        llm = ScoringLLM()
+        llm.temperature = temperature # type: ignore[attr-defined]
+        return ShapleyAttribution(model=llm,
+                                  data_handler=DataHandler("fever cough"),
+                                  prompt_codec=BasicPromptCodec(),
+                                  verbose=False,
+                                  value_function=value_function)._fingerprint()
+    assert fingerprint(TargetLogLikelihood(target="flu"), 0.0) == fingerprint(TargetLogLikelihood(target="flu"), 1.0)
+    assert fingerprint(None, 0.0) != fingerprint(None, 1.0)
@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from llmSHAP.llm import TransformersInterface
+
+
+class CharTokenizer:
+    """Character-level tokenizer so the tests need no downloaded vocabulary."""
+    chat_template = None
+    eos_token_id = 1
+    pad_token_id = 0
+
+    def encode(self, text, add_special_tokens=False):
+        return [2 + (ord(char) % 60) for char in text]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(ord("a") + (token % 26)) for token in ids)
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                                      num_attention_heads=4, num_key_value_heads=2, eos_token_id=1, pad_token_id=0)
+    return transformers.LlamaForCausalLM(config).eval()
+
+
+def _prompt(text):
+    return [{"role": "system", "content": "You are a helpful assistant."}, {"role": "user", "content": text}]
+
+
+def _naive_greedy(model, tokenizer, prompt, max_tokens):
+    llm = TransformersInterface(model=model, tokenizer=tokenizer, max_tokens=max_tokens, max_batch_size=1)
+    ids = torch.tensor([llm._encode_prompt(prompt)])
+    generated = []
+    with torch.inference_mode():
+        for _ in range(max_tokens):
+            token = int(model(ids).logits[0, -1].argmax())
+            if token == tokenizer.eos_token_id: break
+            generated.append(token)
+            ids = torch.cat([ids, torch.tensor([[token]])], dim=-1)
+    return tokenizer.decode(generated)
+
+
+def test_prefix_reuse_matches_full_forward_greedy(tiny_model):
+    tokenizer = CharTokenizer()
+    llm = TransformersInterface(model=tiny_model, tokenizer=tokenizer, max_tokens=6, max_batch_size=1)
+    prompts = [_prompt("alpha beta gamma"), _prompt("alpha gamma"), _prompt("beta")]
+    outputs = [llm.generate(prompt) for prompt in prompts]
+    assert outputs == [_naive_greedy(tiny_model, tokenizer, prompt, 6) for prompt in prompts]
+    shared = llm._encode_prompt(_prompt(""))
+    assert llm._prefix_ids == shared[:len(llm._prefix_ids)]
+
+
+def test_batched_generation_matches_single(tiny_model):
+    tokenizer = CharTokenizer()
+    prompts = [_prompt(text) for text in ["one two three", "one three", "two", "three one"]]
+    single = TransformersInterface(model=tiny_model, tokenizer=tokenizer, max_tokens=5, max_batch_size=1)
+    batched = TransformersInterface(model=tiny_model, tokenizer=tokenizer, max_tokens=5, max_batch_size=4)
+    assert batched.generate_batch(prompts) == [single.generate(prompt) for prompt in prompts]
+
+
+def test_concurrent_generate_calls_are_batched(tiny_model):
+    tokenizer = CharTokenizer()
+    prompts = [_prompt(f"token {index}") for index in range(6)]
+    expected = TransformersInterface(model=tiny_model, tokenizer=tokenizer, max_tokens=4, max_batch_size=1).generate_batch(prompts)
+    llm = TransformersInterface(model=tiny_model, tokenizer=tokenizer, max_tokens=4, max_batch_size=3, batch_timeout=0.05)
+    results: dict[int, str] = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, llm.generate(prompts[i]))) for i in range(len(prompts))]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert [results[index] for index in range(len(prompts))] == expected
+
+
+def test_images_are_rejected(tiny_model):
+    llm = TransformersInterface(model=tiny_model, tokenizer=CharTokenizer(), max_tokens=2)
+    with pytest.raises(ValueError):
+        llm.generate(_prompt("x"), images=[object()])
+
+
+def test_score_matches_full_forward_log_softmax(tiny_model):
+    tokenizer = CharTokenizer()
+    llm = TransformersInterface(model=tiny_model, tokenizer=tokenizer, max_tokens=2, max_batch_size=1)
+    llm.generate(_prompt("warm up the shared prefix"))
+    for text in ["alpha", "alpha beta"]:
+        prompt_ids = llm._encode_prompt(_prompt(text))
+        target_ids = tokenizer.encode("answer")
+        with torch.inference_mode():
+            logits = tiny_model(torch.tensor([prompt_ids + target_ids])).logits[0].log_softmax(-1)
+        expected = [float(logits[len(prompt_ids) - 1 + index, token]) for index, token in enumerate(target_ids)]
+        assert llm.score(_prompt(text), "answer") == pytest.approx(expected, abs=1e-5)